@@ -2,14 +2,14 @@
 OpenAI Agents SDK integration with LiteLLM for multi-provider support
 """
 import os
+import logging
 from typing import Optional, AsyncIterator, Dict, Any, List
 from datetime import datetime
 import json
 from dataclasses import dataclass
 
-# LiteLLM for multi-provider support
-from litellm import acompletion
-import litellm
+# LiteLLM for multi-provider support (imported lazily, see providers.py)
+from .providers import acompletion, configure_api_keys
 
 # Tool system imports
 import sys
@@ -18,9 +18,19 @@ from tools import tool_registry, ToolResult
 
 # Conversation management
 from .conversation_manager import ConversationManager
+from .config import ConfigManager, ConfigSnapshot
+from . import loop_monitor
+from .tracing import tracer
+from .tool_stream import ResponseAccumulator, ToolPrefetcher, parse_arguments, tool_call_key
+from .budget import BudgetController, LoopDetector, TurnBudget
+from .working_history import WorkingHistory
+from .scheduler import llm_scheduler
+from .usage_ledger import UsageLedger
+from .capabilities import ModelCapabilities, unknown_model
+from .fan_out import TurnContext, current_turn
+
+logger = logging.getLogger(__name__)
 
-# Configure LiteLLM
-litellm.set_verbose = False
 
 @dataclass
 class AgentConfig:
@@ -33,8 +43,10 @@ class DreamyTinAgent:
     """Main agent class using OpenAI Agents SDK with LiteLLM for multi-provider support"""
     
     def __init__(self):
-        self.system_prompt = self._load_system_prompt()
-        self.model_config = self._load_model_config()
+        # Hot-reloadable system prompt, model config and tool definitions
+        self.config = ConfigManager(tools_builder=self._get_tool_definitions)
+        self.config.add_listener(self._apply_config)
+        self._apply_config(self.config.snapshot)
         
         # Set API keys
         self.api_keys = {
@@ -43,138 +55,36 @@ class DreamyTinAgent:
             "gemini": os.getenv("GOOGLE_API_KEY")
         }
         
-        # Configure LiteLLM with API keys
-        if self.api_keys["openai"]:
-            litellm.openai_key = self.api_keys["openai"]
-        if self.api_keys["anthropic"]:
-            litellm.anthropic_key = self.api_keys["anthropic"]
-        if self.api_keys["gemini"]:
-            litellm.gemini_key = self.api_keys["gemini"]
-        
-        # Agent configuration
-        self.agent_config = AgentConfig(
-            instructions=self.system_prompt,
-            model=self.model_config.get("defaultModel", "claude-3.5-haiku"),
-            tools=self._get_tool_definitions()
-        )
+        # Configure LiteLLM with API keys (applied once it is imported)
+        configure_api_keys(self.api_keys)
         
         # Conversation sessions (removed - now using ConversationManager exclusively)
         # self.sessions: Dict[str, List[ChatCompletionMessage]] = {}
         
         # File-based conversation manager
         self.conversation_manager = ConversationManager()
-    
-    def _load_system_prompt(self) -> str:
-        """Load system prompt from file"""
-        prompt_path = "../../data/system-prompt.md"
-        if os.path.exists(prompt_path):
-            with open(prompt_path, 'r') as f:
-                return f.read()
-        return "You are DreamyTin AI, a helpful personal assistant."
-    
-    def _load_model_config(self) -> Dict[str, Any]:
-        """Load model configuration"""
-        config_path = "../shared/config/models.json"
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        return {
-            "defaultModel": "claude-3.5-haiku",
-            "models": {}
-        }
-    
-    def _get_litellm_model_name(self, model_id: str) -> str:
-        """Convert model ID to LiteLLM format using actual model names from config"""
-        # Get the actual model name from config
-        model_info = self.model_config.get("models", {}).get(model_id, {})
-        model_name = model_info.get("name", model_id)
-        provider = model_info.get("provider", "").lower()
-        
-        # Format for LiteLLM based on provider
-        if provider == "google":
-            # Google models need "gemini/" prefix in LiteLLM
-            return f"gemini/{model_name}"
-        else:
-            # OpenAI and Anthropic models use their names directly
-            return model_name
-    
-    def _format_messages_for_api(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Format conversation messages for LiteLLM API compatibility"""
-        formatted_messages = []
-        
-        for msg in messages:
-            # Create a copy to avoid modifying the original
-            formatted_msg = {
-                "role": msg["role"],
-                "content": msg.get("content", "")
-            }
-            
-            # Handle tool calls in assistant messages
-            if msg["role"] == "assistant" and "tool_calls" in msg:
-                formatted_msg["tool_calls"] = msg["tool_calls"]
-                # If content is None/empty for tool calls, set it to empty string
-                if not formatted_msg["content"]:
-                    formatted_msg["content"] = ""
-            
-            # Handle tool results
-            elif msg["role"] == "tool":
-                formatted_msg["tool_call_id"] = msg.get("tool_call_id")
-                # Ensure content is a string
-                if not isinstance(formatted_msg["content"], str):
-                    formatted_msg["content"] = str(formatted_msg["content"])
-            
-            # Remove timestamp and other metadata fields that aren't part of the API spec
-            formatted_messages.append(formatted_msg)
         
-        # Validate message sequence for Anthropic compatibility
-        # Ensure every assistant message with tool_calls is followed by corresponding tool messages
-        self._validate_tool_message_sequence(formatted_messages)
-        
-        return formatted_messages
+        # Token usage and cost of every LLM call, with rollups per session, model and day
+        self.usage_ledger = UsageLedger()
     
-    def _validate_tool_message_sequence(self, messages: List[Dict[str, Any]]) -> None:
-        """Validate that tool_use messages are properly followed by tool_result messages"""
-        i = 0
-        while i < len(messages):
-            msg = messages[i]
-            
-            # Check if this is an assistant message with tool calls
-            if (msg["role"] == "assistant" and 
-                msg.get("tool_calls") and 
-                len(msg["tool_calls"]) > 0):
-                
-                tool_call_ids = {tc["id"] for tc in msg["tool_calls"]}
-                found_tool_results = set()
-                
-                # Look ahead for corresponding tool result messages
-                j = i + 1
-                while j < len(messages) and messages[j]["role"] == "tool":
-                    tool_result_id = messages[j].get("tool_call_id")
-                    if tool_result_id in tool_call_ids:
-                        found_tool_results.add(tool_result_id)
-                    j += 1
-                
-                # Check if all tool calls have corresponding results
-                missing_results = tool_call_ids - found_tool_results
-                if missing_results:
-                    # Log warning but don't add placeholder - this indicates a bug
-                    print(f"WARNING: Missing tool results for tool_call_ids: {missing_results}")
-                    # Add placeholder tool results for missing ones (for API compatibility)
-                    for missing_id in missing_results:
-                        placeholder_result = {
-                            "role": "tool",
-                            "tool_call_id": missing_id,
-                            "content": "Tool execution result not available"
-                        }
-                        # Insert after the assistant message but before any existing tool messages
-                        insert_index = i + 1
-                        while (insert_index < len(messages) and 
-                               messages[insert_index]["role"] == "tool" and
-                               messages[insert_index].get("tool_call_id") in tool_call_ids):
-                            insert_index += 1
-                        messages.insert(insert_index, placeholder_result)
-            
-            i += 1
+    def _apply_config(self, snapshot: ConfigSnapshot) -> None:
+        """Swap in a new config snapshot (turns already running keep the snapshot they started with)"""
+        self.system_prompt = snapshot.system_prompt
+        self.model_config = snapshot.model_config
+        self.agent_config = AgentConfig(
+            instructions=snapshot.system_prompt,
+            model=snapshot.model_config.get("defaultModel", "claude-3.5-haiku"),
+            tools=snapshot.tools
+        )
+        self.capabilities = snapshot.capabilities
+        # /models response, rebuilt on first request after each reload
+        self._available_models = None
+        llm_scheduler.configure(snapshot.model_config.get("rateLimits"))
+    
+    def _model_capabilities(self, model_id: str, config: Optional[ConfigSnapshot] = None) -> ModelCapabilities:
+        """Precomputed capabilities of a configured model (plain text streaming for unknown ids)"""
+        capabilities = config.capabilities if config else self.capabilities
+        return capabilities.get(model_id) or unknown_model(model_id)
     
     def _convert_stored_messages_to_frontend_format(self, stored_messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Convert stored conversation messages to frontend-compatible format"""
@@ -227,36 +137,6 @@ class DreamyTinAgent:
         return frontend_messages
     
     
-    def _detect_repetitive_tool_pattern(self, current_tool_calls: List[Dict[str, Any]], executed_tool_calls: Dict[str, str]) -> bool:
-        """
-        Detect if the current tool calls represent a repetitive pattern that suggests infinite looping.
-        Returns True if repetitive pattern is detected.
-        """
-        if not current_tool_calls:
-            return False
-        
-        # Check if all current tool calls are already in the executed cache
-        all_cached = True
-        for tool_call in current_tool_calls:
-            tool_name = tool_call["function"]["name"]
-            try:
-                arguments = json.loads(tool_call["function"]["arguments"])
-            except json.JSONDecodeError:
-                arguments = {}
-            
-            tool_key = (tool_name, json.dumps(arguments, sort_keys=True))
-            if tool_key not in executed_tool_calls:
-                all_cached = False
-                break
-        
-        # If all tool calls are cached and we're still making them, it's repetitive
-        if all_cached:
-            tool_names = [tc["function"]["name"] for tc in current_tool_calls]
-            print(f"DEBUG: Detected repetitive pattern - all {len(current_tool_calls)} tool calls ({tool_names}) are cached")
-            return True
-        
-        return False
-    
     async def _execute_tool_loop(
         self,
         initial_content: str,
@@ -264,8 +144,11 @@ class DreamyTinAgent:
         executed_tool_calls: Dict[str, str],
         session_id: str,
         model_id: str,
-        litellm_model: str,
-        supports_tools: bool
+        capabilities: ModelCapabilities,
+        budget: BudgetController,
+        history: WorkingHistory,
+        config: ConfigSnapshot,
+        prefetcher: Optional[ToolPrefetcher] = None
     ) -> AsyncIterator[Dict[str, Any]]:
         """
         Execute the proper tool execution loop:
@@ -273,48 +156,40 @@ class DreamyTinAgent:
         2. Execute each tool call  
         3. Feed results back to agent for analysis
         4. If agent wants more tools, repeat; otherwise provide final response
+        The turn's budget (time, tokens, tool calls, cost, iterations, loop detection) can stop it early.
+        `history` is the in-memory request history; every saved message is appended to it.
+        `config` is the snapshot the turn started with, so a reload mid-turn never mixes configs.
         """
         
         # Save initial assistant message with tool calls
-        await self.conversation_manager.add_message(
-            session_id, "assistant", initial_content or None, tool_calls=initial_tool_calls
+        await self._save_message(
+            session_id, history, "assistant", initial_content or None, tool_calls=initial_tool_calls
         )
         
         # Execute initial tool calls
-        for tool_call in initial_tool_calls:
-            async for result in self._execute_tool_with_dedup(
-                tool_call, executed_tool_calls, session_id, model_id
-            ):
-                yield result
+        exhausted = None
+        async for result in self._execute_tool_calls(
+            initial_tool_calls, executed_tool_calls, session_id, model_id, budget, history, prefetcher
+        ):
+            exhausted = exhausted or result.get("type") == "budget_exhausted"
+            yield result
         
         # Now enter the iterative loop: ask agent what to do next
-        max_iterations = 10
-        iteration_count = 0
-        
-        while iteration_count < max_iterations:
-            iteration_count += 1
-            
-            # Load current conversation with all tool results
-            current_messages = await self.conversation_manager.get_conversation_messages(session_id)
-            messages_for_agent = [{"role": "system", "content": self.agent_config.instructions}]
-            messages_for_agent.extend(current_messages)
+        while not exhausted:
+            over_budget = budget.check()
+            if over_budget:
+                logger.info(f"Stopping tool loop after {budget.iterations} iterations: {over_budget.message}")
+                yield over_budget.to_event(model_id, budget.usage())
+                break
+            budget.start_iteration()
             
-            # Format messages for API compatibility
-            messages_for_agent = self._format_messages_for_api(messages_for_agent)
+            # History already holds every tool result, formatted and truncated as it was appended
+            messages_for_agent = history.messages()
             
             # Ask the agent: "Given these tool results, what do you want to do next?"
-            completion_kwargs = {
-                "model": litellm_model,
-                "messages": messages_for_agent,
-                "stream": True,
-                "temperature": 0.7,
-                "max_tokens": 4096
-            }
-            
-            # Add tools if supported - let agent decide if it needs more tools
-            if supports_tools and self.agent_config.tools:
-                completion_kwargs["tools"] = self.agent_config.tools
-                completion_kwargs["tool_choice"] = "auto"
+            # Tools stay available if the model supports them - let agent decide if it needs more
+            completion_kwargs = capabilities.completion_params(stream=True, tools=config.tools)
+            completion_kwargs["messages"] = capabilities.prepare_messages(messages_for_agent)
             
             # Signal that we're starting a new agent response
             yield {
@@ -323,48 +198,30 @@ class DreamyTinAgent:
                 "timestamp": datetime.utcnow().isoformat()
             }
             
-            # Get agent's response
-            response = await acompletion(**completion_kwargs)
-            
-            response_content = ""
-            response_tool_calls = []
+            accumulator = ResponseAccumulator(prefetcher.maybe_start if prefetcher else None)
             
-            # Stream the agent's response
-            async for chunk in response:
-                # Handle content
-                if chunk.choices and chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    response_content += content
-                    yield {
-                        "type": "final_stream",
-                        "content": content,
-                        "model": model_id,
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
+            with loop_monitor.phase("llm_stream"):
+                # Get agent's response
+                response = await acompletion(self._provider(model_id, config), **completion_kwargs)
                 
-                # Handle tool calls
-                if chunk.choices and chunk.choices[0].delta.tool_calls:
-                    for tool_call_delta in chunk.choices[0].delta.tool_calls:
-                        # Accumulate tool call information
-                        if len(response_tool_calls) <= tool_call_delta.index:
-                            response_tool_calls.append({
-                                "id": "",
-                                "type": "function", 
-                                "function": {"name": "", "arguments": ""}
-                            })
-                        
-                        tc = response_tool_calls[tool_call_delta.index]
-                        if tool_call_delta.id:
-                            tc["id"] = tool_call_delta.id
-                        if tool_call_delta.function:
-                            if tool_call_delta.function.name:
-                                tc["function"]["name"] = tool_call_delta.function.name
-                            if tool_call_delta.function.arguments:
-                                tc["function"]["arguments"] += tool_call_delta.function.arguments
+                # Stream the agent's response
+                async for chunk in response:
+                    content = accumulator.add_chunk(chunk)
+                    if content:
+                        yield {
+                            "type": "final_stream",
+                            "content": content,
+                            "model": model_id,
+                            "timestamp": datetime.utcnow().isoformat()
+                        }
+            
+            self._record_usage(budget, accumulator, messages_for_agent, session_id, model_id, config)
+            response_content = accumulator.content
+            response_tool_calls = accumulator.tool_calls
             
             # Save the agent's response
-            await self.conversation_manager.add_message(
-                session_id, "assistant", response_content or None, 
+            await self._save_message(
+                session_id, history, "assistant", response_content or None, 
                 tool_calls=response_tool_calls if response_tool_calls else None
             )
             
@@ -372,45 +229,112 @@ class DreamyTinAgent:
             if not response_tool_calls:
                 break
             
-            # Check for repetitive patterns (safety)
-            if self._detect_repetitive_tool_pattern(response_tool_calls, executed_tool_calls):
-                print(f"DEBUG: Breaking loop at iteration {iteration_count} - detected repetitive pattern")
-                break
-            
-            # Execute the new tool calls
-            for tool_call in response_tool_calls:
-                async for result in self._execute_tool_with_dedup(
-                    tool_call, executed_tool_calls, session_id, model_id
-                ):
-                    yield result
-        
-        # Safety check for max iterations
-        if iteration_count >= max_iterations:
-            yield {
-                "type": "error",
-                "error": f"Maximum tool execution iterations ({max_iterations}) reached.",
-                "model": model_id,
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            # Execute the new tool calls (unless the budget or loop detection stops them)
+            async for result in self._execute_tool_calls(
+                response_tool_calls, executed_tool_calls, session_id, model_id, budget, history, prefetcher
+            ):
+                exhausted = exhausted or result.get("type") == "budget_exhausted"
+                yield result
         
         # Don't send stream_end here - let the main process_message method handle it
     
+    async def _execute_tool_calls(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        executed_tool_calls: Dict[str, str],
+        session_id: str,
+        model_id: str,
+        budget: BudgetController,
+        history: Optional[WorkingHistory] = None,
+        prefetcher: Optional[ToolPrefetcher] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run one response's tool calls if the budget admits them, else record them as not executed"""
+        over_budget = budget.admit_tool_calls([
+            (tc["function"]["name"], parse_arguments(tc["function"]["arguments"])) for tc in tool_calls
+        ])
+        if over_budget:
+            logger.info(f"Not executing {len(tool_calls)} tool call(s): {over_budget.message}")
+            # Every tool call needs a result in the history, or the next request is rejected
+            for tool_call in tool_calls:
+                await self._save_message(
+                    session_id, history, "tool", f"Tool call not executed: {over_budget.message}",
+                    tool_call_id=tool_call["id"]
+                )
+            yield over_budget.to_event(model_id, budget.usage())
+            return
+        
+        for tool_call in tool_calls:
+            async for result in self._execute_tool_with_dedup(
+                tool_call, executed_tool_calls, session_id, model_id, prefetcher, history
+            ):
+                yield result
+    
+    async def _save_message(self, session_id: str, history: Optional[WorkingHistory],
+                            role: str, content: Optional[str], **kwargs) -> None:
+        """Persist a message and append it to the turn's in-memory history"""
+        await self.conversation_manager.add_message(session_id, role, content, **kwargs)
+        if history is not None:
+            history.append({"role": role, "content": content, **kwargs})
+    
+    def _provider(self, model_id: str, config: Optional[ConfigSnapshot] = None) -> str:
+        """Provider of a configured model ("" if unknown)"""
+        model_config = config.model_config if config else self.model_config
+        return model_config.get("models", {}).get(model_id, {}).get("provider", "").lower()
+    
+    def _create_budget(self, model_id: str, config: ConfigSnapshot) -> BudgetController:
+        """Budget controller for one turn, from the model's turnBudget and pricing"""
+        return BudgetController(
+            TurnBudget.for_model(config.model_config, model_id),
+            pricing=config.pricing.get(model_id),
+            loop_detector=LoopDetector(normalize=self._normalize_tool_arguments)
+        )
+    
+    def _normalize_tool_arguments(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Arguments with defaults filled in and values coerced, so equivalent calls compare equal"""
+        tool = tool_registry.get(tool_name)
+        if tool is None:
+            return arguments
+        try:
+            return tool.validate_parameters(arguments)
+        except ValueError:
+            return arguments
+    
+    def _record_usage(self, budget: BudgetController, accumulator: ResponseAccumulator,
+                      messages: List[Dict[str, Any]], session_id: str, model_id: str,
+                      config: ConfigSnapshot) -> None:
+        """Count a streamed completion's tokens (estimated at ~4 chars/token if the provider sent no usage)"""
+        usage = accumulator.usage
+        if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+            prompt_tokens = usage.prompt_tokens or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            estimated = False
+        else:
+            completion_chars = len(accumulator.content) + sum(
+                len(tc["function"]["arguments"]) for tc in accumulator.tool_calls
+            )
+            prompt_tokens, completion_tokens = len(json.dumps(messages)) // 4, completion_chars // 4
+            estimated = True
+        budget.record_llm_call(prompt_tokens, completion_tokens)
+        self.usage_ledger.record(
+            session_id, model_id, prompt_tokens, completion_tokens,
+            pricing=budget.pricing, provider=self._provider(model_id, config), estimated=estimated
+        )
+    
     async def _execute_tool_with_dedup(
         self,
         tool_call: Dict[str, Any],
         executed_tool_calls: Dict[str, str],  # Changed to dict to store results
         session_id: str,
-        model_id: str
+        model_id: str,
+        prefetcher: Optional[ToolPrefetcher] = None,
+        history: Optional[WorkingHistory] = None
     ) -> AsyncIterator[Dict[str, Any]]:
         """Execute a tool with deduplication check and yield results"""
         tool_name = tool_call["function"]["name"]
-        try:
-            arguments = json.loads(tool_call["function"]["arguments"])
-        except json.JSONDecodeError:
-            arguments = {}
+        arguments = parse_arguments(tool_call["function"]["arguments"])
         
         # Create a hashable key for deduplication
-        tool_key = (tool_name, json.dumps(arguments, sort_keys=True))
+        tool_key = tool_call_key(tool_name, arguments)
         
         # Check if this exact tool call was already executed
         if tool_key in executed_tool_calls:
@@ -418,8 +342,8 @@ class DreamyTinAgent:
             original_result = executed_tool_calls[tool_key]
             
             # Save the original result for this tool call
-            await self.conversation_manager.add_message(
-                session_id, "tool", original_result, 
+            await self._save_message(
+                session_id, history, "tool", original_result, 
                 tool_call_id=tool_call["id"]
             )
             
@@ -442,15 +366,19 @@ class DreamyTinAgent:
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        # Execute tool
-        tool_result = await self._execute_tool(tool_name, arguments)
+        # Execute tool, reusing a speculative run started while the response streamed
+        prefetched = prefetcher.take(tool_key) if prefetcher else None
+        if prefetched is not None:
+            tool_result = await prefetched
+        else:
+            tool_result = await self._execute_tool(tool_name, arguments)
         
         # Store result for future deduplication
         executed_tool_calls[tool_key] = tool_result
         
         # Save tool result
-        await self.conversation_manager.add_message(
-            session_id, "tool", tool_result, tool_call_id=tool_call["id"]
+        await self._save_message(
+            session_id, history, "tool", tool_result, tool_call_id=tool_call["id"]
         )
         
         # Stream tool result
@@ -458,46 +386,34 @@ class DreamyTinAgent:
             "type": "tool_result",
             "tool_name": tool_name,
             "result": tool_result,
+            "prefetched": prefetched is not None,
             "model": model_id,
             "timestamp": datetime.utcnow().isoformat()
         }
     
     def _get_tool_definitions(self) -> List[Dict[str, Any]]:
-        """Get tool definitions in OpenAI function calling format"""
-        tools = []
-        for tool_def in tool_registry.get_definitions():
-            # Convert to OpenAI function format
-            function_def = {
-                "type": "function",
-                "function": {
-                    "name": tool_def.name,
-                    "description": tool_def.description,
-                    "parameters": {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
-                }
-            }
-            
-            # Add parameters
-            for param in tool_def.parameters:
-                function_def["function"]["parameters"]["properties"][param.name] = {
-                    "type": param.type,
-                    "description": param.description
-                }
-                if param.required:
-                    function_def["function"]["parameters"]["required"].append(param.name)
-                if param.default is not None:
-                    function_def["function"]["parameters"]["properties"][param.name]["default"] = param.default
-            
-            tools.append(function_def)
-        
-        return tools
+        """Get tool definitions in OpenAI function calling format (precompiled by the registry)"""
+        return tool_registry.get_function_schemas()
+    
+    def _is_read_only_tool(self, tool_name: str) -> bool:
+        """Whether a tool may run speculatively (no side effects, idempotent)"""
+        tool = tool_registry.get(tool_name)
+        return tool is not None and tool.read_only
+    
+    async def _prefetch_tool(self, session_id: str, tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Speculative tool run in its own task, attributed to the turn's session"""
+        with loop_monitor.session(session_id):
+            return await self._execute_tool(tool_name, arguments)
     
+    @loop_monitor.in_phase("tool_exec")
     async def _execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
         """Execute a tool and return formatted result"""
-        result = await tool_registry.execute(tool_name, **arguments)
+        with tracer.span("tool.execute", **{"tool.name": tool_name}) as span:
+            result = await tool_registry.execute(tool_name, **arguments)
+            span.set_attribute("tool.success", result.success)
+            if not result.success:
+                span.set_status("ERROR")
+                span.set_attribute("tool.error", result.error)
         
         if result.success:
             # Format successful result
@@ -526,6 +442,26 @@ class DreamyTinAgent:
         stream: bool = True
     ) -> AsyncIterator[Dict[str, Any]]:
         """Process a message using OpenAI Agents SDK and return streaming response"""
+        # Attribute event-loop lag, profiler samples and spans of this turn to the session
+        with loop_monitor.session(session_id), tracer.span("agent.turn", **{"session.id": session_id}) as span:
+            span.set_attribute("llm.model", model_id or self.agent_config.model)
+            async for event in self._process_message(message, session_id, model_id, stream):
+                if event["type"] == "error":
+                    span.set_status("ERROR")
+                    span.add_event("error", {"error": event.get("error")})
+                yield event
+    
+    async def _process_message(
+        self,
+        message: str,
+        session_id: str,
+        model_id: Optional[str],
+        stream: bool
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run one turn: initial completion, optional tool loop, persistence"""
+        
+        # The whole turn uses the config current at its start; a reload applies from the next turn
+        config = self.config.snapshot
         
         # Use default model if not specified
         if not model_id:
@@ -536,90 +472,66 @@ class DreamyTinAgent:
         if not existing_conversation:
             await self.create_session(session_id, model_id)
         
-        # Convert to LiteLLM model name for multi-provider support
-        litellm_model = self._get_litellm_model_name(model_id)
+        # Tools, limits and request parameters of this model (LiteLLM name for multi-provider support)
+        capabilities = self._model_capabilities(model_id, config)
+        stream = stream and capabilities.streaming
         
         # Track executed tool calls to prevent duplicates (store results for caching)
         executed_tool_calls = {}
         
+        # Limits on time, tokens, tool calls and cost for this turn
+        budget = self._create_budget(model_id, config)
+        
+        # Read-only tools start as soon as their arguments have streamed in full
+        prefetcher = ToolPrefetcher(
+            execute=lambda name, arguments: self._prefetch_tool(session_id, name, arguments),
+            is_read_only=self._is_read_only_tool,
+            known=executed_tool_calls
+        )
+        
+        # Tools that call back into the agent (fan_out) run against this turn's session and budget
+        turn_token = current_turn.set(TurnContext(self, session_id, model_id, budget, config))
+        
         try:
-            # Load conversation history and apply context window truncation
+            # Load conversation history once; the tool loop appends to it in memory
             conversation_messages = await self.conversation_manager.get_conversation_messages(session_id)
             
-            # Apply context window handling
-            model_config = self.model_config.get("models", {}).get(model_id, {})
-            max_tokens = model_config.get("contextWindow", 32000)
-            
-            # Truncate if needed (keeping system prompt + recent messages)
-            all_messages = [{"role": "system", "content": self.agent_config.instructions}]
-            all_messages.extend(conversation_messages)
-            all_messages.append({"role": "user", "content": message})
-            
-            messages = self.conversation_manager.truncate_for_context_window(all_messages, max_tokens)
-            
-            # Format messages for API compatibility
-            messages = self._format_messages_for_api(messages)
-            
-            # Ensure we have system message
-            if not messages or messages[0].get("role") != "system":
-                messages.insert(0, {"role": "system", "content": self.agent_config.instructions})
-            
-            # Check if model supports function calling
-            supports_tools = model_id.startswith("gpt") or model_id.startswith("claude")
+            # Formatted for the API and truncated to the context window (system prompt + recent messages),
+            # leaving room for the response's max_tokens
+            history = WorkingHistory(
+                config.system_prompt,
+                capabilities.input_tokens,
+                provider=self._provider(model_id, config)
+            )
+            history.extend(conversation_messages)
+            history.append({"role": "user", "content": message})
+            messages = history.messages()
             
             # Use LiteLLM through OpenAI client interface for multi-provider support
-            completion_kwargs = {
-                "model": litellm_model,
-                "messages": messages,
-                "stream": stream,
-                "temperature": 0.7,
-                "max_tokens": 4096
-            }
-            
-            # Add tools if supported
-            if supports_tools and self.agent_config.tools:
-                completion_kwargs["tools"] = self.agent_config.tools
-                completion_kwargs["tool_choice"] = "auto"
-            
-            response = await acompletion(**completion_kwargs)
+            # (tools only for models that support function calling)
+            completion_kwargs = capabilities.completion_params(stream, tools=config.tools)
+            completion_kwargs["messages"] = capabilities.prepare_messages(messages)
             
             if stream:
-                complete_content = ""
-                tool_calls = []
+                accumulator = ResponseAccumulator(prefetcher.maybe_start)
                 
-                async for chunk in response:
-                    # Handle content
-                    if chunk.choices and chunk.choices[0].delta.content:
-                        content = chunk.choices[0].delta.content
-                        complete_content += content
-                        
-                        # Stream the delta content as received
-                        yield {
-                            "type": "stream",
-                            "content": content,
-                            "model": model_id,
-                            "timestamp": datetime.utcnow().isoformat()
-                        }
+                with loop_monitor.phase("llm_stream"):
+                    response = await acompletion(self._provider(model_id, config), **completion_kwargs)
                     
-                    # Handle tool calls
-                    if chunk.choices and chunk.choices[0].delta.tool_calls:
-                        for tool_call_delta in chunk.choices[0].delta.tool_calls:
-                            # Accumulate tool call information
-                            if len(tool_calls) <= tool_call_delta.index:
-                                tool_calls.append({
-                                    "id": "",
-                                    "type": "function",
-                                    "function": {"name": "", "arguments": ""}
-                                })
-                            
-                            tc = tool_calls[tool_call_delta.index]
-                            if tool_call_delta.id:
-                                tc["id"] = tool_call_delta.id
-                            if tool_call_delta.function:
-                                if tool_call_delta.function.name:
-                                    tc["function"]["name"] = tool_call_delta.function.name
-                                if tool_call_delta.function.arguments:
-                                    tc["function"]["arguments"] += tool_call_delta.function.arguments
+                    async for chunk in response:
+                        content = accumulator.add_chunk(chunk)
+                        if content:
+                            # Stream the delta content as received
+                            yield {
+                                "type": "stream",
+                                "content": content,
+                                "model": model_id,
+                                "timestamp": datetime.utcnow().isoformat()
+                            }
+                
+                self._record_usage(budget, accumulator, messages, session_id, model_id, config)
+                complete_content = accumulator.content
+                tool_calls = accumulator.tool_calls
                 
                 # Process any tool calls using the proper iterative approach
                 if tool_calls:
@@ -629,7 +541,7 @@ class DreamyTinAgent:
                     # Execute the proper tool execution loop
                     async for result in self._execute_tool_loop(
                         complete_content, tool_calls, executed_tool_calls, 
-                        session_id, model_id, litellm_model, supports_tools
+                        session_id, model_id, capabilities, budget, history, config, prefetcher
                     ):
                         yield result
                 else:
@@ -640,10 +552,20 @@ class DreamyTinAgent:
                 yield {
                     "type": "stream_end",
                     "model": model_id,
+                    "usage": budget.usage(),
                     "timestamp": datetime.utcnow().isoformat()
                 }
             else:
+                with loop_monitor.phase("llm_stream"):
+                    response = await acompletion(self._provider(model_id, config), **completion_kwargs)
                 content = response.choices[0].message.content
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    self.usage_ledger.record(
+                        session_id, model_id, getattr(usage, "prompt_tokens", 0) or 0,
+                        getattr(usage, "completion_tokens", 0) or 0,
+                        pricing=budget.pricing, provider=self._provider(model_id, config)
+                    )
                 await self.conversation_manager.add_message(session_id, "user", message)
                 await self.conversation_manager.add_message(session_id, "assistant", content)
                 
@@ -661,6 +583,12 @@ class DreamyTinAgent:
                 "model": model_id,
                 "timestamp": datetime.utcnow().isoformat()
             }
+        finally:
+            prefetcher.cancel_pending()
+            try:
+                current_turn.reset(turn_token)
+            except ValueError:
+                pass  # generator closed from another context; that context never saw the value
     
     async def get_conversation_for_frontend(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get conversation data formatted for frontend consumption"""
@@ -679,7 +607,9 @@ class DreamyTinAgent:
         }
     
     def get_available_models(self) -> Dict[str, Any]:
-        """Return available models based on configured API keys"""
+        """Return available models based on configured API keys (computed once per config load)"""
+        if self._available_models is not None:
+            return self._available_models
         available = {}
         
         # Check which providers have API keys
@@ -693,10 +623,11 @@ class DreamyTinAgent:
         for model_id, model_info in self.model_config.get("models", {}).items():
             provider = model_info.get("provider", "").lower()
             if providers.get(provider, False):
-                available[model_id] = model_info
+                available[model_id] = {**model_info, "capabilities": self._model_capabilities(model_id).to_dict()}
         
-        return {
+        self._available_models = {
             "defaultModel": self.model_config.get("defaultModel"),
             "models": available,
             "providers": providers
-        }
\ No newline at end of file
+        }
+        return self._available_models
\ No newline at end of file
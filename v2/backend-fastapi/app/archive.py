@@ -0,0 +1,186 @@
+"""
+Compressed archive tier for idle conversations
+Conversations untouched for a while are moved out of data/conversations/
+into append-only segment files under data/conversations/archive/. Each
+conversation is one independently compressed record (zstd when the
+zstandard package is installed, gzip otherwise), located through a small
+offset index (archive/index.json), so a single conversation is read back
+with one seek. Segments whose records were mostly removed (conversation
+reopened or deleted) are rewritten by compact()
+"""
+
+import gzip
+import json
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .durable import TMP_SUFFIX, remove_stale_temp_files, write_atomic
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is always available
+    zstandard = None
+
+DEFAULT_CODEC = "zstd" if zstandard is not None else "gzip"
+
+# Rewrite a segment once less than this fraction of its bytes is still referenced
+COMPACT_LIVE_RATIO = 0.5
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Conversation archived with zstd; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class ConversationArchive:
+    """Segment files plus an offset index: {session_id: {segment, offset, length, codec, entry}}"""
+
+    def __init__(self, archive_dir: Path, codec: str = DEFAULT_CODEC):
+        self.archive_dir = Path(archive_dir)
+        self.index_file = self.archive_dir / "index.json"
+        self.codec = codec
+        # Reads happen in worker threads while the archive job may rewrite the index
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = self._load_index()
+        if self.archive_dir.exists():
+            remove_stale_temp_files(self.archive_dir)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self) -> None:
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.index_file, json.dumps(self._index, ensure_ascii=False).encode("utf-8"))
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Hot-index style entries (title, dates, message count, model) of archived conversations"""
+        return [{**record["entry"], "archived": True} for record in self._index.values()]
+
+    def entry(self, session_id: str) -> Optional[Dict[str, Any]]:
+        record = self._index.get(session_id)
+        return dict(record["entry"]) if record else None
+
+    def add(self, conversations: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]]) -> int:
+        """Write (conversation, index entry) pairs into a new segment (blocking); returns bytes written"""
+        records = []
+        chunks = []
+        offset = 0
+        for conversation, entry in conversations:
+            payload = compress(json.dumps(conversation, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+                               self.codec)
+            records.append((conversation["id"], offset, len(payload), entry))
+            chunks.append(payload)
+            offset += len(payload)
+        if not records:
+            return 0
+
+        segment = self._write_segment(chunks)
+        with self._lock:
+            for session_id, record_offset, length, entry in records:
+                self._index[session_id] = {
+                    "segment": segment, "offset": record_offset, "length": length,
+                    "codec": self.codec, "entry": entry
+                }
+            self._save_index()
+        return offset
+
+    def _write_segment(self, chunks: List[bytes]) -> str:
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        segment = f"segment-{uuid.uuid4().hex[:12]}.{self.codec}"
+        write_atomic(self.archive_dir / segment, b"".join(chunks))
+        return segment
+
+    def read(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Load one archived conversation (blocking)"""
+        with self._lock:
+            record = self._index.get(session_id)
+        if record is None:
+            return None
+        with open(self.archive_dir / record["segment"], "rb") as f:
+            f.seek(record["offset"])
+            data = f.read(record["length"])
+        return json.loads(decompress(data, record["codec"]))
+
+    def remove(self, session_ids: Iterable[str]) -> None:
+        """Forget archived copies (reopened or deleted conversations); segment bytes go at compaction"""
+        with self._lock:
+            removed = [self._index.pop(session_id, None) for session_id in session_ids]
+            if any(removed):
+                self._save_index()
+
+    def compact(self) -> Dict[str, int]:
+        """Rewrite mostly-dead segments and delete empty ones (blocking)"""
+        with self._lock:
+            live: Dict[str, int] = {}
+            for record in self._index.values():
+                live[record["segment"]] = live.get(record["segment"], 0) + record["length"]
+        rewritten = deleted = 0
+        for path in self.archive_dir.glob("segment-*"):
+            if path.name.endswith(TMP_SUFFIX):
+                continue
+            live_bytes = live.get(path.name, 0)
+            if live_bytes == 0:
+                path.unlink()
+                deleted += 1
+            elif live_bytes < path.stat().st_size * COMPACT_LIVE_RATIO:
+                self._rewrite(path)
+                rewritten += 1
+        return {"rewritten": rewritten, "deleted": deleted}
+
+    def _rewrite(self, path: Path) -> None:
+        """
+        Copy a segment's live records into a new segment. Records removed or
+        replaced while copying (conversation deleted or reopened) are not
+        brought back; the old segment goes once nothing refers to it
+        """
+        with self._lock:
+            snapshot = {sid: record for sid, record in self._index.items() if record["segment"] == path.name}
+        chunks = []
+        moved = {}
+        offset = 0
+        with open(path, "rb") as f:
+            for sid, record in snapshot.items():
+                f.seek(record["offset"])
+                chunks.append(f.read(record["length"]))  # still compressed: copied as-is
+                moved[sid] = {**record, "offset": offset}
+                offset += record["length"]
+        segment = self._write_segment(chunks) if chunks else None
+
+        with self._lock:
+            for sid, record in moved.items():
+                if self._index.get(sid) is snapshot[sid]:
+                    self._index[sid] = {**record, "segment": segment}
+            self._save_index()
+            still_used = any(record["segment"] == path.name for record in self._index.values())
+        if not still_used:
+            path.unlink()
+
+    def get_status(self) -> Dict[str, Any]:
+        segments = [p for p in self.archive_dir.glob("segment-*") if not p.name.endswith(TMP_SUFFIX)]
+        return {
+            "conversations": len(self._index),
+            "segments": len(segments),
+            "bytes": sum(p.stat().st_size for p in segments),
+            "codec": self.codec
+        }
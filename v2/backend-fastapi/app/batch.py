@@ -0,0 +1,329 @@
+"""
+Offline batch runs through the agent (no WebSocket)
+Reads prompts from JSONL, runs each as an agent turn (tools included) with
+bounded concurrency per provider, and appends one result line per prompt to
+an output JSONL as soon as it finishes. Rate-limited attempts pause their
+provider and are retried with backoff; the batch is the only retry layer
+(the scheduler's per-call retries are off inside batch turns). Re-running
+with the same output file resumes: prompts that already have a result are
+skipped. Batch-owned conversations are named after the output file
+(<prefix>-<run>-<id>), so one run never touches another run's conversations
+
+    python -m app.batch prompts.jsonl -o results.jsonl --concurrency 4 --provider-concurrency anthropic=2
+
+Input lines: {"id": "...", "prompt": "...", "model": "...", "session_id": "...", "metadata": {...}}
+(only "prompt" is required; the id defaults to the line number)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from .scheduler import Priority, priority, without_retries
+
+# Errors worth retrying: provider rate limits and overload/timeouts
+RATE_LIMIT_ERROR = re.compile(r"rate.?limit|\b429\b|too many requests|quota", re.IGNORECASE)
+TRANSIENT_ERROR = re.compile(r"overloaded|\b5(00|02|03|04|29)\b|timed? ?out|temporarily unavailable",
+                             re.IGNORECASE)
+
+
+@dataclass
+class BatchJob:
+    """One prompt to run"""
+    id: str
+    prompt: str
+    model: Optional[str] = None
+    session_id: Optional[str] = None  # continue an existing conversation instead of a batch-owned one
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def load_jobs(path: Path) -> List[BatchJob]:
+    """Parse the prompts JSONL (blank lines ignored, ids must be unique)"""
+    jobs = []
+    seen: Set[str] = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON ({e})")
+            if not isinstance(entry, dict) or not isinstance(entry.get("prompt"), str):
+                raise ValueError(f"{path}:{line_number}: expected an object with a \"prompt\" string")
+            job_id = str(entry.get("id", line_number))
+            if job_id in seen:
+                raise ValueError(f"{path}:{line_number}: duplicate id {job_id!r}")
+            seen.add(job_id)
+            jobs.append(BatchJob(
+                id=job_id,
+                prompt=entry["prompt"],
+                model=entry.get("model"),
+                session_id=entry.get("session_id"),
+                metadata=entry.get("metadata") or {}
+            ))
+    return jobs
+
+
+def completed_job_ids(path: Path, retry_failed: bool = False) -> Set[str]:
+    """
+    Ids that already have a result in `path`. A line cut short by a crash is
+    removed so new results append cleanly
+    """
+    if not path.exists():
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    done = set()
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if retry_failed and record.get("status") == "error":
+            done.discard(record.get("id"))
+        else:
+            done.add(record.get("id"))
+    return done
+
+
+class ResultWriter:
+    """Appends result records to a JSONL file, durably, one line per record"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def run_key(output: Path) -> str:
+    """Short stable id of a batch run: resuming into the same output file is the same run"""
+    return hashlib.sha1(str(output.resolve()).encode("utf-8")).hexdigest()[:8]
+
+
+class ProviderLane:
+    """Concurrency limit and rate-limit cooldown shared by every job on one provider"""
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.cooldown_until = 0.0
+
+    def back_off(self, delay: float) -> None:
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+
+    async def wait_for_cooldown(self) -> None:
+        while (remaining := self.cooldown_until - time.monotonic()) > 0:
+            await asyncio.sleep(remaining)
+
+
+class BatchRunner:
+    """Runs BatchJobs through a DreamyTinAgent"""
+
+    def __init__(
+        self,
+        agent,
+        concurrency: int = 4,
+        provider_concurrency: Optional[Dict[str, int]] = None,
+        max_attempts: int = 3,
+        retry_base_delay: float = 5.0,
+        session_prefix: str = "batch",
+        default_model: Optional[str] = None,
+        log=None
+    ):
+        self.agent = agent
+        self.concurrency = concurrency
+        self.provider_concurrency = provider_concurrency or {}
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.session_prefix = session_prefix
+        self.default_model = default_model
+        self.log = log or (lambda line: print(line, file=sys.stderr))
+        self._lanes: Dict[str, ProviderLane] = {}
+        self.stats = {"ok": 0, "error": 0, "budget_exhausted": 0, "retries": 0}
+        self._finished = 0
+        self._total = 0
+        self._run_key = ""
+
+    async def run(self, jobs: List[BatchJob], writer: ResultWriter, skip: Set[str] = frozenset()) -> Dict[str, Any]:
+        """Run every job not in `skip`; returns a summary"""
+        started = time.monotonic()
+        pending = [job for job in jobs if job.id not in skip]
+        self._run_key = run_key(writer.path)
+        self.log(f"{len(pending)} prompts to run, {len(jobs) - len(pending)} already done")
+        self._total = len(pending)
+        await asyncio.gather(*(self._run_job(job, writer) for job in pending))
+        return {
+            "total": len(jobs),
+            "skipped": len(jobs) - len(pending),
+            **self.stats,
+            "duration_s": round(time.monotonic() - started, 3)
+        }
+
+    def _lane(self, model_id: str) -> ProviderLane:
+        model_info = self.agent.model_config.get("models", {}).get(model_id, {})
+        provider = model_info.get("provider", "").lower()
+        if provider not in self._lanes:
+            self._lanes[provider] = ProviderLane(self.provider_concurrency.get(provider, self.concurrency))
+        return self._lanes[provider]
+
+    def _session_id(self, job: BatchJob) -> str:
+        if job.session_id:
+            return job.session_id
+        return f"{self.session_prefix}-{self._run_key}-" + re.sub(r"[^A-Za-z0-9_.-]", "_", job.id)
+
+    async def _run_job(self, job: BatchJob, writer: ResultWriter) -> None:
+        model_id = job.model or self.default_model or self.agent.agent_config.model
+        lane = self._lane(model_id)
+        started_at = datetime.utcnow().isoformat()
+        started = time.monotonic()
+
+        for attempt in range(1, self.max_attempts + 1):
+            async with lane.semaphore:
+                await lane.wait_for_cooldown()
+                result = await self._attempt(job, model_id)
+            error = result.get("error")
+            if result["status"] != "error" or attempt == self.max_attempts:
+                break
+            delay = self.retry_base_delay * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+            if RATE_LIMIT_ERROR.search(error):
+                lane.back_off(delay)  # everyone on this provider waits, not just this job
+            elif TRANSIENT_ERROR.search(error):
+                await asyncio.sleep(delay)
+            else:
+                break
+            self.stats["retries"] += 1
+            self.log(f"retrying {job.id} (attempt {attempt + 1}/{self.max_attempts}): {error}")
+
+        record = {
+            "id": job.id,
+            "model": model_id,
+            "session_id": self._session_id(job),
+            **result,
+            "attempts": attempt,
+            "started_at": started_at,
+            "finished_at": datetime.utcnow().isoformat(),
+            "duration_s": round(time.monotonic() - started, 3),
+            "metadata": job.metadata
+        }
+        writer.write(record)
+        self.stats[result["status"]] += 1
+        self._finished += 1
+        self.log(f"[{self._finished}/{self._total}] {job.id} {result['status']} {record['duration_s']:.1f}s")
+
+    async def _attempt(self, job: BatchJob, model_id: str) -> Dict[str, Any]:
+        """One agent turn; the response is the text of the turn's last model reply"""
+        session_id = self._session_id(job)
+        if not job.session_id:
+            # Batch-owned sessions start clean, so a retry or resumed run does not see a partial attempt
+            await self.agent.conversation_manager.delete_conversation(session_id)
+
+        segments = [""]
+        tool_calls: List[str] = []
+        result: Dict[str, Any] = {"status": "ok"}
+        try:
+            # Interactive turns are served first when a provider's rate limit is contended;
+            # failed calls are retried here, per prompt, not again per call by the scheduler
+            with priority(Priority.BATCH), without_retries():
+                async for event in self.agent.process_message(job.prompt, session_id=session_id, model_id=model_id):
+                    event_type = event["type"]
+                    if event_type in ("stream", "final_stream"):
+                        segments[-1] += event["content"]
+                    elif event_type == "final_response_start":
+                        segments.append("")
+                    elif event_type == "tool_call":
+                        tool_calls.append(event["tool_name"])
+                    elif event_type == "budget_exhausted":
+                        result = {"status": "budget_exhausted", "limit": event["limit"],
+                                  "error": event["message"], "usage": event["usage"]}
+                    elif event_type == "error":
+                        result = {"status": "error", "error": event["error"]}
+        except Exception as e:
+            result = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+
+        result["response"] = next((text for text in reversed(segments) if text), "")
+        result["tool_calls"] = tool_calls
+        return result
+
+
+def parse_provider_concurrency(values: List[str]) -> Dict[str, int]:
+    limits = {}
+    for value in values:
+        provider, _, limit = value.partition("=")
+        if not limit.isdigit() or int(limit) < 1:
+            raise argparse.ArgumentTypeError(f"expected provider=N, got {value!r}")
+        limits[provider.lower()] = int(limit)
+    return limits
+
+
+async def amain(args: argparse.Namespace) -> int:
+    from dotenv import load_dotenv
+    from .agent import DreamyTinAgent
+    from .tracing import tracer
+
+    # Same environment as the server (API keys live in the repository root .env)
+    load_dotenv(Path(__file__).resolve().parents[3] / ".env")
+    tracer.configure_from_env()
+
+    jobs = load_jobs(args.prompts)
+    output = args.output or args.prompts.with_name(args.prompts.stem + ".results.jsonl")
+    skip = completed_job_ids(output, retry_failed=args.retry_failed)
+
+    runner = BatchRunner(
+        DreamyTinAgent(),
+        concurrency=args.concurrency,
+        provider_concurrency=parse_provider_concurrency(args.provider_concurrency),
+        max_attempts=args.max_attempts,
+        retry_base_delay=args.retry_delay,
+        session_prefix=args.session_prefix,
+        default_model=args.model
+    )
+    writer = ResultWriter(output)
+    try:
+        summary = await runner.run(jobs, writer, skip)
+    finally:
+        writer.close()
+        tracer.shutdown()
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary["error"] else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a JSONL file of prompts through the agent")
+    parser.add_argument("prompts", type=Path, help="Input JSONL, one {\"prompt\": ...} object per line")
+    parser.add_argument("-o", "--output", type=Path,
+                        help="Result JSONL, appended to and resumed from (default: <prompts>.results.jsonl)")
+    parser.add_argument("--model", help="Model id for prompts that do not name one (default: the configured default)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent turns per provider")
+    parser.add_argument("--provider-concurrency", action="append", default=[], metavar="PROVIDER=N",
+                        help="Per-provider override, e.g. anthropic=2 (repeatable)")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per prompt on rate limits/transient errors")
+    parser.add_argument("--retry-delay", type=float, default=5.0, help="Base backoff in seconds (doubles per attempt)")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run prompts whose recorded result is an error")
+    parser.add_argument("--session-prefix", default="batch", help="Conversation id prefix for batch-owned sessions")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(amain(args)))
+
+
+if __name__ == "__main__":
+    main()
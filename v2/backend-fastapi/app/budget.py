@@ -0,0 +1,227 @@
+"""
+Per-turn budgets for the agent tool loop
+A turn may use bounded wall-clock time, tokens, tool calls, cost and LLM
+iterations (configured under "turnBudget" in models.json, globally and per
+model). The controller also stops runaway loops: a response whose tool calls
+all repeat earlier ones, or a cycle of calls that differ only in numeric or
+flag arguments (re-reading the same files in turn)
+"""
+
+import os
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# camelCase key in models.json -> TurnBudget field
+BUDGET_KEYS = {
+    "maxWallClockSeconds": "max_wall_clock_s",
+    "maxTotalTokens": "max_total_tokens",
+    "maxToolCalls": "max_tool_calls",
+    "maxCostUsd": "max_cost_usd",
+    "maxIterations": "max_iterations"
+}
+
+ToolCall = Tuple[str, Dict[str, Any]]
+
+
+def call_cost(pricing: Dict[str, float], prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of one completion from {"input": USD, "output": USD} per 1K tokens"""
+    return (prompt_tokens * pricing.get("input", 0.0) + completion_tokens * pricing.get("output", 0.0)) / 1000
+
+
+@dataclass(frozen=True)
+class TurnBudget:
+    """Limits for one user turn; None means unlimited"""
+    max_wall_clock_s: Optional[float] = 180.0
+    max_total_tokens: Optional[int] = 600000
+    max_tool_calls: Optional[int] = 30
+    max_cost_usd: Optional[float] = 0.5
+    max_iterations: Optional[int] = 10
+
+    @classmethod
+    def for_model(cls, model_config: Dict[str, Any], model_id: str) -> "TurnBudget":
+        """Built-in defaults, overridden by the global then the per-model "turnBudget" entries"""
+        values = {f.name: f.default for f in fields(cls)}
+        model_info = model_config.get("models", {}).get(model_id, {})
+        for overrides in (model_config.get("turnBudget"), model_info.get("turnBudget")):
+            for key, value in (overrides or {}).items():
+                if key in BUDGET_KEYS:
+                    values[BUDGET_KEYS[key]] = value
+        return cls(**values)
+
+
+@dataclass(frozen=True)
+class BudgetExhausted:
+    """Why a turn was stopped"""
+    limit: str  # wall_clock | tokens | tool_calls | cost | iterations | loop
+    message: str
+    used: Any = None
+    maximum: Any = None
+
+    def to_event(self, model_id: str, usage: Dict[str, Any]) -> Dict[str, Any]:
+        """budget_exhausted event for the WebSocket stream"""
+        return {
+            "type": "budget_exhausted",
+            "limit": self.limit,
+            "message": self.message,
+            "used": self.used,
+            "maximum": self.maximum,
+            "usage": usage,
+            "model": model_id,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+
+def _normalize_value(key: str, value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+        if key == "path" or key.endswith("_path"):
+            value = os.path.normpath(value) if value else value
+    return value
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class LoopDetector:
+    """Spots tool-call patterns that suggest the model is going round in circles"""
+
+    def __init__(
+        self,
+        normalize: Optional[Callable[[str, Dict[str, Any]], Dict[str, Any]]] = None,
+        cycle_repeats: int = 3,
+        max_cycle_length: int = 4
+    ):
+        # Tool-aware argument normalization (defaults filled in, values coerced)
+        self.normalize = normalize or (lambda name, arguments: arguments)
+        self.cycle_repeats = cycle_repeats
+        self.max_cycle_length = max_cycle_length
+        self._seen: set = set()
+        self._targets: List[Hashable] = []
+
+    def keys(self, name: str, arguments: Dict[str, Any]) -> Tuple[Hashable, Hashable]:
+        """(call key, target key): target ignores numeric and boolean arguments"""
+        normalized = {k: _normalize_value(k, v) for k, v in self.normalize(name, arguments).items()}
+        call_key = (name, _freeze(normalized))
+        target_key = (name, _freeze({
+            k: v for k, v in normalized.items()
+            if v is not None and not isinstance(v, (bool, int, float))
+        }))
+        return call_key, target_key
+
+    def observe(self, calls: List[ToolCall]) -> Optional[str]:
+        """Record one response's tool calls; returns a description if they look like a loop"""
+        if not calls:
+            return None
+        keys = [self.keys(name, arguments) for name, arguments in calls]
+
+        if all(call_key in self._seen for call_key, _ in keys):
+            names = ", ".join(name for name, _ in calls)
+            return f"the model repeated tool calls it already made this turn ({names})"
+
+        for call_key, target_key in keys:
+            self._seen.add(call_key)
+            self._targets.append(target_key)
+        return self._find_cycle()
+
+    def _find_cycle(self) -> Optional[str]:
+        targets = self._targets
+        for length in range(1, self.max_cycle_length + 1):
+            span = length * self.cycle_repeats
+            if len(targets) < span:
+                break
+            pattern = targets[-length:]
+            if all(targets[-span + i] == pattern[i % length] for i in range(span)):
+                names = " -> ".join(name for name, _ in pattern)
+                return (f"the model cycled through the same {length} tool call(s) "
+                        f"{self.cycle_repeats} times ({names})")
+        return None
+
+
+class BudgetController:
+    """Tracks one turn's spending against its TurnBudget"""
+
+    def __init__(
+        self,
+        budget: TurnBudget,
+        pricing: Optional[Dict[str, float]] = None,
+        loop_detector: Optional[LoopDetector] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.budget = budget
+        self.pricing = pricing  # {"input": USD, "output": USD} per 1K tokens
+        self.loop_detector = loop_detector or LoopDetector()
+        self.clock = clock
+        self.started_at = clock()
+        self.iterations = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_calls = 0
+        self.cost_usd = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def elapsed_s(self) -> float:
+        return self.clock() - self.started_at
+
+    def record_llm_call(self, prompt_tokens: int, completion_tokens: int) -> None:
+        """Add one completion's token usage (and its cost, when the model is priced)"""
+        self.llm_calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if self.pricing:
+            self.cost_usd += call_cost(self.pricing, prompt_tokens, completion_tokens)
+
+    def start_iteration(self) -> None:
+        self.iterations += 1
+
+    def check(self) -> Optional[BudgetExhausted]:
+        """Whether another LLM call is allowed"""
+        budget = self.budget
+        if budget.max_wall_clock_s is not None and self.elapsed_s >= budget.max_wall_clock_s:
+            return BudgetExhausted("wall_clock", f"Turn time limit of {budget.max_wall_clock_s:g}s reached",
+                                   round(self.elapsed_s, 1), budget.max_wall_clock_s)
+        if budget.max_total_tokens is not None and self.total_tokens >= budget.max_total_tokens:
+            return BudgetExhausted("tokens", f"Turn token limit of {budget.max_total_tokens} reached",
+                                   self.total_tokens, budget.max_total_tokens)
+        if budget.max_cost_usd is not None and self.cost_usd >= budget.max_cost_usd:
+            return BudgetExhausted("cost", f"Turn cost limit of ${budget.max_cost_usd:g} reached",
+                                   round(self.cost_usd, 6), budget.max_cost_usd)
+        if budget.max_iterations is not None and self.iterations >= budget.max_iterations:
+            return BudgetExhausted("iterations", f"Maximum tool execution iterations ({budget.max_iterations}) reached",
+                                   self.iterations, budget.max_iterations)
+        return None
+
+    def admit_tool_calls(self, calls: List[ToolCall]) -> Optional[BudgetExhausted]:
+        """Check a response's tool calls against the tool budget and loop detection; counts them if allowed"""
+        maximum = self.budget.max_tool_calls
+        if maximum is not None and self.tool_calls + len(calls) > maximum:
+            return BudgetExhausted("tool_calls", f"Turn tool call limit of {maximum} reached",
+                                   self.tool_calls, maximum)
+        loop = self.loop_detector.observe(calls)
+        if loop:
+            return BudgetExhausted("loop", f"Stopped a tool loop: {loop}")
+        self.tool_calls += len(calls)
+        return None
+
+    def usage(self) -> Dict[str, Any]:
+        """What the turn has used so far"""
+        return {
+            "elapsed_s": round(self.elapsed_s, 3),
+            "llm_calls": self.llm_calls,
+            "iterations": self.iterations,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tool_calls": self.tool_calls,
+            "cost_usd": round(self.cost_usd, 6) if self.pricing else None
+        }
@@ -0,0 +1,131 @@
+"""
+Model capability registry
+Built once per config load from models.json: provider defaults, overridden by
+each model's "contextWindow", "maxOutputTokens" and "capabilities" entries.
+The agent asks the registry what a model supports instead of guessing from
+its id, and derives the request parameters (max_tokens, tools, parallel tool
+calls, usage chunks, prompt caching) from it
+"""
+
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, List, Optional
+
+# camelCase key under a model's "capabilities" in models.json -> ModelCapabilities field
+CAPABILITY_KEYS = {
+    "tools": "tools",
+    "parallelToolCalls": "parallel_tool_calls",
+    "streaming": "streaming",
+    "streamUsage": "stream_usage",
+    "promptCaching": "prompt_caching"
+}
+
+# Output tokens reserved when a model sets no maxOutputTokens
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+DEFAULT_CONTEXT_WINDOW = 32000
+
+
+@dataclass(frozen=True)
+class ModelCapabilities:
+    """What one model supports and the limits requests must respect"""
+    model_id: str
+    provider: str = ""
+    litellm_model: str = ""
+    tools: bool = False
+    # Accepts the parallel_tool_calls request parameter
+    parallel_tool_calls: bool = False
+    streaming: bool = True
+    # Sends a trailing usage chunk when asked with stream_options
+    stream_usage: bool = True
+    # Honours cache_control breakpoints on the system prompt (OpenAI caches prefixes automatically)
+    prompt_caching: bool = False
+    context_window: int = DEFAULT_CONTEXT_WINDOW
+    max_output_tokens: int = DEFAULT_MAX_OUTPUT_TOKENS
+
+    @property
+    def input_tokens(self) -> int:
+        """Context left for the prompt once the response's max_tokens is reserved"""
+        return max(self.context_window - self.max_output_tokens, self.context_window // 2)
+
+    def completion_params(self, stream: bool, tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Request parameters for this model, apart from the messages"""
+        params: Dict[str, Any] = {
+            "model": self.litellm_model,
+            "stream": stream,
+            "temperature": 0.7,
+            "max_tokens": self.max_output_tokens
+        }
+        if stream and self.stream_usage:
+            # Token usage arrives in a final chunk (recorded on the llm.completion span)
+            params["stream_options"] = {"include_usage": True}
+        if self.tools and tools:
+            params["tools"] = tools
+            params["tool_choice"] = "auto"
+            if self.parallel_tool_calls:
+                params["parallel_tool_calls"] = True
+        return params
+
+    def prepare_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Mark the system prompt as a cache breakpoint where the provider supports it"""
+        if not (self.prompt_caching and messages and messages[0]["role"] == "system"
+                and isinstance(messages[0]["content"], str)):
+            return messages
+        system = {**messages[0], "content": [
+            {"type": "text", "text": messages[0]["content"], "cache_control": {"type": "ephemeral"}}
+        ]}
+        return [system, *messages[1:]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        del data["model_id"], data["litellm_model"]
+        return data
+
+
+# Defaults per provider; a model's own config entries take precedence
+PROVIDER_DEFAULTS = {
+    "openai": ModelCapabilities("", "openai", tools=True, parallel_tool_calls=True,
+                                max_output_tokens=32768),
+    "anthropic": ModelCapabilities("", "anthropic", tools=True, prompt_caching=True,
+                                   max_output_tokens=8192),
+    "google": ModelCapabilities("", "google", tools=True, max_output_tokens=8192),
+}
+
+
+def litellm_model_name(model_info: Dict[str, Any], model_id: str) -> str:
+    """LiteLLM model string from the configured model name"""
+    model_name = model_info.get("name", model_id)
+    if model_info.get("provider", "").lower() == "google":
+        # Google models need "gemini/" prefix in LiteLLM
+        return f"gemini/{model_name}"
+    # OpenAI and Anthropic models use their names directly
+    return model_name
+
+
+def model_capabilities(model_id: str, model_info: Dict[str, Any]) -> ModelCapabilities:
+    """Capabilities of one configured model"""
+    provider = model_info.get("provider", "").lower()
+    base = PROVIDER_DEFAULTS.get(provider, ModelCapabilities("", provider))
+    overrides: Dict[str, Any] = {
+        CAPABILITY_KEYS[key]: bool(value)
+        for key, value in (model_info.get("capabilities") or {}).items()
+        if key in CAPABILITY_KEYS
+    }
+    # "maxTokens" is the context window in older configs
+    context_window = model_info.get("contextWindow", model_info.get("maxTokens"))
+    if context_window:
+        overrides["context_window"] = int(context_window)
+    if model_info.get("maxOutputTokens"):
+        overrides["max_output_tokens"] = int(model_info["maxOutputTokens"])
+    return replace(base, model_id=model_id, litellm_model=litellm_model_name(model_info, model_id), **overrides)
+
+
+def build_capabilities(model_config: Dict[str, Any]) -> Dict[str, ModelCapabilities]:
+    """Capability table for every configured model"""
+    return {
+        model_id: model_capabilities(model_id, model_info)
+        for model_id, model_info in model_config.get("models", {}).items()
+    }
+
+
+def unknown_model(model_id: str) -> ModelCapabilities:
+    """Conservative capabilities for a model id missing from the config: plain streamed text"""
+    return ModelCapabilities(model_id, litellm_model=model_id)
@@ -0,0 +1,227 @@
+"""
+Configuration management with hot reload
+Resolves the system prompt, model config and pricing to absolute paths, watches them
+for changes and atomically swaps in a freshly parsed snapshot
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .capabilities import ModelCapabilities, build_capabilities
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PROJECT_ROOT = BACKEND_DIR.parent.parent
+
+DEFAULT_SYSTEM_PROMPT_PATH = PROJECT_ROOT / "data" / "system-prompt.md"
+DEFAULT_MODEL_CONFIG_PATH = BACKEND_DIR.parent / "shared" / "config" / "models.json"
+DEFAULT_PRICING_PATH = BACKEND_DIR.parent / "shared" / "config" / "pricing.json"
+
+DEFAULT_SYSTEM_PROMPT = "You are DreamyTin AI, a helpful personal assistant."
+DEFAULT_MODEL_CONFIG = {
+    "defaultModel": "claude-3.5-haiku",
+    "models": {}
+}
+
+# (mtime_ns, size) of a watched file, None when it does not exist
+FileStamp = Optional[Tuple[int, int]]
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable view of the parsed configuration, swapped as a whole on reload"""
+    system_prompt: str
+    model_config: Dict[str, Any]
+    tools: List[Dict[str, Any]]
+    version: str
+    # model id -> {"input": USD, "output": USD} per 1K tokens
+    pricing: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    # model id -> what the model supports, precomputed from model_config
+    capabilities: Dict[str, ModelCapabilities] = field(default_factory=dict)
+    loaded_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+
+class ConfigManager:
+    """Loads, watches and hot-reloads the system prompt and model configuration"""
+
+    def __init__(
+        self,
+        system_prompt_path: Optional[Path] = None,
+        model_config_path: Optional[Path] = None,
+        tools_builder: Optional[Callable[[], List[Dict[str, Any]]]] = None,
+        poll_interval: float = 1.0,
+        pricing_path: Optional[Path] = None
+    ):
+        self.system_prompt_path = Path(system_prompt_path or DEFAULT_SYSTEM_PROMPT_PATH).resolve()
+        self.model_config_path = Path(model_config_path or DEFAULT_MODEL_CONFIG_PATH).resolve()
+        self.pricing_path = Path(pricing_path or DEFAULT_PRICING_PATH).resolve()
+        self.tools_builder = tools_builder or (lambda: [])
+        self.poll_interval = poll_interval
+
+        self.reload_count = 0
+        self.last_error: Optional[str] = None
+        self._listeners: List[Callable[[ConfigSnapshot], None]] = []
+        self._watch_task: Optional[asyncio.Task] = None
+        self._reload_lock = asyncio.Lock()
+
+        self._stamps = self._current_stamps()
+        self._snapshot = self._build_snapshot()
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """Current configuration snapshot (a single reference read, safe mid-request)"""
+        return self._snapshot
+
+    @property
+    def watched_paths(self) -> List[Path]:
+        """Absolute paths of the watched configuration files"""
+        return [self.system_prompt_path, self.model_config_path, self.pricing_path]
+
+    def add_listener(self, listener: Callable[[ConfigSnapshot], None]) -> None:
+        """Register a callback invoked with every newly swapped-in snapshot"""
+        self._listeners.append(listener)
+
+    def _load_system_prompt(self) -> Tuple[str, bytes]:
+        """Read the system prompt, falling back to the built-in default"""
+        try:
+            raw = self.system_prompt_path.read_bytes()
+        except FileNotFoundError:
+            return DEFAULT_SYSTEM_PROMPT, b""
+        return raw.decode("utf-8"), raw
+
+    def _load_model_config(self) -> Tuple[Dict[str, Any], bytes]:
+        """Read and parse the model configuration, falling back to the default"""
+        try:
+            raw = self.model_config_path.read_bytes()
+        except FileNotFoundError:
+            return dict(DEFAULT_MODEL_CONFIG), b""
+        return json.loads(raw), raw
+
+    def _load_pricing(self) -> Tuple[Dict[str, Dict[str, float]], bytes]:
+        """Read per-model token prices (empty when the file is missing)"""
+        try:
+            raw = self.pricing_path.read_bytes()
+        except FileNotFoundError:
+            return {}, b""
+        return json.loads(raw).get("pricing", {}), raw
+
+    def _build_snapshot(self) -> ConfigSnapshot:
+        """Parse the config files and rebuild tool definitions into a new snapshot"""
+        system_prompt, prompt_raw = self._load_system_prompt()
+        model_config, config_raw = self._load_model_config()
+        pricing, pricing_raw = self._load_pricing()
+
+        digest = hashlib.sha256()
+        for raw in (prompt_raw, config_raw, pricing_raw):
+            digest.update(raw)
+            digest.update(b"\0")
+
+        return ConfigSnapshot(
+            system_prompt=system_prompt,
+            model_config=model_config,
+            tools=self.tools_builder(),
+            version=digest.hexdigest()[:12],
+            pricing=pricing,
+            capabilities=build_capabilities(model_config)
+        )
+
+    def _stamp(self, path: Path) -> FileStamp:
+        """Cheap change detector for a single file"""
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _current_stamps(self) -> Tuple[FileStamp, ...]:
+        return tuple(self._stamp(path) for path in self.watched_paths)
+
+    async def reload(self, force: bool = False) -> bool:
+        """
+        Re-read configuration off the event loop and swap it in atomically.
+        Returns True if a new snapshot was installed.
+        """
+        async with self._reload_lock:
+            stamps = self._current_stamps()
+            if not force and stamps == self._stamps:
+                return False
+
+            try:
+                snapshot = await asyncio.to_thread(self._build_snapshot)
+            except Exception as e:
+                # Keep serving the last good config (e.g. half-written JSON or a wrongly shaped file)
+                self.last_error = str(e)
+                logger.warning(f"Config reload failed, keeping version {self._snapshot.version}: {e}")
+                return False
+
+            self._stamps = stamps
+            self.last_error = None
+            if snapshot.version == self._snapshot.version and not force:
+                return False
+
+            self._snapshot = snapshot
+            self.reload_count += 1
+            logger.info(f"Config reloaded: version {snapshot.version} (reload #{self.reload_count})")
+
+            for listener in self._listeners:
+                try:
+                    listener(snapshot)
+                except Exception as e:
+                    logger.error(f"Config listener failed: {e}")
+            return True
+
+    async def _watch_with_watchfiles(self) -> None:
+        """Watch config directories using inotify/FSEvents via watchfiles"""
+        from watchfiles import awatch
+
+        directories = {str(path.parent) for path in self.watched_paths if path.parent.exists()}
+        watched = {str(path) for path in self.watched_paths}
+        async for changes in awatch(*directories):
+            if any(changed_path in watched for _, changed_path in changes):
+                await self.reload()
+
+    async def _watch_with_polling(self) -> None:
+        """Poll file stamps at a fixed interval"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.reload()
+
+    async def _watch(self) -> None:
+        try:
+            await self._watch_with_watchfiles()
+        except ImportError:
+            logger.info("watchfiles not installed, polling config files for changes")
+            await self._watch_with_polling()
+
+    def start_watching(self) -> None:
+        """Start the background watcher on the running event loop"""
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self) -> None:
+        """Stop the background watcher"""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Config status for the health endpoint"""
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at,
+            "reload_count": self.reload_count,
+            "watching": self._watch_task is not None and not self._watch_task.done(),
+            "last_error": self.last_error
+        }
@@ -3,14 +3,72 @@ Conversation Manager for file-based storage
 Handles conversation persistence using JSON files in data/conversations/
 """
 
+import asyncio
 import json
-from datetime import datetime
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 import aiofiles
 
+from .archive import ConversationArchive
+from .durable import DurableWriter, remove_stale_temp_files
+from .loop_monitor import in_phase
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+CORRUPT_SUFFIX = ".corrupt"
+
+# Rough size of a conversation in tokens for the index (~4 characters per token)
+CHARS_PER_TOKEN = 4
+
+
+def conversation_title(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """First 50 characters of the first user message, None if there is none yet"""
+    first_user_msg = next((msg for msg in messages if msg["role"] == "user"), None)
+    if not first_user_msg:
+        return None
+    title = first_user_msg["content"][:50].strip()
+    if len(first_user_msg["content"]) > 50:
+        title += "..."
+    return title
+
+
+def conversation_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimated tokens of message contents and tool call arguments"""
+    chars = 0
+    for msg in messages:
+        content = msg.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif content:
+            chars += len(json.dumps(content, ensure_ascii=False))
+        for tool_call in msg.get("tool_calls") or ():
+            chars += len(tool_call.get("function", {}).get("arguments") or "")
+    return chars // CHARS_PER_TOKEN
+
+
+def index_entry(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """Index entry derived from a conversation file"""
+    messages = conversation.get("messages", [])
+    return {
+        "id": conversation["id"],
+        "title": conversation_title(messages) or "New conversation",
+        "created_at": conversation["created_at"],
+        "updated_at": conversation["updated_at"],
+        "message_count": len(messages),
+        "token_count": conversation_tokens(messages),
+        "model": conversation.get("model")
+    }
+
+
 class ConversationManager:
-    def __init__(self, conversations_dir: str = None):
+    def __init__(self, conversations_dir: str = None, fsync_policy: Optional[str] = None):
         """Initialize conversation manager with file-based storage"""
         if conversations_dir is None:
             # Use same data directory as v1 (relative to project root)
@@ -23,8 +81,22 @@ class ConversationManager:
         # Ensure directory exists
         self.conversations_dir.mkdir(parents=True, exist_ok=True)
         
+        # Atomic temp-file + rename writes; fsync policy from CONVERSATION_FSYNC by default
+        self.writer = DurableWriter(fsync_policy)
+        
+        # Sessions whose files failed to parse (moved aside to <id>.json.corrupt)
+        self.corrupted: Dict[str, str] = {}
+        self.last_recovery: Optional[Dict[str, Any]] = None
+        
         # Load index on startup
         self._index = self._load_index()
+        # Index writes run in worker threads; a snapshot older than the one on disk is skipped
+        self._index_version = 0
+        self._index_written = 0
+        self._index_write_lock = threading.Lock()
+        
+        # Idle conversations move to compressed segments under archive/
+        self.archive = ConversationArchive(self.conversations_dir / "archive")
     
     def _load_index(self) -> Dict[str, Any]:
         """Load conversation index from file"""
@@ -37,11 +109,21 @@ class ConversationManager:
         except (json.JSONDecodeError, FileNotFoundError):
             return {"conversations": []}
     
-    def _save_index(self) -> None:
-        """Save conversation index to file"""
-        with open(self.index_file, 'w', encoding='utf-8') as f:
-            json.dump(self._index, f, indent=2, ensure_ascii=False)
+    async def _save_index(self) -> None:
+        """Save conversation index to file (the write and any fsync run off the event loop)"""
+        self._index_version += 1
+        data = json.dumps(self._index, indent=2, ensure_ascii=False).encode('utf-8')
+        await asyncio.to_thread(self._write_index, self._index_version, data)
+    
+    def _write_index(self, version: int, data: bytes) -> None:
+        with self._index_write_lock:
+            if version < self._index_written:
+                return
+            self.writer.write(self.index_file, data)
+            self._index_written = version
     
+    @traced("persistence.create_conversation")
+    @in_phase("persistence")
     async def create_conversation(self, session_id: str, model: str = "claude-3.5-haiku") -> Dict[str, Any]:
         """Create a new conversation"""
         now = datetime.utcnow().isoformat() + 'Z'
@@ -61,38 +143,62 @@ class ConversationManager:
             "created_at": now,
             "updated_at": now,
             "message_count": 0,
+            "token_count": 0,
             "model": model
         }
         
+        # Replaces the entry of a conversation whose file was lost or quarantined
+        self._index["conversations"] = [
+            conv for conv in self._index["conversations"]
+            if conv["id"] != session_id
+        ]
         self._index["conversations"].append(index_entry)
-        self._save_index()
+        await self._save_index()
         
         # Save conversation file
         await self._save_conversation(conversation)
         
         return conversation
     
+    @traced("persistence.get_conversation")
+    @in_phase("persistence")
     async def get_conversation(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Load conversation from file"""
         conversation_file = self.conversations_dir / f"{session_id}.json"
         
         if not conversation_file.exists():
+            if session_id in self.archive:
+                return await asyncio.to_thread(self.archive.read, session_id)
             return None
         
         try:
             async with aiofiles.open(conversation_file, 'r', encoding='utf-8') as f:
                 content = await f.read()
                 return json.loads(content)
-        except (json.JSONDecodeError, FileNotFoundError):
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            self._quarantine(session_id, conversation_file, e)
             return None
     
+    def _quarantine(self, session_id: str, conversation_file: Path, error: Exception) -> None:
+        """Move an unreadable conversation file aside so a new conversation cannot overwrite it"""
+        target = conversation_file.with_name(conversation_file.name + CORRUPT_SUFFIX)
+        try:
+            os.replace(conversation_file, target)
+        except FileNotFoundError:
+            return
+        self.corrupted[session_id] = str(error)
+        logger.warning("Conversation %s is corrupted (%s); moved to %s", session_id, error, target.name)
+    
     async def _save_conversation(self, conversation: Dict[str, Any]) -> None:
         """Save conversation to file"""
         conversation_file = self.conversations_dir / f"{conversation['id']}.json"
-        
-        async with aiofiles.open(conversation_file, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(conversation, indent=2, ensure_ascii=False))
+        data = json.dumps(conversation, indent=2, ensure_ascii=False).encode('utf-8')
+        await asyncio.to_thread(self.writer.write, conversation_file, data)
     
+    @traced("persistence.add_message")
+    @in_phase("persistence")
     async def add_message(self, session_id: str, role: str, content: str, **kwargs) -> bool:
         """Add a message to conversation"""
         conversation = await self.get_conversation(session_id)
@@ -113,40 +219,57 @@ class ConversationManager:
         conversation["messages"].append(message)
         conversation["updated_at"] = message["timestamp"]
         
+        # Save conversation (a reopened archived conversation goes back to the hot tier)
+        await self._save_conversation(conversation)
+        
+        archived = session_id in self.archive
+        if archived:
+            self._restore_index_entry(session_id)
+        
         # Update index
-        self._update_index_entry(session_id, conversation)
+        await self._update_index_entry(session_id, conversation)
         
-        # Save conversation
-        await self._save_conversation(conversation)
+        # Drop the archive record last: a crash before this point leaves a copy in both tiers, never in neither
+        if archived:
+            await asyncio.to_thread(self.archive.remove, [session_id])
         
         return True
     
-    def _update_index_entry(self, session_id: str, conversation: Dict[str, Any]) -> None:
+    def _restore_index_entry(self, session_id: str) -> None:
+        """Move an archived conversation's index entry back into the hot index"""
+        entry = self.archive.entry(session_id)
+        if entry and not any(conv["id"] == session_id for conv in self._index["conversations"]):
+            self._index["conversations"].append(entry)
+    
+    async def _update_index_entry(self, session_id: str, conversation: Dict[str, Any]) -> None:
         """Update conversation in index"""
         for entry in self._index["conversations"]:
             if entry["id"] == session_id:
                 # Update title based on first user message if still "New conversation"
-                if entry["title"] == "New conversation" and conversation["messages"]:
-                    first_user_msg = next((msg for msg in conversation["messages"] if msg["role"] == "user"), None)
-                    if first_user_msg:
-                        # Use first 50 characters of first user message as title
-                        title = first_user_msg["content"][:50].strip()
-                        if len(first_user_msg["content"]) > 50:
-                            title += "..."
-                        entry["title"] = title
+                if entry["title"] == "New conversation":
+                    entry["title"] = conversation_title(conversation["messages"]) or entry["title"]
                 
                 entry["updated_at"] = conversation["updated_at"]
                 entry["message_count"] = len(conversation["messages"])
+                entry["token_count"] = conversation_tokens(conversation["messages"])
                 entry["model"] = conversation.get("model", entry["model"])
                 break
         
-        self._save_index()
+        await self._save_index()
     
-    async def list_conversations(self) -> List[Dict[str, Any]]:
+    @traced("persistence.list_conversations")
+    @in_phase("persistence")
+    async def list_conversations(self, include_archived: bool = False) -> List[Dict[str, Any]]:
         """Get list of all conversations sorted by updated_at (newest first)"""
         conversations = self._index.get("conversations", [])
+        if include_archived:
+            # A conversation reopened just before a crash can still have an archive record; the hot one wins
+            hot = {conv["id"] for conv in conversations}
+            conversations = conversations + [entry for entry in self.archive.entries() if entry["id"] not in hot]
         return sorted(conversations, key=lambda x: x["updated_at"], reverse=True)
     
+    @traced("persistence.delete_conversation")
+    @in_phase("persistence")
     async def delete_conversation(self, session_id: str) -> bool:
         """Delete conversation and its file"""
         # Remove from index
@@ -154,7 +277,11 @@ class ConversationManager:
             conv for conv in self._index["conversations"] 
             if conv["id"] != session_id
         ]
-        self._save_index()
+        await self._save_index()
+        
+        archived = session_id in self.archive
+        if archived:
+            await asyncio.to_thread(self.archive.remove, [session_id])
         
         # Delete file
         conversation_file = self.conversations_dir / f"{session_id}.json"
@@ -162,8 +289,129 @@ class ConversationManager:
             conversation_file.unlink()
             return True
         
-        return False
+        return archived
+    
+    @traced("persistence.recover")
+    async def recover(self) -> Dict[str, Any]:
+        """Rebuild the index from the conversation files on disk and report corrupted sessions"""
+        started = time.perf_counter()
+        scanned, corrupted, temp_files_removed = await asyncio.to_thread(self._scan_files)
+        
+        # Merge on the event loop: conversations written while the scan ran keep their live entry
+        current = {entry["id"]: entry for entry in self._index["conversations"]}
+        rebuilt, added, updated = [], 0, 0
+        for session_id, entry in scanned.items():
+            existing = current.pop(session_id, None)
+            if existing is None:
+                if not (self.conversations_dir / f"{session_id}.json").exists():
+                    continue  # archived or deleted during the scan
+                added += 1
+            elif existing["updated_at"] > entry["updated_at"]:
+                entry = existing
+            elif existing != entry:
+                updated += 1
+            rebuilt.append(entry)
+        removed = 0
+        for session_id, entry in current.items():
+            if session_id not in corrupted and (self.conversations_dir / f"{session_id}.json").exists():
+                rebuilt.append(entry)  # created during the scan
+            else:
+                removed += 1
+        
+        self._index["conversations"] = rebuilt
+        await self._save_index()
+        
+        self.corrupted.update(corrupted)
+        for session_id, error in corrupted.items():
+            logger.warning("Conversation %s is corrupted (%s); moved to %s.json%s",
+                           session_id, error, session_id, CORRUPT_SUFFIX)
+        self.last_recovery = {
+            "scanned": len(scanned) + len(corrupted),
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+            "corrupted": sorted(corrupted),
+            "temp_files_removed": temp_files_removed,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        return self.last_recovery
+    
+    def _scan_files(self):
+        """Parse every conversation file in parallel (blocking); quarantines unreadable ones"""
+        temp_files_removed = remove_stale_temp_files(self.conversations_dir)
+        paths = [p for p in self.conversations_dir.glob("*.json") if p != self.index_file]
+        
+        def read(path: Path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return path, index_entry(json.load(f)), None
+            except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError) as e:
+                return path, None, e
+            except FileNotFoundError:
+                return path, None, None
+        
+        scanned, corrupted = {}, {}
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4)) as pool:
+            for path, entry, error in pool.map(read, paths):
+                if entry is not None:
+                    scanned[entry["id"]] = entry
+                elif error is not None:
+                    os.replace(path, path.with_name(path.name + CORRUPT_SUFFIX))
+                    corrupted[path.stem] = str(error)
+        return scanned, corrupted, temp_files_removed
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "conversations": len(self._index["conversations"]),
+            "durability": self.writer.get_status(),
+            "corrupted": sorted(self.corrupted),
+            "last_recovery": self.last_recovery,
+            "archive": self.archive.get_status()
+        }
+    
+    @traced("persistence.archive_idle")
+    async def archive_idle(self, older_than_days: float) -> Dict[str, Any]:
+        """Move conversations not updated for `older_than_days` into the compressed archive"""
+        cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).isoformat() + 'Z'
+        candidates = [dict(entry) for entry in self._index["conversations"] if entry["updated_at"] < cutoff]
+        
+        pairs = []
+        for entry in candidates:
+            conversation = await self.get_conversation(entry["id"])
+            if conversation is not None:
+                pairs.append((conversation, entry))
+        if not pairs:
+            return {"archived": 0, "bytes_freed": 0, "bytes_written": 0}
+        
+        # Compression and the segment write run off the event loop
+        bytes_written = await asyncio.to_thread(self.archive.add, pairs)
+        
+        # Only drop hot copies that did not change while the segment was written
+        current = {entry["id"]: entry["updated_at"] for entry in self._index["conversations"]}
+        archived, changed, bytes_freed = set(), [], 0
+        for conversation, entry in pairs:
+            session_id = conversation["id"]
+            if current.get(session_id) != entry["updated_at"]:
+                changed.append(session_id)
+                continue
+            conversation_file = self.conversations_dir / f"{session_id}.json"
+            if conversation_file.exists():
+                bytes_freed += conversation_file.stat().st_size
+                conversation_file.unlink()
+            archived.add(session_id)
+        if changed:
+            await asyncio.to_thread(self.archive.remove, changed)
+        
+        self._index["conversations"] = [
+            conv for conv in self._index["conversations"]
+            if conv["id"] not in archived
+        ]
+        await self._save_index()
+        
+        return {"archived": len(archived), "bytes_freed": bytes_freed, "bytes_written": bytes_written}
     
+    @traced("persistence.get_conversation_messages")
+    @in_phase("persistence")
     async def get_conversation_messages(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get messages for a conversation with optional limit"""
         conversation = await self.get_conversation(session_id)
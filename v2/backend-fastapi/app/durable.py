@@ -0,0 +1,133 @@
+"""
+Crash-safe file writes
+Files are replaced atomically: data goes to a temp file next to the target,
+which is fsynced and then renamed over it, so a crash or power loss leaves
+either the old or the new version, never a truncated mix. When the rename
+itself reaches the disk is set by the fsync policy (CONVERSATION_FSYNC):
+  always  - fsync file and directory before every write returns
+  batched - fsync the file before the rename; fsync the directories of recent
+            writes at most once per CONVERSATION_FSYNC_INTERVAL_MS (a power
+            loss can roll back recent writes to their previous version)
+  never   - leave it to the OS (fastest; only a process crash is covered: a
+            power loss can lose recent writes or leave them truncated)
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "batched", "never")
+DEFAULT_FSYNC_POLICY = os.getenv("CONVERSATION_FSYNC", "batched").lower()
+DEFAULT_FSYNC_INTERVAL = float(os.getenv("CONVERSATION_FSYNC_INTERVAL_MS", "1000")) / 1000
+
+TMP_SUFFIX = ".tmp"
+# Temp files younger than this may belong to a write still in progress
+STALE_TEMP_AGE_S = 300.0
+
+
+def fsync_dir(directory: Path) -> None:
+    """Persist renames inside `directory` (no-op where directories cannot be opened)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path: Path, data: bytes, fsync: bool = True, sync_dir: bool = True) -> None:
+    """Write to a temp file in the same directory, optionally fsync, then rename over `path`
+    (and, with `fsync` and `sync_dir`, fsync the directory so the rename is durable too)"""
+    path = Path(path)
+    # Unique temp name: concurrent writers of the same file must not share one
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}{TMP_SUFFIX}")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if fsync and sync_dir:
+        fsync_dir(path.parent)
+
+
+def remove_stale_temp_files(directory: Path, older_than_s: float = STALE_TEMP_AGE_S) -> int:
+    """Delete temp files left behind by writes interrupted by a crash (not ones still being written)"""
+    cutoff = time.time() - older_than_s
+    removed = 0
+    for tmp in Path(directory).glob(f"*{TMP_SUFFIX}"):
+        try:
+            if tmp.stat().st_mtime >= cutoff:
+                continue
+            tmp.unlink()
+        except FileNotFoundError:
+            continue  # renamed into place or removed meanwhile
+        removed += 1
+    return removed
+
+
+class DurableWriter:
+    """Atomic writes under one fsync policy; batched mode syncs pending directories from a timer"""
+
+    def __init__(self, policy: Optional[str] = None, interval_s: float = DEFAULT_FSYNC_INTERVAL):
+        policy = (policy or DEFAULT_FSYNC_POLICY).lower()
+        if policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {policy!r}, expected one of {', '.join(FSYNC_POLICIES)}")
+        self.policy = policy
+        self.interval_s = interval_s
+        self.writes = 0
+        self.syncs = 0
+        self._pending: Set[Path] = set()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def write(self, path: Path, data: bytes) -> None:
+        """Atomically replace `path` with `data` (blocking)"""
+        write_atomic(path, data, fsync=self.policy != "never", sync_dir=self.policy == "always")
+        with self._lock:
+            self.writes += 1
+            if self.policy == "always":
+                self.syncs += 1
+            elif self.policy == "batched":
+                self._pending.add(Path(path).parent)
+                if self._timer is None:
+                    self._timer = threading.Timer(self.interval_s, self.sync)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def sync(self) -> None:
+        """fsync the directories written to since the last sync, making their renames durable"""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+        for directory in pending:
+            fsync_dir(directory)
+        with self._lock:
+            self.syncs += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "interval_ms": self.interval_s * 1000 if self.policy == "batched" else None,
+            "writes": self.writes,
+            "syncs": self.syncs,
+            "pending": len(self._pending)
+        }
@@ -0,0 +1,215 @@
+"""
+Sub-task fan-out
+The fan_out tool lets the model hand one instruction over several files to
+sub-agents that run concurrently. Each sub-agent starts from a small, fresh
+context (its own system prompt, the instruction and its file) instead of the
+parent's full history, may use the read-only tools for a few iterations,
+and returns a short answer. The parent turn gets all answers back as a
+single tool result, so a "compare these 8 files" request takes one parallel
+round instead of eight sequential tool-loop iterations that each resend the
+whole history. Sub-agent calls count against the parent turn's budget and
+are recorded in the usage ledger under the parent session
+"""
+
+import asyncio
+import json
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from tools import BaseTool, ToolParameter, ToolResult, tool_registry
+
+from .budget import BudgetController
+from .config import ConfigSnapshot
+from .message_normalizer import normalize_messages
+from .providers import acompletion
+from .tool_stream import parse_arguments
+from .tracing import tracer
+
+if TYPE_CHECKING:
+    from .agent import DreamyTinAgent
+
+FAN_OUT_CONCURRENCY = int(os.getenv("FAN_OUT_CONCURRENCY", "4"))
+MAX_SUBTASKS = 16
+# LLM calls per sub-agent (the first answer plus tool rounds)
+SUBTASK_MAX_ITERATIONS = 3
+# Sub-agent answers are meant to be merged, not read in full
+SUBTASK_MAX_TOKENS = 1024
+# File content inlined into a sub-agent's first message (~10k tokens)
+SUBTASK_MAX_FILE_CHARS = 40000
+
+SUBAGENT_PROMPT = (
+    "You are a focused sub-agent working on one part of a larger task for a coordinating assistant. "
+    "Do only the subtask you are given, using the file provided (and the read-only tools if you must). "
+    "Answer concisely, in at most about 150 words, with the concrete facts the coordinator needs to "
+    "merge your answer with the others. Do not ask questions."
+)
+
+
+@dataclass
+class TurnContext:
+    """What a tool running inside an agent turn may use from that turn"""
+    agent: "DreamyTinAgent"
+    session_id: str
+    model_id: str
+    budget: BudgetController
+    config: ConfigSnapshot  # the snapshot the turn started with
+
+
+# Set by the agent for the duration of a turn
+current_turn: ContextVar[Optional[TurnContext]] = ContextVar("current_turn", default=None)
+
+
+class FanOutTool(BaseTool):
+    """Run one instruction over several files with concurrent sub-agents."""
+
+    @property
+    def name(self) -> str:
+        return "fan_out"
+
+    @property
+    def description(self) -> str:
+        return (
+            "Apply one instruction to several files in parallel: each file goes to a sub-agent with a "
+            "fresh, small context, and their short answers come back together. Prefer this over reading "
+            "files one by one when the same question applies to each file (summarize, compare, review, "
+            f"extract). At most {MAX_SUBTASKS} files per call."
+        )
+
+    @property
+    def parameters(self) -> List[ToolParameter]:
+        return [
+            ToolParameter(
+                name="instruction",
+                type="string",
+                description="What each sub-agent should do with its file, e.g. 'List the public functions and what they return'",
+                required=True
+            ),
+            ToolParameter(
+                name="paths",
+                type="array",
+                description="Files to process, one sub-agent per file",
+                required=True,
+                items={"type": "string"}
+            )
+        ]
+
+    async def execute(self, instruction: str, paths: List[str]) -> ToolResult:
+        turn = current_turn.get()
+        if turn is None:
+            return ToolResult(success=False, error="fan_out can only run inside an agent turn")
+        if not paths:
+            return ToolResult(success=False, error="paths must name at least one file")
+        if len(paths) > MAX_SUBTASKS:
+            return ToolResult(success=False, error=f"At most {MAX_SUBTASKS} paths per call, got {len(paths)}")
+
+        started = time.perf_counter()
+        runner = SubAgentRunner(turn)
+        semaphore = asyncio.Semaphore(FAN_OUT_CONCURRENCY)
+
+        async def bounded(path: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await runner.run(instruction, str(path))
+
+        results = await asyncio.gather(*(bounded(path) for path in paths))
+        return ToolResult(success=True, data={
+            "results": results,
+            "usage": runner.usage,
+            "elapsed_s": round(time.perf_counter() - started, 3)
+        })
+
+
+class SubAgentRunner:
+    """Runs sub-agents for one fan_out call and totals their token usage"""
+
+    def __init__(self, turn: TurnContext):
+        self.turn = turn
+        self.agent = turn.agent
+        fan_out_config = turn.config.model_config.get("fanOut") or {}
+        self.model_id = fan_out_config.get("model") or turn.model_id
+        self.capabilities = self.agent._model_capabilities(self.model_id, turn.config)
+        self.provider = self.agent._provider(self.model_id, turn.config)
+        # Read-only tools only: sub-agents must not change anything or fan out again
+        self.tools = [
+            schema for schema in turn.config.tools
+            if schema["function"]["name"] != "fan_out" and self.agent._is_read_only_tool(schema["function"]["name"])
+        ]
+        self.usage = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    async def run(self, instruction: str, path: str) -> Dict[str, Any]:
+        with tracer.span("agent.subtask", **{"subtask.path": path, "llm.model": self.model_id}) as span:
+            try:
+                return {"path": path, "result": await self._run(instruction, path)}
+            except Exception as e:
+                span.set_status("ERROR")
+                return {"path": path, "error": str(e)}
+
+    async def _run(self, instruction: str, path: str) -> str:
+        read = await tool_registry.execute("read_file", path=path)
+        if not read.success:
+            raise FileNotFoundError(read.error)  # no sub-agent call for a file that cannot be read
+        content = read.data["content"]
+        if len(content) > SUBTASK_MAX_FILE_CHARS:
+            content = content[:SUBTASK_MAX_FILE_CHARS] + "\n[... file truncated ...]"
+        messages: List[Dict[str, Any]] = [
+            {"role": "system", "content": SUBAGENT_PROMPT},
+            {"role": "user", "content": f"Subtask: {instruction}\n\nFile: {path}\n```\n{content}\n```"}
+        ]
+
+        answer = ""
+        for _ in range(SUBTASK_MAX_ITERATIONS):
+            over_budget = self.turn.budget.check()
+            if over_budget:
+                raise RuntimeError(over_budget.message)
+            params = self.capabilities.completion_params(stream=False, tools=self.tools)
+            params["max_tokens"] = min(params["max_tokens"], SUBTASK_MAX_TOKENS)
+            params["messages"] = normalize_messages(messages, self.provider)
+
+            response = await acompletion(self.provider, **params)
+            self._record_usage(response, params["messages"])
+            message = response.choices[0].message
+            tool_calls = [
+                {"id": tc.id, "type": "function",
+                 "function": {"name": tc.function.name, "arguments": tc.function.arguments or "{}"}}
+                for tc in (getattr(message, "tool_calls", None) or [])
+            ]
+            answer = message.content or answer
+            if not tool_calls:
+                return answer
+
+            messages.append({"role": "assistant", "content": message.content, "tool_calls": tool_calls})
+            for tool_call in tool_calls:
+                name = tool_call["function"]["name"]
+                if self.agent._is_read_only_tool(name) and name != "fan_out":
+                    result = await self.agent._execute_tool(name, parse_arguments(tool_call["function"]["arguments"]))
+                else:
+                    result = f"Tool {name} is not available to sub-agents"
+                messages.append({"role": "tool", "tool_call_id": tool_call["id"], "content": result})
+        return answer or f"No answer within {SUBTASK_MAX_ITERATIONS} sub-agent iterations"
+
+    def _record_usage(self, response: Any, messages: List[Dict[str, Any]]) -> None:
+        """Count a sub-agent call against the parent turn and in the usage ledger"""
+        usage = getattr(response, "usage", None)
+        estimated = usage is None or getattr(usage, "prompt_tokens", None) is None
+        if estimated:
+            message = response.choices[0].message
+            prompt_tokens = len(json.dumps(messages, default=str)) // 4
+            completion_tokens = len(message.content or "") // 4
+        else:
+            prompt_tokens = usage.prompt_tokens or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        self.usage["llm_calls"] += 1
+        self.usage["prompt_tokens"] += prompt_tokens
+        self.usage["completion_tokens"] += completion_tokens
+        self.turn.budget.record_llm_call(prompt_tokens, completion_tokens)
+        self.agent.usage_ledger.record(
+            self.turn.session_id, self.model_id, prompt_tokens, completion_tokens,
+            pricing=self.turn.config.pricing.get(self.model_id),
+            provider=self.provider, estimated=estimated
+        )
+
+
+# Register the fan-out tool next to the default tools
+tool_registry.register_class(FanOutTool)
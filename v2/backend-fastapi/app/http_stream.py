@@ -0,0 +1,113 @@
+"""
+HTTP streaming of agent events (POST /chat) for clients without a WebSocket
+Events are framed as Server-Sent Events (default) or NDJSON, and compressed
+with gzip/deflate when the client accepts it. Compression is flushed after
+every event (Z_SYNC_FLUSH), so each event reaches the client as soon as it
+is produced while later events still reuse the compression window. Idle
+streams send heartbeats so proxies and load balancers keep the connection
+"""
+
+import asyncio
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict, Optional
+
+SSE = "text/event-stream"
+NDJSON = "application/x-ndjson"
+HEARTBEAT_SECONDS = 15.0
+
+# zlib wbits per Content-Encoding
+ENCODINGS = {"gzip": 31, "deflate": 15}
+
+
+def _preferences(header: Optional[str]) -> Dict[str, float]:
+    """Accept-style header -> {lowercased value: q}"""
+    preferences = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name.strip():
+            preferences[name.strip().lower()] = q
+    return preferences
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """SSE unless NDJSON is asked for (?format=ndjson, or preferred in Accept)"""
+    if requested:
+        return NDJSON if requested.lower() in ("ndjson", "jsonl") else SSE
+    preferences = _preferences(accept)
+    ndjson_q = max(preferences.get(NDJSON, 0.0), preferences.get("application/jsonl", 0.0))
+    return NDJSON if ndjson_q > preferences.get(SSE, 0.0) else SSE
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported Content-Encoding by q-value (gzip preferred on ties), None for identity"""
+    preferences = _preferences(accept_encoding)
+    wildcard = preferences.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:  # gzip first, so it wins ties
+        q = preferences.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def frame(event: Dict[str, Any], media_type: str) -> bytes:
+    """One event as an SSE message (id = event_id) or an NDJSON line"""
+    data = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+    if media_type == NDJSON:
+        return (data + "\n").encode()
+    event_id = event.get("event_id")
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}data: {data}\n\n".encode()
+
+
+def heartbeat(media_type: str) -> bytes:
+    """Keep-alive bytes: an SSE comment, or an empty NDJSON line"""
+    return b": keep-alive\n\n" if media_type == SSE else b"\n"
+
+
+async def encode_events(
+    events: AsyncIterator[Dict[str, Any]],
+    media_type: str,
+    encoding: Optional[str] = None,
+    heartbeat_s: float = HEARTBEAT_SECONDS
+) -> AsyncIterator[bytes]:
+    """Framed (and optionally compressed) response body, one chunk per event or heartbeat"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, ENCODINGS[encoding]) if encoding else None
+
+    def encode(data: bytes) -> bytes:
+        if compressor is None:
+            return data
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    iterator = events.__aiter__()
+    pending: Optional[asyncio.Task] = None
+    try:
+        while True:
+            # Wait for the next event without cancelling it when a heartbeat is due
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=heartbeat_s)
+            if not done:
+                yield encode(heartbeat(media_type))
+                continue
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+            yield encode(frame(event, media_type))
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        if pending is not None:
+            pending.cancel()
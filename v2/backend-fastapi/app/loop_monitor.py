@@ -0,0 +1,333 @@
+"""
+Event-loop health instrumentation
+A lag sampler measures how late the loop wakes up, a watchdog thread captures
+the loop thread's stack whenever it is blocked longer than a threshold, and an
+optional sampling profiler can be switched on at runtime. Everything is
+attributed to the session and phase (llm_stream, tool_exec, persistence) the
+running task was in, via `session()` / `phase()` markers set by the agent
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from functools import wraps
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LAG_INTERVAL = 0.05
+DEFAULT_SLOW_THRESHOLD = float(os.getenv("LOOP_SLOW_CALLBACK_MS", "100")) / 1000
+DEFAULT_PROFILER_INTERVAL = 0.005
+MAX_STACK_FRAMES = 30
+
+# Task -> (session id, phase); weak so finished tasks drop out on their own
+_attribution: "weakref.WeakKeyDictionary[asyncio.Task, Tuple[Optional[str], Optional[str]]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+@contextmanager
+def _attributed(session_id: Optional[str] = None, phase_name: Optional[str] = None) -> Iterator[None]:
+    task = _current_task()
+    if task is None:
+        yield
+        return
+    previous = _attribution.get(task)
+    current_session, current_phase = previous or (None, None)
+    _attribution[task] = (session_id or current_session, phase_name or current_phase)
+    try:
+        yield
+    finally:
+        # Restore on the task captured at entry, even if a generator is closed elsewhere
+        if previous is None:
+            _attribution.pop(task, None)
+        else:
+            _attribution[task] = previous
+
+
+def session(session_id: str):
+    """Attribute loop activity of the current task to `session_id`"""
+    return _attributed(session_id=session_id)
+
+
+def phase(name: str):
+    """Attribute loop activity of the current task to phase `name` (nests, restores on exit)"""
+    return _attributed(phase_name=name)
+
+
+def in_phase(name: str):
+    """Decorator form of `phase()` for coroutine functions"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with _attributed(phase_name=name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def attribution_of(task: Optional[asyncio.Task]) -> Tuple[Optional[str], Optional[str]]:
+    """(session id, phase) recorded for `task`"""
+    if task is None:
+        return None, None
+    return _attribution.get(task) or (None, None)
+
+
+@dataclass
+class SlowCallback:
+    """One episode of the event loop being blocked"""
+    detected_at: str
+    blocked_ms: float
+    session_id: Optional[str]
+    phase: Optional[str]
+    task: Optional[str]
+    stack: List[str]
+    duration_ms: Optional[float] = None
+
+
+@dataclass
+class ProfileState:
+    interval: float
+    started_at: float
+    samples: int = 0
+    idle: int = 0
+    stacks: Counter = field(default_factory=Counter)
+    phases: Counter = field(default_factory=Counter)
+    # Wakes the profiler thread out of its sampling sleep
+    stopped: threading.Event = field(default_factory=threading.Event)
+
+
+def _is_idle(frame) -> bool:
+    """The loop thread is parked in the selector waiting for I/O"""
+    return frame is not None and frame.f_code.co_filename.endswith("selectors.py")
+
+
+def _collapse(frame) -> str:
+    """Root-to-leaf 'func (file:line)' frames joined by ';' (flamegraph folded format)"""
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_FRAMES:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    parts.reverse()
+    return ";".join(parts)
+
+
+class LoopMonitor:
+    """Lag sampler, blocked-loop watchdog and on-demand sampling profiler for one event loop"""
+
+    def __init__(
+        self,
+        lag_interval: float = DEFAULT_LAG_INTERVAL,
+        slow_threshold: float = DEFAULT_SLOW_THRESHOLD,
+        lag_history: int = 1200,
+        slow_history: int = 50
+    ):
+        self.lag_interval = lag_interval
+        self.slow_threshold = slow_threshold
+        self.lag_samples: Deque[float] = deque(maxlen=lag_history)
+        self.slow_callbacks: Deque[SlowCallback] = deque(maxlen=slow_history)
+        self.slow_callback_count = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._pending: Optional[SlowCallback] = None
+        self._sampler_task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._profile: Optional[ProfileState] = None
+        self._profiler_thread: Optional[threading.Thread] = None
+        self._last_profile: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._sampler_task is not None and not self._sampler_task.done()
+
+    def start(self) -> None:
+        """Start sampling the running loop (call from the loop thread)"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._sampler_task = self._loop.create_task(self._sample_lag())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the sampler, watchdog and profiler"""
+        self._stop.set()
+        await self.stop_profiler()
+        if self._sampler_task is not None:
+            self._sampler_task.cancel()
+            try:
+                await self._sampler_task
+            except asyncio.CancelledError:
+                pass
+            self._sampler_task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+            self._watchdog = None
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - start - self.lag_interval)
+            self._heartbeat = time.monotonic()
+            self.lag_samples.append(lag)
+            pending = self._pending
+            if pending is not None:
+                # The watchdog saw this stall while it was happening; record how long it lasted
+                pending.duration_ms = round(lag * 1000, 1)
+                self._pending = None
+
+    def _watch(self) -> None:
+        """Watchdog thread: capture the loop thread's stack while it is blocked"""
+        check_every = max(0.005, self.slow_threshold / 4)
+        reported_heartbeat = None
+        while not self._stop.wait(check_every):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.lag_interval
+            if blocked < self.slow_threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+            record = self._capture(blocked)
+            if record is not None:
+                self._pending = record
+                self.slow_callbacks.append(record)
+                self.slow_callback_count += 1
+                logger.warning(
+                    "Event loop blocked for %.0f ms (session=%s, phase=%s) at %s",
+                    blocked * 1000, record.session_id, record.phase,
+                    record.stack[-1].strip() if record.stack else "?"
+                )
+
+    def _capture(self, blocked: float) -> Optional[SlowCallback]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None or _is_idle(frame):
+            return None
+        task = asyncio.current_task(self._loop)
+        session_id, phase_name = attribution_of(task)
+        stack = traceback.format_list(traceback.extract_stack(frame, limit=MAX_STACK_FRAMES))
+        return SlowCallback(
+            detected_at=datetime.utcnow().isoformat(),
+            blocked_ms=round(blocked * 1000, 1),
+            session_id=session_id,
+            phase=phase_name,
+            task=task.get_name() if task else None,
+            stack=[line.rstrip() for line in stack]
+        )
+
+    def start_profiler(self, interval: float = DEFAULT_PROFILER_INTERVAL) -> bool:
+        """Start sampling the loop thread's stack every `interval` seconds; False if not running"""
+        if self._loop_thread_id is None or self._profile is not None:
+            return False
+        self._profile = ProfileState(interval=interval, started_at=time.monotonic())
+        self._profiler_thread = threading.Thread(
+            target=self._profile_loop, args=(self._profile,), name="loop-profiler", daemon=True
+        )
+        self._profiler_thread.start()
+        return True
+
+    async def stop_profiler(self) -> Optional[Dict[str, Any]]:
+        """Stop the profiler and return its report (None if it was not running)"""
+        profile = self._profile
+        if profile is None:
+            return None
+        self._profile = None
+        profile.stopped.set()
+        if self._profiler_thread is not None:
+            # Joined off the loop: the profiler may be mid-sample
+            await asyncio.to_thread(self._profiler_thread.join, 1.0)
+            self._profiler_thread = None
+        self._last_profile = self._report(profile)
+        return self._last_profile
+
+    def profiler_report(self, top: int = 20) -> Optional[Dict[str, Any]]:
+        """Live report of the running profiler, else the last finished one"""
+        if self._profile is not None:
+            return self._report(self._profile, top)
+        return self._last_profile
+
+    def _profile_loop(self, profile: ProfileState) -> None:
+        while self._profile is profile and not self._stop.is_set():
+            frame = sys._current_frames().get(self._loop_thread_id)
+            profile.samples += 1
+            if frame is None or _is_idle(frame):
+                profile.idle += 1
+            else:
+                session_id, phase_name = attribution_of(asyncio.current_task(self._loop))
+                phase_key = phase_name or "other"
+                profile.phases[phase_key] += 1
+                profile.stacks[f"{session_id or '-'};{phase_key};{_collapse(frame)}"] += 1
+            profile.stopped.wait(profile.interval)
+
+    @staticmethod
+    def _report(profile: ProfileState, top: int = 20) -> Dict[str, Any]:
+        stacks = profile.stacks.copy()
+        busy = profile.samples - profile.idle
+        return {
+            "interval_ms": profile.interval * 1000,
+            "duration_s": round(time.monotonic() - profile.started_at, 3),
+            "samples": profile.samples,
+            "busy_ratio": round(busy / profile.samples, 4) if profile.samples else 0.0,
+            "phases": dict(profile.phases.most_common()),
+            "top_stacks": [
+                {"samples": count, "stack": stack.split(";")}
+                for stack, count in stacks.most_common(top)
+            ],
+            # Feed to flamegraph.pl / speedscope
+            "folded": "\n".join(f"{stack} {count}" for stack, count in stacks.items())
+        }
+
+    def lag_summary(self) -> Dict[str, Any]:
+        samples = sorted(self.lag_samples)
+        if not samples:
+            return {"samples": 0}
+
+        def pct(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 2)
+
+        return {
+            "samples": len(samples),
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "max_ms": round(samples[-1] * 1000, 2)
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Lag percentiles, slow-callback counts and profiler state"""
+        return {
+            "running": self.running,
+            "lag_interval_ms": self.lag_interval * 1000,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "lag": self.lag_summary(),
+            "slow_callbacks": self.slow_callback_count,
+            "profiling": self._profile is not None
+        }
+
+    def recent_slow_callbacks(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return [asdict(record) for record in list(self.slow_callbacks)[-limit:]]
+
+
+loop_monitor = LoopMonitor()
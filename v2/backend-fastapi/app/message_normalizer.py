@@ -0,0 +1,122 @@
+"""
+Single-pass normalization of stored messages into LiteLLM API messages
+Messages are fed one at a time and come out formatted (metadata stripped),
+with every assistant tool call answered by exactly one tool result directly
+after it: missing results get a placeholder, orphan and duplicate results are
+dropped. Provider quirks are repaired on the way. Each message is handled in
+O(1) (plus its tool calls), so a whole history normalizes in linear time and
+the tool loop can normalize only what it appends
+"""
+
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+MISSING_RESULT_CONTENT = "Tool execution result not available"
+
+# Providers that reject user/assistant messages with empty text content
+EMPTY_CONTENT_REJECTED = {"anthropic", "google"}
+
+
+def format_message(msg: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored message -> LiteLLM API message (drops timestamps and other metadata)"""
+    formatted = {
+        "role": msg["role"],
+        "content": msg.get("content", "")
+    }
+    if msg["role"] == "assistant" and msg.get("tool_calls"):
+        formatted["tool_calls"] = msg["tool_calls"]
+        # Content may be None/empty when the assistant only calls tools
+        if not formatted["content"]:
+            formatted["content"] = ""
+    elif msg["role"] == "tool":
+        formatted["tool_call_id"] = msg.get("tool_call_id")
+        if not isinstance(formatted["content"], str):
+            formatted["content"] = str(formatted["content"])
+    return formatted
+
+
+class MessageNormalizer:
+    """Streaming normalizer: push stored messages, get API-ready messages back"""
+
+    def __init__(self, provider: str = ""):
+        self.provider = provider.lower()
+        # tool_call ids of the open assistant message still waiting for a result (ordered)
+        self._pending: Dict[str, None] = {}
+        # ids of the open assistant message that already have their result
+        self._answered: set = set()
+        self.repairs: Counter = Counter()
+
+    def push(self, msg: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Normalize one message; returns what to emit (possibly nothing, possibly placeholders first)"""
+        out: List[Dict[str, Any]] = []
+        self.push_into(msg, out)
+        return out
+
+    def push_into(self, msg: Dict[str, Any], out: List[Dict[str, Any]]) -> None:
+        """push(), appending to `out` (no per-message list for whole-history normalization)"""
+        formatted = format_message(msg)
+        role = formatted["role"]
+
+        if role == "tool":
+            tool_call_id = formatted["tool_call_id"]
+            if tool_call_id in self._pending:
+                del self._pending[tool_call_id]
+                self._answered.add(tool_call_id)
+                out.append(formatted)
+            else:
+                self.repairs["duplicate_results" if tool_call_id in self._answered else "orphan_results"] += 1
+            return
+
+        if self._pending or self._answered:
+            self.close_into(out)
+        if role == "assistant" and formatted.get("tool_calls"):
+            self._pending = dict.fromkeys(tc["id"] for tc in formatted["tool_calls"])
+            if len(self._pending) != len(formatted["tool_calls"]):
+                formatted["tool_calls"] = self._dedupe_tool_calls(formatted["tool_calls"])
+        elif not formatted["content"] and role in ("user", "assistant"):
+            if self.provider in EMPTY_CONTENT_REJECTED:
+                self.repairs["empty_messages"] += 1
+                return
+            formatted["content"] = ""
+        out.append(formatted)
+
+    def close(self) -> List[Dict[str, Any]]:
+        """End the open tool-call block: placeholder results for calls that never got one"""
+        out: List[Dict[str, Any]] = []
+        self.close_into(out)
+        return out
+
+    def close_into(self, out: List[Dict[str, Any]]) -> None:
+        self._answered.clear()
+        if not self._pending:
+            return
+        missing = list(self._pending)
+        self._pending = {}
+        self.repairs["missing_results"] += len(missing)
+        logger.warning("Missing tool results for tool_call_ids: %s", missing)
+        for tool_call_id in missing:
+            out.append({"role": "tool", "tool_call_id": tool_call_id, "content": MISSING_RESULT_CONTENT})
+
+    def _dedupe_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One tool call per id: a repeated id could only ever be answered once"""
+        seen = set()
+        unique = []
+        for tool_call in tool_calls:
+            if tool_call["id"] not in seen:
+                seen.add(tool_call["id"])
+                unique.append(tool_call)
+        self.repairs["duplicate_calls"] += len(tool_calls) - len(unique)
+        return unique
+
+
+def normalize_messages(messages: Iterable[Dict[str, Any]], provider: str = "") -> List[Dict[str, Any]]:
+    """Normalize a whole message sequence in one pass"""
+    normalizer = MessageNormalizer(provider)
+    out: List[Dict[str, Any]] = []
+    for msg in messages:
+        normalizer.push_into(msg, out)
+    normalizer.close_into(out)
+    return out
@@ -0,0 +1,117 @@
+"""
+Lazy access to LLM provider SDKs
+LiteLLM (and through it the OpenAI/Anthropic/Google SDKs) takes seconds to
+import, so it is loaded on first use or in the background after startup
+instead of at module import time
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .scheduler import estimate_tokens, llm_scheduler
+from .tracing import tracer, traced_stream
+
+_litellm = None
+_load_lock = threading.Lock()
+_api_keys: Dict[str, Optional[str]] = {}
+
+# Replacement for litellm.acompletion (local fake providers in benchmarks/tests)
+_completion_backend: Optional[Callable[..., Awaitable[Any]]] = None
+
+
+def use_completion_backend(backend: Optional[Callable[..., Awaitable[Any]]]) -> None:
+    """Route acompletion calls to `backend` instead of LiteLLM (None restores LiteLLM)"""
+    global _completion_backend
+    _completion_backend = backend
+
+
+def configure_api_keys(api_keys: Dict[str, Optional[str]]) -> None:
+    """Remember provider API keys; applied when LiteLLM is (or already was) loaded"""
+    _api_keys.update(api_keys)
+    if _litellm is not None:
+        _apply_api_keys(_litellm)
+
+
+def _apply_api_keys(litellm) -> None:
+    if _api_keys.get("openai"):
+        litellm.openai_key = _api_keys["openai"]
+    if _api_keys.get("anthropic"):
+        litellm.anthropic_key = _api_keys["anthropic"]
+    if _api_keys.get("gemini"):
+        litellm.gemini_key = _api_keys["gemini"]
+
+
+def get_litellm():
+    """Import and configure LiteLLM on first call (blocking)"""
+    global _litellm
+    if _litellm is None:
+        with _load_lock:
+            if _litellm is None:
+                import litellm
+
+                litellm.set_verbose = False
+                _apply_api_keys(litellm)
+                _litellm = litellm
+    return _litellm
+
+
+def is_loaded() -> bool:
+    """Whether the provider SDKs have been imported yet"""
+    return _litellm is not None
+
+
+async def preload() -> None:
+    """Import provider SDKs in a worker thread so the event loop keeps serving"""
+    if _litellm is None:
+        await asyncio.to_thread(get_litellm)
+
+
+async def acompletion(provider: str = "", **kwargs) -> Any:
+    """
+    LiteLLM acompletion, importing the SDK off the event loop if needed (traced
+    as llm.completion). Admitted by the scheduler within `provider`'s rate limits
+    """
+    span = tracer.span(
+        "llm.completion",
+        **{"llm.model": kwargs.get("model"), "llm.stream": bool(kwargs.get("stream")),
+           "llm.messages": len(kwargs.get("messages") or [])}
+    )
+    tokens = estimate_tokens(kwargs) if llm_scheduler.tracks_tokens(provider) else 1
+
+    async def call() -> Any:
+        if _completion_backend is not None:
+            return await _completion_backend(**kwargs)
+        await preload()
+        return await _litellm.acompletion(**kwargs)
+
+    def on_retry(attempt: int, error: BaseException, delay: float) -> None:
+        span.add_event("retry", {"attempt": attempt, "error": str(error), "delay_s": round(delay, 3)})
+
+    try:
+        response = await llm_scheduler.run(provider, call, tokens, on_retry)
+    except Exception as e:
+        span.record_exception(e)
+        span.end()
+        raise
+
+    if llm_scheduler.tracks_tokens(provider):
+        if kwargs.get("stream"):
+            response = llm_scheduler.metered_stream(response, provider, tokens)
+        else:
+            usage = getattr(response, "usage", None)
+            llm_scheduler.record_usage(provider, tokens, getattr(usage, "total_tokens", None))
+
+    if kwargs.get("stream"):
+        # The span stays open until the stream is consumed (TTFT, usage from the last chunk)
+        return traced_stream(response, span) if tracer.enabled else response
+
+    usage = getattr(response, "usage", None)
+    if usage:
+        span.set_attributes({
+            "llm.usage.prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "llm.usage.completion_tokens": getattr(usage, "completion_tokens", None)
+        })
+    span.set_status("OK")
+    span.end()
+    return response
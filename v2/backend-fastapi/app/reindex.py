@@ -0,0 +1,182 @@
+"""
+Rebuild and check the conversation index against the files on disk
+Parses every data/conversations/*.json in a process pool (orjson when it is
+installed), recomputes each index entry (title, message_count, updated_at,
+token_count) and reports how index.json differs: entries without a file,
+files without an entry, changed fields and unreadable files. Unless --check
+is given, the fresh index is written atomically. Run it with the server
+stopped; a running server keeps its own copy of the index and would write
+that copy back
+
+    python -m app.reindex                # rebuild data/conversations/index.json
+    python -m app.reindex --check        # report only; exit status 1 if inconsistent
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: the standard library parser is just slower
+    orjson = None
+
+from .conversation_manager import index_entry
+from .durable import write_atomic
+
+DEFAULT_CONVERSATIONS_DIR = Path(__file__).resolve().parents[3] / "data" / "conversations"
+
+# Fields compared between index.json and the files
+CHECKED_FIELDS = ("title", "created_at", "updated_at", "message_count", "token_count", "model")
+
+# Files per task sent to a worker: large enough to amortize pickling, small enough to balance
+CHUNK_SIZE = 256
+# Below this many files a process pool costs more than it saves
+POOL_THRESHOLD = 2000
+
+loads = orjson.loads if orjson is not None else json.loads
+
+
+def conversation_files(conversations_dir: Path) -> List[str]:
+    """Conversation file paths (not index.json, temp or quarantined files)"""
+    with os.scandir(conversations_dir) as entries:
+        return [
+            entry.path for entry in entries
+            if entry.name.endswith(".json") and entry.name != "index.json" and entry.is_file()
+        ]
+
+
+def scan_files(paths: List[str]) -> List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """(session id from file name, index entry or None, error) per file; runs in worker processes"""
+    results = []
+    for path in paths:
+        session_id = os.path.basename(path)[:-len(".json")]
+        try:
+            with open(path, "rb") as f:
+                conversation = loads(f.read())
+            results.append((session_id, index_entry(conversation), None))
+        except FileNotFoundError:
+            continue  # deleted while scanning
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            # orjson.JSONDecodeError and json.JSONDecodeError are both ValueErrors
+            results.append((session_id, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def _chunks(paths: List[str], size: int) -> Iterator[List[str]]:
+    for start in range(0, len(paths), size):
+        yield paths[start:start + size]
+
+
+def scan(paths: List[str], workers: Optional[int] = None) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """Index entries and errors for all files, by session id"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < POOL_THRESHOLD:
+        batches = [scan_files(paths)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            batches = list(pool.map(scan_files, _chunks(paths, CHUNK_SIZE)))
+
+    entries, errors = {}, {}
+    for batch in batches:
+        for session_id, entry, error in batch:
+            if entry is None:
+                errors[session_id] = error
+            elif entry["id"] != session_id:
+                errors[session_id] = f"file contains conversation {entry['id']!r}"
+            else:
+                entries[session_id] = entry
+    return entries, errors
+
+
+def diff_index(old: List[Dict[str, Any]], new: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Differences between the current index entries and the rebuilt ones"""
+    old_by_id = {entry.get("id"): entry for entry in old}
+    changed = {}
+    for session_id, entry in new.items():
+        previous = old_by_id.get(session_id)
+        if previous is None:
+            continue
+        fields = {
+            field: [previous.get(field), entry[field]]
+            for field in CHECKED_FIELDS
+            if previous.get(field) != entry[field]
+        }
+        if fields:
+            changed[session_id] = fields
+    return {
+        "missing_files": sorted(set(old_by_id) - set(new)),
+        "unindexed_files": sorted(set(new) - set(old_by_id)),
+        "duplicate_entries": len(old) - len(old_by_id),
+        "changed": changed
+    }
+
+
+def rebuild(conversations_dir: Path, check: bool = False, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Scan, diff against index.json and (unless `check`) write the rebuilt index"""
+    started = time.perf_counter()
+    index_file = conversations_dir / "index.json"
+    try:
+        old = loads(index_file.read_bytes()).get("conversations", [])
+    except (FileNotFoundError, ValueError, AttributeError):
+        old = []
+
+    paths = conversation_files(conversations_dir)
+    entries, errors = scan(paths, workers)
+    differences = diff_index(old, entries)
+    consistent = not (errors or differences["changed"] or differences["missing_files"]
+                      or differences["unindexed_files"] or differences["duplicate_entries"])
+
+    if not check:
+        # Same shape as ConversationManager writes it, oldest conversation first
+        index = {"conversations": sorted(entries.values(), key=lambda entry: entry["created_at"])}
+        write_atomic(index_file, json.dumps(index, indent=2, ensure_ascii=False).encode("utf-8"))
+
+    return {
+        "files": len(paths),
+        "indexed": len(entries),
+        "consistent": consistent,
+        "written": not check,
+        "unreadable": errors,
+        **differences,
+        "duration_s": round(time.perf_counter() - started, 3),
+        "parser": "orjson" if orjson is not None else "json"
+    }
+
+
+def summarize(report: Dict[str, Any], limit: int) -> Dict[str, Any]:
+    """Report with each list of sessions cut to `limit` ids, plus counts"""
+    summary = dict(report)
+    for key in ("missing_files", "unindexed_files", "unreadable", "changed"):
+        items = report[key]
+        summary[f"{key}_count"] = len(items)
+        if len(items) > limit:
+            kept = sorted(items)[:limit]
+            summary[key] = {k: items[k] for k in kept} if isinstance(items, dict) else kept
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild data/conversations/index.json from the conversation files")
+    parser.add_argument("--dir", type=Path, default=DEFAULT_CONVERSATIONS_DIR, help="Conversations directory")
+    parser.add_argument("--check", action="store_true", help="Only report differences (exit status 1 if any)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--limit", type=int, default=20, help="Sessions listed per kind of difference (0: all)")
+    args = parser.parse_args()
+
+    if not args.dir.is_dir():
+        parser.error(f"{args.dir} is not a directory")
+    report = rebuild(args.dir, check=args.check, workers=args.workers)
+    if args.limit:
+        report = summarize(report, args.limit)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(1 if args.check and not report["consistent"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Rate-limit aware scheduling of LLM calls
+Every completion goes through one scheduler that keeps per-provider token
+buckets for requests/min and tokens/min ("rateLimits" in models.json), so
+concurrent sessions queue locally instead of collecting 429s from the
+provider. Waiting calls are served by priority (interactive turns before
+background and batch work), then arrival order. A call that still fails with
+429 or a 5xx is retried with jittered exponential backoff, and a 429 pauses
+the whole provider for the backoff time (or the server's Retry-After).
+Callers that retry whole units of work themselves (batch runs) switch the
+per-call retries off with `without_retries()`
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504, 529}
+CHARS_PER_TOKEN = 4
+
+
+class Priority(IntEnum):
+    """Lower value is served first"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    BATCH = 2
+
+
+_priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+@contextlib.contextmanager
+def priority(level: Priority) -> Iterator[None]:
+    """Run the LLM calls made inside the block (and tasks it spawns) at `level`"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+_retries_enabled: ContextVar[bool] = ContextVar("llm_retries_enabled", default=True)
+
+
+@contextlib.contextmanager
+def without_retries() -> Iterator[None]:
+    """Send the LLM calls made inside the block once; the caller does its own retrying"""
+    token = _retries_enabled.set(False)
+    try:
+        yield
+    finally:
+        _retries_enabled.reset(token)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+def estimate_tokens(kwargs: Dict[str, Any]) -> int:
+    """Prompt size of a completion request (~4 characters per token)"""
+    size = len(json.dumps(kwargs.get("messages") or [], default=str))
+    if kwargs.get("tools"):
+        size += len(json.dumps(kwargs["tools"], default=str))
+    return max(1, size // CHARS_PER_TOKEN)
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a provider error (LiteLLM exceptions carry status_code)"""
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header, when the provider sent one"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute`/60 per second up to `capacity`; may go into debt"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity or per_minute)
+        self.level = self.capacity
+        self.clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (requests larger than the bucket need a full bucket)"""
+        self._refill()
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+    def pause(self, seconds: float) -> None:
+        """Empty the bucket so nothing is admitted for `seconds`"""
+        self._refill()
+        self.level = min(self.level, -seconds * self.rate)
+
+
+class ProviderQueue:
+    """Buckets and waiting calls for one provider"""
+
+    def __init__(self, limits: Dict[str, Any], clock: Callable[[], float]):
+        rpm, tpm = limits.get("requestsPerMinute"), limits.get("tokensPerMinute")
+        self.requests = TokenBucket(rpm, limits.get("requestBurst"), clock) if rpm else None
+        self.tokens = TokenBucket(tpm, limits.get("tokenBurst"), clock) if tpm else None
+        # (priority, arrival number, tokens, future)
+        self.waiting: List[tuple] = []
+        self.pump: Optional[asyncio.Task] = None
+        self.dispatched = 0
+        self.retries = 0
+        self.rate_limited = 0
+
+    @property
+    def limited(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def wait_time(self, tokens: int) -> float:
+        return max(
+            self.requests.wait_time(1) if self.requests else 0.0,
+            self.tokens.wait_time(tokens) if self.tokens else 0.0
+        )
+
+    def take(self, tokens: int) -> None:
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(tokens)
+
+    def pause(self, seconds: float) -> None:
+        for bucket in (self.requests, self.tokens):
+            if bucket:
+                bucket.pause(seconds)
+
+
+class LLMScheduler:
+    """Admits LLM calls per provider by priority within rate limits, retrying 429/5xx"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self._queues: Dict[str, ProviderQueue] = {}
+        self._limits: Dict[str, Dict[str, Any]] = {}
+        self._arrivals = itertools.count()
+
+    def configure(self, rate_limits: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        """Apply "rateLimits" from models.json ({provider: {requestsPerMinute, tokensPerMinute, ...}})"""
+        rate_limits = {provider.lower(): limits for provider, limits in (rate_limits or {}).items()}
+        if rate_limits == self._limits:
+            return
+        self._limits = rate_limits
+        for provider, queue in list(self._queues.items()):
+            if not queue.waiting:
+                del self._queues[provider]  # rebuilt with the new limits on next use
+
+    def _queue(self, provider: str) -> ProviderQueue:
+        queue = self._queues.get(provider)
+        if queue is None:
+            queue = self._queues[provider] = ProviderQueue(self._limits.get(provider, {}), self.clock)
+        return queue
+
+    def tracks_tokens(self, provider: str) -> bool:
+        return self._queue(provider).tokens is not None
+
+    async def acquire(self, provider: str, tokens: int = 1, level: Optional[Priority] = None,
+                      arrival: Optional[int] = None) -> float:
+        """Wait until a call may be sent; returns the seconds spent queued"""
+        queue = self._queue(provider)
+        if not queue.limited:
+            queue.dispatched += 1
+            return 0.0
+        if not queue.waiting and queue.wait_time(tokens) <= 0:
+            queue.take(tokens)
+            queue.dispatched += 1
+            return 0.0
+
+        started = self.clock()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        level = current_priority() if level is None else level
+        heapq.heappush(queue.waiting, (int(level), next(self._arrivals) if arrival is None else arrival,
+                                       tokens, future))
+        if queue.pump is None or queue.pump.done() or queue.pump.get_loop() is not loop:
+            queue.pump = asyncio.create_task(self._pump(queue))
+        await future
+        return self.clock() - started
+
+    async def _pump(self, queue: ProviderQueue) -> None:
+        """Hand out admissions in priority order as the buckets refill"""
+        while queue.waiting:
+            _, _, tokens, future = queue.waiting[0]
+            # Caller gave up (cancelled turn), or its event loop is gone
+            if future.done() or future.get_loop() is not asyncio.get_running_loop():
+                heapq.heappop(queue.waiting)
+                continue
+            wait = queue.wait_time(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            heapq.heappop(queue.waiting)
+            queue.take(tokens)
+            queue.dispatched += 1
+            future.set_result(None)
+
+    def record_usage(self, provider: str, estimated: int, actual: Optional[int]) -> None:
+        """Correct the tokens/min bucket once the provider reports real usage"""
+        queue = self._queues.get(provider)
+        if queue and queue.tokens and actual:
+            queue.tokens.take(actual - estimated)
+
+    async def metered_stream(self, stream: AsyncIterator[Any], provider: str, estimated: int) -> AsyncIterator[Any]:
+        """Pass a streamed response through, reconciling token usage from its usage chunk"""
+        actual = None
+        try:
+            async for chunk in stream:
+                usage = getattr(chunk, "usage", None)
+                if usage:
+                    actual = getattr(usage, "total_tokens", None)
+                yield chunk
+        finally:
+            self.record_usage(provider, estimated, actual)
+
+    async def run(self, provider: str, call: Callable[[], Awaitable[Any]], tokens: int = 1,
+                  on_retry: Optional[Callable[[int, BaseException, float], None]] = None) -> Any:
+        """Send `call` when admitted; retry 429/5xx with jittered exponential backoff"""
+        provider = provider.lower()
+        level = current_priority()
+        arrival = next(self._arrivals)  # retries keep their place in line
+        max_retries = self.max_retries if _retries_enabled.get() else 0
+        for attempt in range(max_retries + 1):
+            await self.acquire(provider, tokens, level, arrival)
+            try:
+                return await call()
+            except Exception as e:
+                status = status_code(e)
+                if status not in RETRYABLE_STATUS or attempt == max_retries:
+                    raise
+                queue = self._queue(provider)
+                queue.retries += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                delay = retry_after(e) or random.uniform(delay / 2, delay)
+                if status == 429:
+                    queue.rate_limited += 1
+                    queue.pause(delay)  # everyone on this provider backs off, not just this call
+                logger.warning("%s call failed with %s, retry %d in %.1fs", provider or "LLM", status,
+                               attempt + 1, delay)
+                if on_retry:
+                    on_retry(attempt + 1, e, delay)
+                await asyncio.sleep(delay)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Queue depth, bucket levels and retry counts per provider"""
+        status = {}
+        for provider, queue in self._queues.items():
+            status[provider or "default"] = {
+                "waiting": len(queue.waiting),
+                "dispatched": queue.dispatched,
+                "retries": queue.retries,
+                "rate_limited": queue.rate_limited,
+                "requests_available": round(queue.requests.level, 1) if queue.requests else None,
+                "tokens_available": round(queue.tokens.level) if queue.tokens else None
+            }
+        return status
+
+
+llm_scheduler = LLMScheduler()
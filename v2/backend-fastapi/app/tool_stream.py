@@ -0,0 +1,143 @@
+"""
+Assembly of streamed assistant responses and speculative tool prefetch
+ResponseAccumulator folds LLM stream chunks into content + tool calls and
+reports each tool call as soon as its argument JSON is complete, so read-only
+tools can start (ToolPrefetcher) while the model is still generating. A
+prefetched result is only used when the final, fully assembled tool call
+matches it; anything unclaimed is cancelled at the end of the turn
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Container, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (tool name, canonical JSON of the arguments) - identifies a repeatable tool call
+ToolKey = Tuple[str, str]
+
+MAX_PREFETCH_PER_TURN = 8
+
+
+def parse_arguments(raw: str) -> Dict[str, Any]:
+    """Tool call arguments as a dict (malformed JSON counts as no arguments)"""
+    try:
+        arguments = json.loads(raw) if raw else {}
+    except json.JSONDecodeError:
+        return {}
+    return arguments if isinstance(arguments, dict) else {}
+
+
+def tool_call_key(tool_name: str, arguments: Dict[str, Any]) -> ToolKey:
+    return (tool_name, json.dumps(arguments, sort_keys=True))
+
+
+class ResponseAccumulator:
+    """Collects content and tool calls from streamed chunks (OpenAI delta format)"""
+
+    def __init__(self, on_tool_call_ready: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.content = ""
+        self.tool_calls: List[Dict[str, Any]] = []
+        self.usage: Optional[Any] = None  # reported with stream_options include_usage
+        self.on_tool_call_ready = on_tool_call_ready
+        self._ready: List[bool] = []
+
+    def add_chunk(self, chunk: Any) -> Optional[str]:
+        """Fold one chunk in; returns its content delta, if any"""
+        usage = getattr(chunk, "usage", None)
+        if usage:
+            self.usage = usage
+        if not chunk.choices:
+            return None  # trailing usage chunk
+        delta = chunk.choices[0].delta
+        content = delta.content
+        if content:
+            self.content += content
+        if delta.tool_calls:
+            for tool_call_delta in delta.tool_calls:
+                self._add_tool_call_delta(tool_call_delta)
+        return content
+
+    def _add_tool_call_delta(self, tool_call_delta: Any) -> None:
+        index = tool_call_delta.index
+        while len(self.tool_calls) <= index:
+            self.tool_calls.append({
+                "id": "",
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            self._ready.append(False)
+
+        tc = self.tool_calls[index]
+        if tool_call_delta.id:
+            tc["id"] = tool_call_delta.id
+        if tool_call_delta.function:
+            if tool_call_delta.function.name:
+                tc["function"]["name"] = tool_call_delta.function.name
+            if tool_call_delta.function.arguments:
+                tc["function"]["arguments"] += tool_call_delta.function.arguments
+                self._check_ready(index)
+
+    def _check_ready(self, index: int) -> None:
+        if self._ready[index] or self.on_tool_call_ready is None:
+            return
+        tc = self.tool_calls[index]
+        arguments = tc["function"]["arguments"]
+        # An argument object is complete once it parses; cheap pre-check avoids re-parsing prefixes
+        if not tc["function"]["name"] or not arguments.rstrip().endswith("}"):
+            return
+        try:
+            json.loads(arguments)
+        except json.JSONDecodeError:
+            return
+        self._ready[index] = True
+        self.on_tool_call_ready(tc)
+
+
+class ToolPrefetcher:
+    """Starts read-only tool calls speculatively and hands their results to the real execution"""
+
+    def __init__(
+        self,
+        execute: Callable[[str, Dict[str, Any]], Awaitable[str]],
+        is_read_only: Callable[[str], bool],
+        known: Container[ToolKey] = (),
+        max_tasks: int = MAX_PREFETCH_PER_TURN
+    ):
+        self.execute = execute
+        self.is_read_only = is_read_only
+        self.known = known  # results already cached for this turn, never prefetched
+        self.max_tasks = max_tasks
+        self.started = 0
+        self.used = 0
+        self._tasks: Dict[ToolKey, asyncio.Task] = {}
+
+    def maybe_start(self, tool_call: Dict[str, Any]) -> None:
+        """Start `tool_call` in the background if its tool is read-only (ResponseAccumulator callback)"""
+        tool_name = tool_call["function"]["name"]
+        if self.started >= self.max_tasks or not self.is_read_only(tool_name):
+            return
+        arguments = parse_arguments(tool_call["function"]["arguments"])
+        key = tool_call_key(tool_name, arguments)
+        if key in self._tasks or key in self.known:
+            return
+        self.started += 1
+        self._tasks[key] = asyncio.create_task(self.execute(tool_name, arguments))
+
+    def take(self, key: ToolKey) -> Optional[asyncio.Task]:
+        """Claim the speculative execution for a confirmed tool call, if one was started"""
+        task = self._tasks.pop(key, None)
+        if task is not None:
+            self.used += 1
+        return task
+
+    def cancel_pending(self) -> None:
+        """Drop speculative executions the final response did not confirm"""
+        for key, task in self._tasks.items():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # mark a failure as retrieved; it was never needed
+            logger.debug("Discarded unconfirmed prefetch of %s", key[0])
+        self._tasks.clear()
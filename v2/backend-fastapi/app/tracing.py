@@ -0,0 +1,295 @@
+"""
+Span-based tracing for agent turns
+A small in-process tracer whose spans follow the OpenTelemetry data model
+(128-bit trace ids, 64-bit span ids, parent links, attributes, events, status)
+and export locally: an indented tree per trace on the console, or one JSON
+span per line in a file. Disabled by default; `TRACING=console|file` enables it
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent
+DEFAULT_TRACE_FILE = PROJECT_ROOT / "data" / "traces" / "traces.jsonl"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; use via `tracer.span(...)` as a context manager"""
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "attributes",
+                 "events", "status", "start_ns", "end_ns", "_parent_ctx")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"],
+                 attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.events: List[Dict[str, Any]] = []
+        self.status = "UNSET"
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._parent_ctx: Optional[Span] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes or {}})
+
+    def set_status(self, status: str) -> None:
+        """OK or ERROR"""
+        self.status = status
+
+    def record_exception(self, error: BaseException) -> None:
+        self.status = "ERROR"
+        self.add_event("exception", {"exception.type": type(error).__name__,
+                                     "exception.message": str(error)})
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer._export(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": self.status
+        }
+
+    def __enter__(self) -> "Span":
+        self._parent_ctx = _current_span.get()
+        _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            self.record_exception(exc)
+        elif self.status == "UNSET":
+            self.status = "OK"
+        # set() rather than reset(token): async generators may be closed from another context
+        _current_span.set(self._parent_ctx)
+        self.end()
+
+
+class _NoopSpan:
+    """Shared stand-in returned while tracing is disabled"""
+
+    trace_id = span_id = parent_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        pass
+
+    def set_status(self, status: str) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class ConsoleExporter:
+    """Prints each finished trace as an indented tree once its root span ends"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self._pending: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            if span.parent_id is not None:
+                return
+            del self._pending[span.trace_id]
+        self.stream.write(self.render(spans))
+        self.stream.flush()
+
+    @staticmethod
+    def render(spans: List[Span]) -> str:
+        children: Dict[Optional[str], List[Span]] = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+        root = next(span for span in spans if span.parent_id is None)
+        lines = [f"trace {root.trace_id}"]
+
+        def visit(span: Span, depth: int) -> None:
+            attrs = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+            marker = " !" if span.status == "ERROR" else ""
+            lines.append(f"{'  ' * depth}{span.name} {span.duration_ms:.1f}ms{marker} {attrs}".rstrip())
+            for child in sorted(children.get(span.span_id, []), key=lambda s: s.start_ns):
+                visit(child, depth + 1)
+
+        visit(root, 1)
+        return "\n".join(lines) + "\n"
+
+    def shutdown(self) -> None:
+        pass
+
+
+class FileExporter:
+    """Appends one JSON span per line from a background thread (never blocks the loop)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._write, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        self._queue.put(span.to_dict())
+
+    def _write(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                f.write(json.dumps(item, default=str) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(5.0)
+
+
+class Tracer:
+    """Creates spans parented to the current one and hands finished spans to the exporter"""
+
+    def __init__(self):
+        self.exporter = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def configure(self, exporter=None) -> None:
+        """Install an exporter (None disables tracing)"""
+        if self.exporter is not None:
+            self.exporter.shutdown()
+        self.exporter = exporter
+
+    def configure_from_env(self) -> None:
+        """TRACING=console|file (TRACING_FILE overrides the JSONL path); anything else disables"""
+        mode = os.getenv("TRACING", "").lower()
+        if mode == "console":
+            self.configure(ConsoleExporter())
+        elif mode == "file":
+            self.configure(FileExporter(Path(os.getenv("TRACING_FILE") or DEFAULT_TRACE_FILE)))
+        else:
+            self.configure(None)
+
+    def shutdown(self) -> None:
+        self.configure(None)
+
+    def span(self, name: str, **attributes: Any):
+        """Start a span as a child of the current span (a shared no-op while disabled)"""
+        if self.exporter is None:
+            return NOOP_SPAN
+        return Span(self, name, _current_span.get(), attributes)
+
+    def current_span(self):
+        return _current_span.get() or NOOP_SPAN
+
+    def _export(self, span: Span) -> None:
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning("Dropping span %s: %s", span.name, e)
+
+
+tracer = Tracer()
+atexit.register(tracer.shutdown)
+
+
+def traced(name: str):
+    """Decorator: run a coroutine function inside a span called `name`"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if tracer.exporter is None:
+                return await func(*args, **kwargs)
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def traced_stream(stream: AsyncIterator[Any], span) -> AsyncIterator[Any]:
+    """
+    Pass an LLM chunk stream through, recording time to first token, chunk count
+    and the usage reported in the final chunk on `span`, which ends with the stream
+    """
+    chunks = 0
+    try:
+        async for chunk in stream:
+            if chunks == 0:
+                span.set_attribute("llm.ttft_ms", round(span.duration_ms, 1))
+            chunks += 1
+            usage = getattr(chunk, "usage", None)
+            if usage:
+                span.set_attributes({
+                    "llm.usage.prompt_tokens": getattr(usage, "prompt_tokens", None),
+                    "llm.usage.completion_tokens": getattr(usage, "completion_tokens", None)
+                })
+            yield chunk
+        span.set_status("OK")
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            span.record_exception(e)
+        raise
+    finally:
+        span.set_attribute("llm.chunks", chunks)
+        span.end()
@@ -0,0 +1,135 @@
+"""
+Resumable turn streams
+Each agent turn runs in its own task and records its events, numbered, in a
+bounded replay buffer; the WebSocket only forwards them. A client that drops
+mid-response reconnects with the stream id and the last event id it saw and
+continues from there, without a second LLM call. A turn nobody is listening
+to still runs to completion and persists its result, and finished streams
+stay resumable for a retention period
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+REPLAY_BUFFER_EVENTS = 2000
+RETENTION_SECONDS = 300.0
+
+
+class TurnStream:
+    """Numbered events of one turn (event ids start at 1), kept in a bounded buffer"""
+
+    def __init__(self, session_id: str, max_events: int = REPLAY_BUFFER_EVENTS):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.last_event_id = 0
+        self.done = False
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._waiter: Optional[asyncio.Future] = None
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self.last_event_id += 1
+        self._events.append({**event, "stream_id": self.id, "event_id": self.last_event_id})
+        self._wake()
+
+    def finish(self) -> None:
+        self.done = True
+        self.finished_at = time.monotonic()
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        self._waiter = None
+
+    async def events(self, after: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Events with id > `after`: buffered ones first, then live ones until the turn ends"""
+        next_id = after + 1
+        while True:
+            while next_id <= self.last_event_id:
+                oldest = self._events[0]["event_id"]
+                if next_id < oldest:
+                    # Fell out of the replay buffer; the client has to reload the conversation
+                    yield {"type": "stream_gap", "stream_id": self.id, "missed_events": oldest - next_id,
+                           "timestamp": datetime.utcnow().isoformat()}
+                    next_id = oldest
+                yield self._events[next_id - oldest]
+                next_id += 1
+            if self.done:
+                return
+            if self._waiter is None:
+                self._waiter = asyncio.get_running_loop().create_future()
+            await asyncio.shield(self._waiter)
+
+
+class StreamRegistry:
+    """Running and recently finished turn streams, by stream id"""
+
+    def __init__(self, max_events: int = REPLAY_BUFFER_EVENTS, retention_s: float = RETENTION_SECONDS):
+        self.max_events = max_events
+        self.retention_s = retention_s
+        self._streams: Dict[str, TurnStream] = {}
+
+    def start(self, session_id: str, events: AsyncIterator[Dict[str, Any]]) -> TurnStream:
+        """Run a turn's event generator to completion in the background"""
+        self._prune()
+        stream = TurnStream(session_id, self.max_events)
+        self._streams[stream.id] = stream
+        stream.task = asyncio.create_task(self._run(stream, events))
+        return stream
+
+    async def _run(self, stream: TurnStream, events: AsyncIterator[Dict[str, Any]]) -> None:
+        try:
+            async for event in events:
+                stream.publish(event)
+        except Exception as e:
+            logger.exception("Turn stream %s failed", stream.id)
+            stream.publish({
+                "type": "error",
+                "error": f"Agent processing error: {str(e)}",
+                "timestamp": datetime.utcnow().isoformat()
+            })
+        finally:
+            stream.finish()
+
+    def get(self, stream_id: str) -> Optional[TurnStream]:
+        return self._streams.get(stream_id)
+
+    def active(self, session_id: str) -> Optional[TurnStream]:
+        """The session's turn that is still running, if any"""
+        for stream in self._streams.values():
+            if stream.session_id == session_id and not stream.done:
+                return stream
+        return None
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.retention_s
+        for stream_id in [s.id for s in self._streams.values() if s.done and s.finished_at < cutoff]:
+            del self._streams[stream_id]
+
+    async def shutdown(self) -> None:
+        """Cancel turns still running (server shutdown)"""
+        tasks = [s.task for s in self._streams.values() if s.task and not s.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_status(self) -> Dict[str, Any]:
+        self._prune()
+        return {
+            "running": sum(not s.done for s in self._streams.values()),
+            "resumable": len(self._streams),
+            "replay_buffer_events": self.max_events,
+            "retention_s": self.retention_s
+        }
+
+
+turn_streams = StreamRegistry()
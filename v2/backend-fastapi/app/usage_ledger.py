@@ -0,0 +1,217 @@
+"""
+Token usage and cost ledger
+Every LLM call (first completion and each tool-loop iteration) is appended
+as one JSON line to data/usage/ledger.jsonl, priced from
+v2/shared/config/pricing.json at the time of the call. Totals per session,
+per model and per UTC day are kept as rollups updated on each record, so
+reads never rescan the ledger. The rollups are snapshotted with the ledger
+offset they cover (rollups.json); on startup only the ledger tail after
+that offset is replayed. Other processes on the same directory (the batch
+CLI) append to the same ledger: records are folded in by reading the ledger
+tail, so each ledger also picks up the others' records before any read or
+snapshot
+"""
+
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .budget import call_cost
+from .durable import write_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not locked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USAGE_DIR = Path(__file__).resolve().parents[3] / "data" / "usage"
+
+# Records between rollup snapshots (bounds the tail replayed on startup)
+SNAPSHOT_EVERY = 1000
+
+# Rollup dimension -> name of its key in API responses
+DIMENSIONS = {"sessions": "session_id", "models": "model", "days": "day"}
+
+
+def _empty() -> Dict[str, Any]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "estimated_calls": 0}
+
+
+def _add(totals: Dict[str, Any], record: Dict[str, Any]) -> None:
+    totals["calls"] += 1
+    totals["prompt_tokens"] += record["prompt_tokens"]
+    totals["completion_tokens"] += record["completion_tokens"]
+    totals["cost_usd"] += record["cost_usd"] or 0.0
+    totals["estimated_calls"] += record["estimated"]
+
+
+def _rounded(totals: Dict[str, Any]) -> Dict[str, Any]:
+    return {**totals, "cost_usd": round(totals["cost_usd"], 6),
+            "total_tokens": totals["prompt_tokens"] + totals["completion_tokens"]}
+
+
+class UsageLedger:
+    """Append-only usage records plus rollups by session, model and day"""
+
+    def __init__(self, usage_dir: Optional[Path] = None, snapshot_every: int = SNAPSHOT_EVERY):
+        self.usage_dir = Path(usage_dir or DEFAULT_USAGE_DIR)
+        self.ledger_file = self.usage_dir / "ledger.jsonl"
+        self.rollups_file = self.usage_dir / "rollups.json"
+        self.snapshot_every = snapshot_every
+        self._file = None
+        self._since_snapshot = 0
+        # Ledger bytes folded into the rollups, from any process
+        self._applied = 0
+        self._total = _empty()
+        self._rollups: Dict[str, Dict[str, Dict[str, Any]]] = {dimension: {} for dimension in DIMENSIONS}
+        self._load()
+
+    @contextmanager
+    def _locked(self, f):
+        """Exclusive lock on the ledger, shared with the other processes appending to it"""
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        """Rollup snapshot, then replay of the records appended after it"""
+        try:
+            with open(self.rollups_file, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._applied = snapshot["offset"]
+            self._total = snapshot["total"]
+            self._rollups = {dimension: snapshot[dimension] for dimension in DIMENSIONS}
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, KeyError) as e:
+            logger.warning("Usage rollups unreadable (%s); rebuilding from the ledger", e)
+
+        if self._replay() is None:
+            return
+        try:
+            with open(self.ledger_file, "r+b") as f, self._locked(f):
+                # Writers hold the lock, so a partial last line now is a torn write from a crash
+                size = self._replay()
+                if size is not None and self._applied < size:
+                    f.truncate(self._applied)
+        except FileNotFoundError:
+            pass
+
+    def _replay(self) -> Optional[int]:
+        """Fold in the complete records after the applied offset; returns the ledger size (None if missing)"""
+        try:
+            with open(self.ledger_file, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size == self._applied:
+                    return size
+                if self._applied > size:
+                    # Ledger replaced or truncated behind the snapshot's back: start over
+                    self._applied = 0
+                    self._total = _empty()
+                    self._rollups = {dimension: {} for dimension in DIMENSIONS}
+                f.seek(self._applied)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn or still being written
+                    try:
+                        self._apply(json.loads(line))
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        logger.warning("Skipping malformed usage record at byte %d", self._applied)
+                    self._applied += len(line)
+                    self._since_snapshot += 1
+                return size
+        except FileNotFoundError:
+            return None
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        _add(self._total, record)
+        keys = {"sessions": record["session_id"], "models": record["model"], "days": record["timestamp"][:10]}
+        for dimension, key in keys.items():
+            rollup = self._rollups[dimension]
+            if key not in rollup:
+                rollup[key] = _empty()
+            _add(rollup[key], record)
+
+    def record(
+        self,
+        session_id: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        pricing: Optional[Dict[str, float]] = None,
+        provider: str = "",
+        estimated: bool = False
+    ) -> Dict[str, Any]:
+        """Append one LLM call's usage and fold it into the rollups"""
+        record = {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "session_id": session_id,
+            "model": model,
+            "provider": provider,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            # None for models without pricing; they still count towards tokens
+            "cost_usd": round(call_cost(pricing, prompt_tokens, completion_tokens), 8) if pricing else None,
+            "estimated": estimated
+        }
+        if self._file is None:
+            self.usage_dir.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.ledger_file, "ab")
+        with self._locked(self._file):
+            self._file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            self._file.flush()
+        # Reads our record back, together with any other process's records appended before it
+        self._replay()
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        return record
+
+    def snapshot(self) -> None:
+        """Persist the rollups together with the ledger offset they include"""
+        if self._replay() is None:
+            return
+        snapshot = {"offset": self._applied, "total": self._total, **self._rollups}
+        self.usage_dir.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.rollups_file, json.dumps(snapshot, ensure_ascii=False).encode("utf-8"))
+        self._since_snapshot = 0
+
+    def close(self) -> None:
+        if self._since_snapshot:
+            self.snapshot()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def totals(self) -> Dict[str, Any]:
+        self._replay()
+        return _rounded(self._total)
+
+    def get(self, dimension: str, key: str) -> Optional[Dict[str, Any]]:
+        """Totals of one session, model or day"""
+        self._replay()
+        totals = self._rollups[dimension].get(key)
+        return _rounded(totals) if totals else None
+
+    def breakdown(self, dimension: str, start: Optional[str] = None, end: Optional[str] = None,
+                  limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Totals per key; days oldest first (optionally within [start, end]), others by cost, highest first"""
+        self._replay()
+        rollup = self._rollups[dimension]
+        if dimension == "days":
+            keys = sorted(day for day in rollup if (not start or day >= start) and (not end or day <= end))
+        else:
+            keys = sorted(rollup, key=lambda k: (rollup[k]["cost_usd"], rollup[k]["prompt_tokens"]
+                                                 + rollup[k]["completion_tokens"]), reverse=True)
+        if limit:
+            keys = keys[:limit]
+        return [{DIMENSIONS[dimension]: key, **_rounded(rollup[key])} for key in keys]
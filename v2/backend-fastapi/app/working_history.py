@@ -0,0 +1,129 @@
+"""
+In-memory message list for one agent turn
+Built once from the stored conversation, then grown with each new assistant
+and tool message as the tool loop persists them, so every LLM request in the
+turn costs O(new messages) instead of re-reading, re-formatting and
+re-validating the whole conversation. Formatting, tool-result pairing
+(MessageNormalizer) and context-window truncation are applied per appended
+message
+"""
+
+import json
+from typing import Any, Dict, Iterable, List
+
+from .message_normalizer import MessageNormalizer
+
+# Same budget rule as ConversationManager.truncate_for_context_window:
+# ~4 characters per token, history may use 80% of the context window
+CHARS_PER_TOKEN = 4
+CONTEXT_FILL_RATIO = 0.8
+# A single tool result may use at most this share of the history budget
+MAX_TOOL_RESULT_SHARE = 0.5
+CLIPPED_MARKER = "\n[... tool result clipped to fit the context window ...]"
+
+
+def _size(msg: Dict[str, Any]) -> int:
+    return len(json.dumps(msg))
+
+
+class WorkingHistory:
+    """System prompt + formatted, tool-paired, context-window-truncated messages"""
+
+    def __init__(self, system_prompt: str, max_tokens: int, provider: str = ""):
+        system = {"role": "system", "content": system_prompt}
+        self.target_chars = int(max_tokens * CONTEXT_FILL_RATIO * CHARS_PER_TOKEN)
+        # _window[0] is the system prompt; _sizes[i] is the JSON size of _window[i]
+        self._window: List[Dict[str, Any]] = [system]
+        self._sizes: List[int] = [_size(system)]
+        self._chars = self._sizes[0]
+        self._normalizer = MessageNormalizer(provider)
+        self.dropped = 0
+
+    def extend(self, messages: Iterable[Dict[str, Any]]) -> None:
+        for msg in messages:
+            self.append(msg)
+
+    def append(self, msg: Dict[str, Any]) -> None:
+        """Normalize and add one stored-format message, then re-apply truncation"""
+        if msg["role"] == "system":
+            return  # the turn's system prompt is fixed at index 0
+        for formatted in self._normalizer.push(msg):
+            self._push(formatted)
+
+    def messages(self) -> List[Dict[str, Any]]:
+        """Message list for the next request (a shallow copy: providers may keep or edit the list)"""
+        # Every tool call needs a result before the conversation moves on (Anthropic rejects it otherwise)
+        for formatted in self._normalizer.close():
+            self._push(formatted)
+        return list(self._window)
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+    def _push(self, formatted: Dict[str, Any]) -> None:
+        size = _size(formatted)
+        limit = int(self.target_chars * MAX_TOOL_RESULT_SHARE)
+        if formatted["role"] == "tool" and size > limit and isinstance(formatted["content"], str):
+            keep = max(0, len(formatted["content"]) - (size - limit) - len(CLIPPED_MARKER))
+            formatted = {**formatted, "content": formatted["content"][:keep] + CLIPPED_MARKER}
+            size = _size(formatted)
+        self._window.append(formatted)
+        self._sizes.append(size)
+        self._chars += size
+        if self._chars > self.target_chars:
+            self._truncate()
+
+    def _truncate(self) -> None:
+        """
+        Drop the oldest messages, an assistant message together with its tool
+        results. The system prompt, the latest user message and the newest
+        assistant/tool block are kept; older blocks go first, then the
+        blocks between that user message and the newest one
+        """
+        window = self._window
+        last_block = len(window) - 1
+        while last_block > 1 and window[last_block]["role"] == "tool":
+            last_block -= 1
+        user = next((i for i in range(last_block, 0, -1) if window[i]["role"] == "user"), None)
+
+        if user is None:
+            self._drop(1, last_block)
+        else:
+            dropped = self._drop(1, user)
+            self._drop(user - dropped + 1, last_block - dropped)
+        self._drop_orphans()
+
+    def _drop(self, start: int, stop: int) -> int:
+        """Drop messages from `start` until within budget, never past `stop`; returns the count"""
+        window, sizes = self._window, self._sizes
+        end = start
+        chars = self._chars
+        while chars > self.target_chars and end < stop:
+            chars -= sizes[end]
+            end += 1
+        # Tool results go with their assistant message
+        while end < stop and window[end]["role"] == "tool":
+            chars -= sizes[end]
+            end += 1
+        if end > start:
+            del window[start:end]
+            del sizes[start:end]
+            self.dropped += end - start
+            self._chars = chars
+        return end - start
+
+    def _drop_orphans(self) -> None:
+        """Remove tool results not answering a call of the assistant message before them"""
+        window, sizes = self._window, self._sizes
+        open_ids: set = set()
+        i = 1
+        while i < len(window):
+            msg = window[i]
+            if msg["role"] != "tool":
+                open_ids = {tc["id"] for tc in msg.get("tool_calls") or ()}
+            elif msg.get("tool_call_id") not in open_ids:
+                self._chars -= sizes[i]
+                del window[i], sizes[i]
+                self.dropped += 1
+                continue
+            i += 1
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for per-call tool parameter validation
+Compares the compiled validator against the previous implementation, which
+rebuilt the `parameters` list of pydantic objects on every call, and measures
+how much memory each call allocates.
+
+Usage:
+    python benchmarks/bench_tool_validation.py [--calls N]
+"""
+import argparse
+import sys
+import timeit
+import tracemalloc
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools import ReadFileTool, LsTool, BaseTool
+
+CASES = {
+    "read_file (complete args)": (ReadFileTool, {"path": "README.md", "encoding": "utf-8"}),
+    "ls (defaults filled)": (LsTool, {"path": "."}),
+}
+
+
+def legacy_validate(tool: BaseTool, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Validation as it worked before compilation: `parameters` rebuilt per call"""
+    validated = {}
+    for param in tool.parameters:
+        if param.required and param.name not in kwargs:
+            raise ValueError(f"Required parameter '{param.name}' is missing")
+        if param.name in kwargs:
+            validated[param.name] = kwargs[param.name]
+        elif param.default is not None:
+            validated[param.name] = param.default
+    return validated
+
+
+def peak_bytes_per_call(validate: Callable, kwargs: Dict[str, Any], calls: int) -> int:
+    """
+    Largest transient allocation of any single call: every call frees what it
+    allocates, so the traced peak above baseline is the per-call footprint
+    """
+    for _ in repeat(None, 100):  # let the interpreter specialize outside the measurement
+        validate(kwargs)
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in repeat(None, calls):
+            validate(kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def net_peak_bytes_per_call(validate: Callable, kwargs: Dict[str, Any], calls: int) -> int:
+    """Per-call footprint minus the measurement's own overhead (an identity call)"""
+    return peak_bytes_per_call(validate, kwargs, calls) - peak_bytes_per_call(lambda args: args, kwargs, calls)
+
+
+def run_benchmark(calls: int = 100_000) -> Dict[str, Dict[str, float]]:
+    """Time both validators and measure allocations for every case"""
+    results = {}
+    for label, (tool_class, kwargs) in CASES.items():
+        tool = tool_class()
+        compiled = tool.compiled.validate
+
+        def legacy(args, tool=tool):
+            return legacy_validate(tool, args)
+
+        results[label] = {
+            "legacy_ns": timeit.timeit(lambda: legacy(kwargs), number=calls) / calls * 1e9,
+            "compiled_ns": timeit.timeit(lambda: compiled(kwargs), number=calls) / calls * 1e9,
+            "legacy_bytes_peak": net_peak_bytes_per_call(legacy, kwargs, 1000),
+            "compiled_bytes_peak": net_peak_bytes_per_call(compiled, kwargs, 1000),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tool parameter validation")
+    parser.add_argument("--calls", type=int, default=100_000, help="Calls per timing run")
+    args = parser.parse_args()
+
+    for label, r in run_benchmark(args.calls).items():
+        print(f"{label}:")
+        print(f"  legacy   {r['legacy_ns']:8.0f} ns/call  peak alloc {r['legacy_bytes_peak']:6d} B/call")
+        print(f"  compiled {r['compiled_ns']:8.0f} ns/call  peak alloc {r['compiled_bytes_peak']:6d} B/call"
+              f"  ({r['legacy_ns'] / r['compiled_ns']:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import asyncio
+import itertools
+import sys
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCHMARKS_DIR.parent
+for path in (BACKEND_DIR, BENCHMARKS_DIR, BACKEND_DIR / "tests"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from fakes import agent, fake_provider  # noqa: F401  (fixtures shared with the tests)
+
+
+@pytest.fixture
+def event_loop_runner():
+    """Run coroutines on one loop for the whole benchmark (no per-round loop setup)"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def session_ids():
+    """Fresh session id per benchmark round so history does not accumulate"""
+    counter = itertools.count()
+    return lambda prefix="bench": f"{prefix}-{next(counter)}"
@@ -0,0 +1,170 @@
+"""
+Local fake LLM provider for benchmarks, load tests and unit tests
+Produces deterministic responses shaped like LiteLLM's streaming chunks
+(choices[0].delta.content / delta.tool_calls, trailing usage chunk), so the
+agent runs its real streaming, tool and persistence code without network calls.
+
+Usage:
+    provider = FakeLLMProvider(script=tool_loop(iterations=2))
+    providers.use_completion_backend(provider.acompletion)
+"""
+import asyncio
+import collections
+import json
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class FakeReply:
+    """One assistant turn: text content and/or (tool name, arguments) calls"""
+    content: str = ""
+    tool_calls: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+
+
+Script = Callable[[List[Dict[str, Any]]], FakeReply]
+
+
+class FakeProviderError(Exception):
+    """Provider HTTP error shaped like LiteLLM's (status_code attribute)"""
+
+    def __init__(self, status_code: int, message: str = ""):
+        super().__init__(message or f"{status_code} from fake provider")
+        self.status_code = status_code
+
+
+def text_reply(text: str = "Here is a deterministic answer from the fake provider.") -> Script:
+    """Always answer with the same text, never call tools"""
+    return lambda messages: FakeReply(content=text)
+
+
+def tool_loop(iterations: int = 1, tool: str = "ls",
+              arguments: Optional[Callable[[int], Dict[str, Any]]] = None,
+              final_text: str = "Done. The tool results were analysed.") -> Script:
+    """
+    Call `tool` once per round for `iterations` rounds after the latest user
+    message, then answer. `arguments(round)` builds each call's arguments; the
+    default varies a string argument per round so calls are neither deduplicated
+    as repeats nor flagged by the agent's loop detection.
+    """
+    make_arguments = arguments or (lambda round_number: {"path": ".", "include": f"*{round_number}*"})
+
+    def script(messages: List[Dict[str, Any]]) -> FakeReply:
+        rounds = 0
+        for msg in reversed(messages):
+            if msg["role"] == "user":
+                break
+            if msg["role"] == "assistant" and msg.get("tool_calls"):
+                rounds += 1
+        if rounds >= iterations:
+            return FakeReply(content=final_text)
+        return FakeReply(
+            content="Let me check." if rounds == 0 else "",
+            tool_calls=[(tool, make_arguments(rounds))]
+        )
+
+    return script
+
+
+def estimate_tokens(text: str) -> int:
+    """Same ~4 characters per token approximation the conversation manager uses"""
+    return max(1, len(text) // 4)
+
+
+class FakeLLMProvider:
+    """Scripted stand-in for litellm.acompletion"""
+
+    def __init__(self, script: Optional[Script] = None, chunk_size: int = 8,
+                 first_token_delay: float = 0.0, chunk_delay: float = 0.0,
+                 rate_limit: Optional[Tuple[int, float]] = None):
+        self.script = script or text_reply()
+        self.chunk_size = chunk_size
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        # (max requests, window seconds): more requests in any window are rejected with a 429
+        self.rate_limit = rate_limit
+        self.calls = 0
+        self.rejected = 0
+        self.last_request: Optional[Dict[str, Any]] = None
+        self._recent: collections.deque = collections.deque()
+
+    def _check_rate_limit(self) -> None:
+        max_requests, window = self.rate_limit
+        now = time.monotonic()
+        while self._recent and self._recent[0] <= now - window:
+            self._recent.popleft()
+        if len(self._recent) >= max_requests:
+            self.rejected += 1
+            raise FakeProviderError(429, "RateLimitError: fake provider rate limit exceeded")
+        self._recent.append(now)
+
+    async def acompletion(self, **kwargs) -> Any:
+        if self.rate_limit:
+            self._check_rate_limit()
+        self.calls += 1
+        self.last_request = kwargs
+        messages = kwargs.get("messages", [])
+        reply = self.script(messages)
+        prompt_tokens = estimate_tokens(json.dumps(messages, default=str))
+
+        if kwargs.get("stream"):
+            return self._stream(reply, prompt_tokens, self.calls)
+
+        if self.first_token_delay:
+            await asyncio.sleep(self.first_token_delay)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(
+                content=reply.content,
+                tool_calls=[
+                    SimpleNamespace(id=f"call_{self.calls}_{i}", type="function",
+                                    function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+                    for i, (name, args) in enumerate(reply.tool_calls)
+                ] or None
+            ))],
+            usage=self._usage(prompt_tokens, reply)
+        )
+
+    def _usage(self, prompt_tokens: int, reply: FakeReply) -> SimpleNamespace:
+        completion_tokens = estimate_tokens(reply.content + json.dumps(reply.tool_calls))
+        return SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens
+        )
+
+    @staticmethod
+    def _chunk(content: Optional[str] = None, tool_calls: Optional[list] = None,
+               usage: Optional[SimpleNamespace] = None) -> SimpleNamespace:
+        choices = [] if usage is not None else [
+            SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=tool_calls), finish_reason=None)
+        ]
+        return SimpleNamespace(choices=choices, usage=usage)
+
+    async def _stream(self, reply: FakeReply, prompt_tokens: int, call_number: int):
+        if self.first_token_delay:
+            await asyncio.sleep(self.first_token_delay)
+
+        size = self.chunk_size
+        for start in range(0, len(reply.content), size):
+            yield self._chunk(content=reply.content[start:start + size])
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+
+        for index, (name, args) in enumerate(reply.tool_calls):
+            arguments = json.dumps(args)
+            # First delta carries id and name, the arguments follow in pieces
+            yield self._chunk(tool_calls=[SimpleNamespace(
+                index=index, id=f"call_{call_number}_{index}", type="function",
+                function=SimpleNamespace(name=name, arguments="")
+            )])
+            for start in range(0, len(arguments), size):
+                yield self._chunk(tool_calls=[SimpleNamespace(
+                    index=index, id=None, type=None,
+                    function=SimpleNamespace(name=None, arguments=arguments[start:start + size])
+                )])
+                if self.chunk_delay:
+                    await asyncio.sleep(self.chunk_delay)
+
+        yield self._chunk(usage=self._usage(prompt_tokens, reply))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Backend server wired to the fake LLM provider, for load testing
+Serves the real `main.app` (WebSocket endpoint, agent, tools, persistence)
+with LiteLLM replaced by FakeLLMProvider and conversations stored in a
+temporary directory. Adds /__bench__/stats and /__bench__/reset for the
+load generator (event-loop lag samples, RSS, open connections).
+
+Usage:
+    python benchmarks/fake_server.py --port 8765 [--tool-iterations 1] [--first-token-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCHMARKS_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BENCHMARKS_DIR))
+os.chdir(BACKEND_DIR)
+
+import main
+from app import providers
+from app.conversation_manager import ConversationManager
+from app.usage_ledger import UsageLedger
+from app.scheduler import llm_scheduler
+from fake_provider import FakeLLMProvider, text_reply, tool_loop
+
+
+def read_rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+class LoopLagSampler:
+    """Measures how late a periodic sleep wakes up (event-loop lag)"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def reset(self) -> None:
+        self.samples = []
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0}
+
+        def pct(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 2)
+
+        return {
+            "samples": len(samples),
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "max_ms": round(samples[-1] * 1000, 2)
+        }
+
+
+lag_sampler = LoopLagSampler()
+fake = FakeLLMProvider()
+
+
+@main.app.on_event("startup")
+async def start_lag_sampler():
+    asyncio.create_task(lag_sampler.run())
+
+
+@main.app.get("/__bench__/stats")
+async def bench_stats():
+    return {
+        "rss_bytes": read_rss_bytes(),
+        "connections": len(main.manager.active_connections),
+        "loop_lag": lag_sampler.summary(),
+        "llm_calls": fake.calls,
+        "time": time.time()
+    }
+
+
+@main.app.post("/__bench__/reset")
+async def bench_reset():
+    lag_sampler.reset()
+    return {"ok": True}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Run the backend against a fake LLM provider")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tool-iterations", type=int, default=0,
+                        help="Tool-loop rounds per turn (0 = plain text answers)")
+    parser.add_argument("--first-token-ms", type=float, default=50.0, help="Simulated time to first token")
+    parser.add_argument("--chunk-ms", type=float, default=2.0, help="Simulated delay between chunks")
+    parser.add_argument("--chunk-size", type=int, default=8, help="Characters per streamed chunk")
+    args = parser.parse_args()
+
+    fake.script = tool_loop(iterations=args.tool_iterations) if args.tool_iterations else text_reply(
+        "This is a deterministic streamed answer from the fake provider, long enough to produce "
+        "a realistic number of WebSocket frames per turn."
+    )
+    fake.first_token_delay = args.first_token_ms / 1000
+    fake.chunk_delay = args.chunk_ms / 1000
+    fake.chunk_size = args.chunk_size
+    providers.use_completion_backend(fake.acompletion)
+    llm_scheduler.configure(None)  # the fake provider has no rate limits to respect
+
+    data_dir = Path(tempfile.mkdtemp(prefix="dreamytin-load-"))
+    main.agent.conversation_manager = ConversationManager(data_dir / "conversations")
+    main.agent.usage_ledger = UsageLedger(data_dir / "usage")
+
+    import uvicorn
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main_cli()
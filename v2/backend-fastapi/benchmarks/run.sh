@@ -0,0 +1,19 @@
+#!/bin/bash
+
+# Run the benchmark suite, save results under benchmarks/results and compare
+# against the previous saved run so storage/streaming regressions stand out.
+# Extra arguments are passed to pytest, e.g. --benchmark-compare-fail=mean:20%
+cd "$(dirname "$0")/.."
+STORAGE="file://./benchmarks/results"
+
+COMPARE=""
+if ls benchmarks/results/*/*.json >/dev/null 2>&1; then
+    COMPARE="--benchmark-compare"
+fi
+
+python -m pytest benchmarks \
+    --benchmark-storage="$STORAGE" \
+    --benchmark-autosave \
+    $COMPARE \
+    --benchmark-columns=mean,stddev,median,rounds \
+    "$@"
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Startup import-time benchmark
+Runs `python -X importtime -c "import main"` in a fresh interpreter and reports
+the cumulative import time of the backend entry module, its slowest imports and
+whether any provider SDK was pulled in eagerly.
+
+Usage:
+    python benchmarks/startup_importtime.py [--runs N] [--top N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / "startup_budget.json"
+
+
+def load_budget() -> Dict[str, Any]:
+    """Load the startup budget checked into the repo"""
+    with open(BUDGET_FILE, 'r') as f:
+        return json.load(f)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Parse -X importtime output into (module, self_us, cumulative_us) rows"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure_once(module: str) -> List[Tuple[str, int, int]]:
+    """Import `module` in a fresh interpreter with -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def run_benchmark(module: str = None, runs: int = None) -> Dict[str, Any]:
+    """Measure startup import time; returns median time, slowest imports and eager SDK imports"""
+    budget = load_budget()
+    module = module or budget["module"]
+    runs = runs or budget.get("runs", 3)
+
+    totals_ms = []
+    rows: List[Tuple[str, int, int]] = []
+    for _ in range(runs):
+        rows = measure_once(module)
+        total_us = next((cum for name, _, cum in rows if name == module), 0)
+        totals_ms.append(total_us / 1000)
+
+    imported = {name for name, _, _ in rows}
+    forbidden = [
+        name for name in budget.get("forbidden_modules", [])
+        if name in imported
+    ]
+    slowest = sorted(rows, key=lambda row: row[1], reverse=True)
+
+    return {
+        "module": module,
+        "runs_ms": totals_ms,
+        "median_ms": statistics.median(totals_ms),
+        "budget_ms": budget["max_import_ms"],
+        "eager_provider_imports": forbidden,
+        "slowest_self_us": [
+            {"module": name, "self_us": self_us, "cumulative_us": cum}
+            for name, self_us, cum in slowest[:15]
+        ]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend startup import time")
+    parser.add_argument("--module", default=None, help="Module to import (default from budget file)")
+    parser.add_argument("--runs", type=int, default=None, help="Number of fresh interpreter runs")
+    parser.add_argument("--top", type=int, default=10, help="How many slow imports to show")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.module, args.runs)
+    print(f"import {report['module']}: median {report['median_ms']:.1f} ms "
+          f"(budget {report['budget_ms']} ms, runs: {', '.join(f'{t:.1f}' for t in report['runs_ms'])})")
+    if report["eager_provider_imports"]:
+        print(f"Eagerly imported provider SDKs: {', '.join(report['eager_provider_imports'])}")
+    print("\nSlowest imports (self time):")
+    for row in report["slowest_self_us"][:args.top]:
+        print(f"  {row['self_us'] / 1000:8.1f} ms  {row['module']}")
+
+    over_budget = report["median_ms"] > report["budget_ms"] or report["eager_provider_imports"]
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
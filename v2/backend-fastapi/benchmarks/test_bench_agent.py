@@ -0,0 +1,120 @@
+"""
+Agent turn pipeline benchmarks (pytest-benchmark) against the local fake provider
+
+    ./benchmarks/run.sh            # run, save and compare with the previous run
+"""
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from fake_provider import text_reply, tool_loop
+
+HISTORY_SIZES = [10, 1000, 10000]
+
+
+async def drain(events):
+    """Consume a process_message stream, returning the last event"""
+    last = None
+    async for event in events:
+        last = event
+    return last
+
+
+def seed_conversation(manager, session_id: str, message_count: int) -> None:
+    """Write a conversation with `message_count` alternating user/assistant messages"""
+    now = datetime.utcnow().isoformat() + "Z"
+    messages = [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Message {i}: " + "lorem ipsum dolor sit amet " * 4,
+            "timestamp": now
+        }
+        for i in range(message_count)
+    ]
+    conversation = {
+        "id": session_id,
+        "created_at": now,
+        "updated_at": now,
+        "model": "claude-3.5-haiku",
+        "messages": messages
+    }
+    manager._index["conversations"].append({
+        "id": session_id,
+        "title": "Seeded conversation",
+        "created_at": now,
+        "updated_at": now,
+        "message_count": message_count,
+        "model": "claude-3.5-haiku"
+    })
+    asyncio.run(manager._save_index())
+    with open(manager.conversations_dir / f"{session_id}.json", "w", encoding="utf-8") as f:
+        json.dump(conversation, f)
+
+
+def test_turn_latency_text_only(benchmark, agent, fake_provider, event_loop_runner, session_ids):
+    fake_provider.script = text_reply()
+
+    def turn():
+        return event_loop_runner(drain(agent.process_message("Hello there", session_id=session_ids())))
+
+    last = benchmark(turn)
+    assert last["type"] == "stream_end"
+
+
+def test_turn_latency_with_tool_call(benchmark, agent, fake_provider, event_loop_runner, session_ids):
+    fake_provider.script = tool_loop(iterations=1)
+
+    def turn():
+        return event_loop_runner(drain(agent.process_message("What is here?", session_id=session_ids())))
+
+    last = benchmark(turn)
+    assert last["type"] == "stream_end"
+
+
+@pytest.mark.parametrize("history", HISTORY_SIZES[:2])
+def test_tool_loop_iteration_cost(benchmark, agent, fake_provider, event_loop_runner, session_ids, history):
+    """Turn with 5 tool-loop iterations; per-iteration cost is reported in extra_info"""
+    iterations = 5
+    fake_provider.script = tool_loop(iterations=iterations)
+    manager = agent.conversation_manager
+
+    def setup():
+        session_id = session_ids(f"loop-{history}")
+        seed_conversation(manager, session_id, history)
+        return (session_id,), {}
+
+    def turn(session_id):
+        return event_loop_runner(drain(agent.process_message("Explore", session_id=session_id)))
+
+    last = benchmark.pedantic(turn, setup=setup, rounds=5, iterations=1)
+    assert last["type"] == "stream_end"
+    benchmark.extra_info["iterations"] = iterations
+    benchmark.extra_info["history_messages"] = history
+    if benchmark.stats:  # None under --benchmark-disable
+        benchmark.extra_info["per_iteration_ms"] = benchmark.stats.stats.mean * 1000 / iterations
+
+
+@pytest.mark.parametrize("history", HISTORY_SIZES)
+def test_conversation_add_message_throughput(benchmark, agent, event_loop_runner, history):
+    manager = agent.conversation_manager
+    seed_conversation(manager, "throughput", history)
+
+    def add():
+        return event_loop_runner(manager.add_message("throughput", "user", "One more message"))
+
+    assert benchmark(add) is True
+    benchmark.extra_info["history_messages"] = history
+
+
+@pytest.mark.parametrize("history", HISTORY_SIZES)
+def test_conversation_load_throughput(benchmark, agent, event_loop_runner, history):
+    manager = agent.conversation_manager
+    seed_conversation(manager, "load", history)
+
+    def load():
+        return event_loop_runner(manager.get_conversation_messages("load"))
+
+    assert len(benchmark(load)) == history
+    benchmark.extra_info["history_messages"] = history
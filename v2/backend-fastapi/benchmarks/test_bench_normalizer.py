@@ -0,0 +1,90 @@
+"""
+Message normalization benchmarks on synthetic 10k-message tool histories
+
+    ./benchmarks/run.sh -k normalizer
+
+"legacy" is the formatter + tool sequence validator the agent ran on every
+LLM call before the single-pass normalizer: it re-scanned ahead of every
+tool-calling message and list.insert()-ed each placeholder (quadratic with
+many missing results)
+"""
+import random
+from typing import Any, Dict, List
+
+import pytest
+
+from app.message_normalizer import format_message, normalize_messages
+
+HISTORY_SIZES = [1000, 10000]
+
+
+def synthetic_history(size: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """User turns, tool-calling assistant messages with 1-3 calls, ~1 in 5 results lost, some orphans"""
+    rng = random.Random(seed)
+    messages: List[Dict[str, Any]] = []
+    call_number = 0
+    while len(messages) < size:
+        messages.append({"role": "user", "content": "Look at the project", "timestamp": "t"})
+        ids = [f"call_{call_number + i}" for i in range(rng.randint(1, 3))]
+        call_number += len(ids)
+        messages.append({
+            "role": "assistant", "content": None, "timestamp": "t",
+            "tool_calls": [
+                {"id": i, "type": "function", "function": {"name": "ls", "arguments": '{"path": "."}'}}
+                for i in ids
+            ]
+        })
+        for call_id in ids:
+            if rng.random() > 0.2:
+                messages.append({"role": "tool", "tool_call_id": call_id, "content": "a.py\nb.py", "timestamp": "t"})
+        if rng.random() < 0.05:
+            messages.append({"role": "tool", "tool_call_id": "call_gone", "content": "late", "timestamp": "t"})
+        messages.append({"role": "assistant", "content": "Two files.", "timestamp": "t"})
+    return messages[:size]
+
+
+def legacy_normalize(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Previous agent implementation (_format_messages_for_api + _validate_tool_message_sequence)"""
+    messages = [format_message(msg) for msg in messages]
+    i = 0
+    while i < len(messages):
+        msg = messages[i]
+        if msg["role"] == "assistant" and msg.get("tool_calls"):
+            tool_call_ids = {tc["id"] for tc in msg["tool_calls"]}
+            found = set()
+            j = i + 1
+            while j < len(messages) and messages[j]["role"] == "tool":
+                if messages[j].get("tool_call_id") in tool_call_ids:
+                    found.add(messages[j]["tool_call_id"])
+                j += 1
+            for missing_id in tool_call_ids - found:
+                insert_index = i + 1
+                while (insert_index < len(messages) and messages[insert_index]["role"] == "tool"
+                       and messages[insert_index].get("tool_call_id") in tool_call_ids):
+                    insert_index += 1
+                messages.insert(insert_index, {
+                    "role": "tool", "tool_call_id": missing_id,
+                    "content": "Tool execution result not available"
+                })
+        i += 1
+    return messages
+
+
+IMPLEMENTATIONS = {
+    "legacy": legacy_normalize,
+    "single_pass": lambda messages: list(normalize_messages(messages)),
+}
+
+
+@pytest.fixture(autouse=True)
+def quiet_placeholder_warnings(caplog):
+    caplog.set_level("ERROR", logger="app.message_normalizer")
+
+
+@pytest.mark.parametrize("implementation", list(IMPLEMENTATIONS))
+@pytest.mark.parametrize("size", HISTORY_SIZES)
+def test_normalize_history(benchmark, implementation, size):
+    history = synthetic_history(size)
+    benchmark.group = f"normalize-{size}"
+    output = benchmark(IMPLEMENTATIONS[implementation], history)
+    assert len(output) >= len(history) * 0.9
@@ -0,0 +1,18 @@
+"""
+Startup import-time budget (benchmarks/startup_budget.json)
+
+    ./benchmarks/run.sh -k startup
+
+Wall-clock timing depends on machine load, so it runs with the benchmarks
+rather than in the default test suite
+"""
+from startup_importtime import run_benchmark
+
+
+def test_startup_import_within_budget():
+    report = run_benchmark()
+
+    assert report["median_ms"] <= report["budget_ms"], (
+        f"import main took {report['median_ms']:.0f} ms (budget {report['budget_ms']} ms); "
+        f"slowest: {report['slowest_self_us'][:5]}"
+    )
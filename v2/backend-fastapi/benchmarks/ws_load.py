@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+WebSocket load generator for /ws/{client_id}
+Opens N concurrent clients that each send messages at a fixed rate and
+measures time-to-first-frame, frames/sec, server event-loop lag and memory
+per connection. By default it starts benchmarks/fake_server.py (real backend,
+fake LLM provider) on a free port; pass --url to target a running server that
+exposes the /__bench__ endpoints.
+
+Usage:
+    python benchmarks/ws_load.py --clients 100 --messages 5 --rate 1
+    python benchmarks/ws_load.py --clients 50 --tool-iterations 2 --json
+"""
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import websockets
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+TERMINAL_EVENTS = {"stream_end", "error"}
+
+
+@dataclass
+class ClientStats:
+    """Measurements collected by one simulated client"""
+    first_frame_s: List[float] = field(default_factory=list)
+    turn_s: List[float] = field(default_factory=list)
+    frames: int = 0
+    errors: int = 0
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def http_json(url: str, method: str = "GET") -> Dict[str, Any]:
+    request = urllib.request.Request(url, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+async def fetch_json(url: str, method: str = "GET") -> Dict[str, Any]:
+    return await asyncio.to_thread(http_json, url, method)
+
+
+def start_fake_server(port: int, args: argparse.Namespace) -> subprocess.Popen:
+    """Run fake_server.py in a subprocess; its per-chunk DEBUG output is discarded"""
+    return subprocess.Popen(
+        [
+            sys.executable, str(BENCHMARKS_DIR / "fake_server.py"),
+            "--port", str(port),
+            "--tool-iterations", str(args.tool_iterations),
+            "--first-token-ms", str(args.first_token_ms),
+            "--chunk-ms", str(args.chunk_ms),
+            "--chunk-size", str(args.chunk_size)
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+
+async def wait_until_healthy(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await fetch_json(f"{base_url}/health")
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server at {base_url} did not become healthy within {timeout:.0f}s")
+            await asyncio.sleep(0.2)
+
+
+async def run_client(ws, stats: ClientStats, messages: int, interval: float,
+                     model: Optional[str], start: asyncio.Event) -> None:
+    """Send `messages` turns, one every `interval` seconds (or back-to-back)"""
+    await start.wait()
+    loop = asyncio.get_running_loop()
+    for i in range(messages):
+        turn_start = loop.time()
+        payload = {"message": f"Load test message {i}"}
+        if model:
+            payload["model"] = model
+        await ws.send(json.dumps(payload))
+
+        first = True
+        while True:
+            event = json.loads(await ws.recv())
+            stats.frames += 1
+            if first:
+                stats.first_frame_s.append(loop.time() - turn_start)
+                first = False
+            if event.get("type") in TERMINAL_EVENTS:
+                if event.get("type") == "error":
+                    stats.errors += 1
+                break
+        elapsed = loop.time() - turn_start
+        stats.turn_s.append(elapsed)
+
+        if interval and i < messages - 1:
+            await asyncio.sleep(max(0.0, interval - elapsed))
+
+
+async def run_load(base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    ws_url = base_url.replace("http", "ws", 1)
+    await fetch_json(f"{base_url}/__bench__/reset", method="POST")
+    baseline = await fetch_json(f"{base_url}/__bench__/stats")
+
+    # Connect everyone first so memory per connection excludes turn state
+    connections = []
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+
+    async def connect():
+        async with semaphore:
+            return await websockets.connect(
+                f"{ws_url}/ws/load-{uuid.uuid4().hex[:12]}",
+                max_size=None,
+                open_timeout=30
+            )
+
+    connections = await asyncio.gather(*(connect() for _ in range(args.clients)))
+    connected = await fetch_json(f"{base_url}/__bench__/stats")
+
+    start = asyncio.Event()
+    stats = [ClientStats() for _ in connections]
+    interval = 1.0 / args.rate if args.rate > 0 else 0.0
+    tasks = [
+        asyncio.create_task(run_client(ws, s, args.messages, interval, args.model, start))
+        for ws, s in zip(connections, stats)
+    ]
+    await fetch_json(f"{base_url}/__bench__/reset", method="POST")
+    started = time.perf_counter()
+    start.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    duration = time.perf_counter() - started
+    after = await fetch_json(f"{base_url}/__bench__/stats")
+
+    await asyncio.gather(*(ws.close() for ws in connections), return_exceptions=True)
+
+    failures = [r for r in results if isinstance(r, BaseException)]
+    first_frames = [t for s in stats for t in s.first_frame_s]
+    turns = [t for s in stats for t in s.turn_s]
+    frames = sum(s.frames for s in stats)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 2)
+
+    return {
+        "clients": args.clients,
+        "messages_per_client": args.messages,
+        "rate_per_client": args.rate,
+        "duration_s": round(duration, 3),
+        "turns_completed": len(turns),
+        "turn_errors": sum(s.errors for s in stats),
+        "client_failures": len(failures),
+        "time_to_first_frame_ms": {"p50": ms(percentile(first_frames, 0.50)),
+                                   "p99": ms(percentile(first_frames, 0.99))},
+        "turn_latency_ms": {"p50": ms(percentile(turns, 0.50)), "p99": ms(percentile(turns, 0.99))},
+        "frames": frames,
+        "frames_per_sec": round(frames / duration, 1) if duration else None,
+        "event_loop_lag_ms": after["loop_lag"],
+        "server_connections": connected["connections"],
+        "rss_mb": round(after["rss_bytes"] / 2**20, 1),
+        "memory_per_connection_kb": round(
+            (connected["rss_bytes"] - baseline["rss_bytes"]) / max(1, args.clients) / 1024, 1
+        ),
+        "llm_calls": after["llm_calls"] - baseline["llm_calls"],
+        "first_failure": repr(failures[0]) if failures else None
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    lag = report["event_loop_lag_ms"]
+    ttff = report["time_to_first_frame_ms"]
+    turn = report["turn_latency_ms"]
+    print(f"clients={report['clients']} messages/client={report['messages_per_client']} "
+          f"rate/client={report['rate_per_client']}/s duration={report['duration_s']}s")
+    print(f"turns:            {report['turns_completed']} ok, {report['turn_errors']} errors, "
+          f"{report['client_failures']} failed clients")
+    print(f"first frame:      p50 {ttff['p50']} ms  p99 {ttff['p99']} ms")
+    print(f"turn latency:     p50 {turn['p50']} ms  p99 {turn['p99']} ms")
+    print(f"frames:           {report['frames']} ({report['frames_per_sec']}/s)")
+    if lag.get("samples"):
+        print(f"event-loop lag:   p50 {lag['p50_ms']:.2f} ms  p99 {lag['p99_ms']:.2f} ms  "
+              f"max {lag['max_ms']:.2f} ms")
+    print(f"memory:           {report['memory_per_connection_kb']} KB/connection, "
+          f"{report['rss_mb']} MB RSS")
+    if report["first_failure"]:
+        print(f"first failure:    {report['first_failure']}")
+
+
+async def amain(args: argparse.Namespace) -> int:
+    server = None
+    base_url = args.url
+    if not base_url:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_fake_server(port, args)
+    try:
+        await wait_until_healthy(base_url)
+        report = await run_load(base_url.rstrip("/"), args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 1 if report["client_failures"] or report["turn_errors"] else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Concurrent WebSocket load test for the chat backend")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent WebSocket connections")
+    parser.add_argument("--messages", type=int, default=3, help="Messages sent by each client")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Messages per second per client (0 = back-to-back)")
+    parser.add_argument("--model", help="Model id to request (defaults to the server's default)")
+    parser.add_argument("--connect-concurrency", type=int, default=100,
+                        help="Maximum simultaneous connection handshakes")
+    parser.add_argument("--url", help="Target an already running server, e.g. http://127.0.0.1:8765")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    fake = parser.add_argument_group("fake server (ignored with --url)")
+    fake.add_argument("--tool-iterations", type=int, default=0)
+    fake.add_argument("--first-token-ms", type=float, default=50.0)
+    fake.add_argument("--chunk-ms", type=float, default=2.0)
+    fake.add_argument("--chunk-size", type=int, default=8)
+    return asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,19 +2,42 @@
 DreamyTin AI v2 Backend - FastAPI Server
 """
 import os
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+import asyncio
+import logging
+import uuid
+from pathlib import Path
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict
+from fastapi.responses import StreamingResponse
+from typing import Dict, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 from app.agent import DreamyTinAgent
+from app import providers
+from app.loop_monitor import loop_monitor
+from app.scheduler import llm_scheduler
+from app.turn_streams import TurnStream, turn_streams
+from app.http_stream import encode_events, negotiate_encoding, negotiate_format
+from app.tracing import tracer
+from tools import tool_registry
+from tools.workers import tool_workers
 
 # Load environment variables from root directory
-load_dotenv("../../.env")
+load_dotenv(Path(__file__).resolve().parent.parent.parent / ".env")
+
+# Span tracing (TRACING=console|file), off unless configured
+tracer.configure_from_env()
 
 # Initialize agent
 agent = DreamyTinAgent()
 
+logger = logging.getLogger(__name__)
+
+# Conversations idle this long move to the compressed archive (0, the default, disables it:
+# archived conversations are only listed with include_archived=true, which the sidebar does not ask for)
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "6"))
+
 # Initialize FastAPI app
 app = FastAPI(
     title="DreamyTin AI Backend",
@@ -40,8 +63,9 @@ class ConnectionManager:
         await websocket.accept()
         self.active_connections[client_id] = websocket
 
-    def disconnect(self, client_id: str):
-        if client_id in self.active_connections:
+    def disconnect(self, client_id: str, websocket: WebSocket = None):
+        # A reconnect may already have replaced this client's socket; keep the new one
+        if client_id in self.active_connections and websocket in (None, self.active_connections[client_id]):
             del self.active_connections[client_id]
 
     async def send_json(self, data: dict, client_id: str):
@@ -50,6 +74,85 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+@app.on_event("startup")
+async def start_config_watcher():
+    """Hot-reload system prompt and model config without restarting"""
+    agent.config.start_watching()
+
+@app.on_event("startup")
+async def preload_providers():
+    """Warm up provider SDKs in the background; /health answers meanwhile"""
+    asyncio.create_task(providers.preload())
+
+@app.on_event("startup")
+async def resolve_tool_plugins():
+    """Import tool plugins in the background; their schemas join the tool list once loaded"""
+    async def resolve():
+        if await tool_registry.resolve_plugins():
+            await agent.config.reload(force=True)
+    app.state.plugin_resolution = asyncio.create_task(resolve())
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    """Sample event-loop lag and capture stacks of blocking callbacks"""
+    loop_monitor.start()
+
+async def maintain_conversations():
+    """Recovery scan, then archive idle conversations and compact segments every ARCHIVE_INTERVAL_HOURS"""
+    manager = agent.conversation_manager
+    try:
+        report = await manager.recover()
+        logger.info("Recovered conversation index from %d files in %.0f ms (%d corrupted)",
+                    report["scanned"], report["duration_ms"], len(report["corrupted"]))
+    except Exception:
+        logger.exception("Conversation recovery scan failed")
+    while ARCHIVE_AFTER_DAYS > 0:
+        try:
+            result = await manager.archive_idle(ARCHIVE_AFTER_DAYS)
+            if result["archived"]:
+                logger.info("Archived %d idle conversations (%d bytes freed)",
+                            result["archived"], result["bytes_freed"])
+            await asyncio.to_thread(manager.archive.compact)
+        except Exception:
+            logger.exception("Conversation archiving failed")
+        await asyncio.sleep(ARCHIVE_INTERVAL_HOURS * 3600)
+
+@app.on_event("startup")
+async def start_conversation_maintenance():
+    """Rebuild the index from disk and move idle conversations out of the hot tier, in the background"""
+    app.state.maintenance = asyncio.create_task(maintain_conversations())
+
+@app.on_event("shutdown")
+async def stop_conversation_maintenance():
+    maintenance = getattr(app.state, "maintenance", None)
+    if maintenance is not None:
+        maintenance.cancel()
+        await asyncio.gather(maintenance, return_exceptions=True)
+    # Batched fsync: flush whatever the timer has not synced yet
+    await asyncio.to_thread(agent.conversation_manager.writer.sync)
+    agent.usage_ledger.close()
+
+@app.on_event("shutdown")
+async def stop_config_watcher():
+    await agent.config.stop_watching()
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await loop_monitor.stop()
+
+@app.on_event("shutdown")
+async def cancel_turns():
+    await turn_streams.shutdown()
+
+@app.on_event("shutdown")
+async def flush_traces():
+    """Write out spans still queued for the trace exporter"""
+    await asyncio.to_thread(tracer.shutdown)
+
+@app.on_event("shutdown")
+async def stop_tool_workers():
+    tool_workers.shutdown()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -64,10 +167,51 @@ async def health_check():
         "version": "0.0.2",
         "services": {
             "api": "running",
-            "websocket": "ready"
-        }
+            "websocket": "ready",
+            "providers": "ready" if providers.is_loaded() else "loading"
+        },
+        "config": agent.config.get_status(),
+        "event_loop": loop_monitor.get_status(),
+        "llm_scheduler": llm_scheduler.get_status(),
+        "turn_streams": turn_streams.get_status(),
+        "conversations": agent.conversation_manager.get_status(),
+        "tools": {**tool_registry.get_status(), "workers": tool_workers.get_status()}
     }
 
+# Event-loop diagnostics
+@app.get("/admin/loop")
+async def loop_status(limit: int = 20):
+    """Event-loop lag percentiles and recent blocking episodes with stacks"""
+    return {
+        **loop_monitor.get_status(),
+        "recent_slow_callbacks": loop_monitor.recent_slow_callbacks(limit)
+    }
+
+@app.post("/admin/profiler/start")
+async def start_profiler(interval_ms: float = 5.0):
+    """Start the sampling profiler on the event-loop thread"""
+    if not 1.0 <= interval_ms <= 1000.0:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if not loop_monitor.start_profiler(interval_ms / 1000):
+        raise HTTPException(status_code=409, detail="Profiler is already running or the monitor is stopped")
+    return {"profiling": True, "interval_ms": interval_ms}
+
+@app.post("/admin/profiler/stop")
+async def stop_profiler():
+    """Stop the sampling profiler and return its report"""
+    report = await loop_monitor.stop_profiler()
+    if report is None:
+        raise HTTPException(status_code=409, detail="Profiler is not running")
+    return report
+
+@app.get("/admin/profiler")
+async def profiler_report(top: int = 20):
+    """Live report of the running profiler, or the last finished one"""
+    report = loop_monitor.profiler_report(top)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No profile recorded yet")
+    return report
+
 @app.get("/models")
 async def get_models():
     """Get available models"""
@@ -75,10 +219,10 @@ async def get_models():
 
 # Conversation management endpoints
 @app.get("/conversations")
-async def list_conversations():
-    """Get list of all conversations"""
+async def list_conversations(include_archived: bool = False):
+    """Get list of all conversations (archived ones only on request)"""
     try:
-        conversations = await agent.conversation_manager.list_conversations()
+        conversations = await agent.conversation_manager.list_conversations(include_archived)
         return {"conversations": conversations}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -120,59 +264,188 @@ async def delete_conversation(session_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Usage and cost accounting (served from rollups, never by rescanning the ledger)
+@app.get("/usage")
+async def usage_totals():
+    """Token usage and cost across all LLM calls"""
+    return agent.usage_ledger.totals()
+
+@app.get("/usage/sessions")
+async def usage_by_session(limit: int = Query(50, ge=1, le=1000)):
+    """Sessions with the highest cost first"""
+    return {"sessions": agent.usage_ledger.breakdown("sessions", limit=limit)}
+
+@app.get("/usage/sessions/{session_id}")
+async def usage_of_session(session_id: str):
+    """Token usage and cost of one session"""
+    usage = agent.usage_ledger.get("sessions", session_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail="No usage recorded for this session")
+    return {"session_id": session_id, **usage}
+
+@app.get("/usage/models")
+async def usage_by_model():
+    """Token usage and cost per model"""
+    return {"models": agent.usage_ledger.breakdown("models")}
+
+@app.get("/usage/days")
+async def usage_by_day(start: Optional[str] = None, end: Optional[str] = None):
+    """Token usage and cost per UTC day (YYYY-MM-DD bounds, inclusive)"""
+    return {"days": agent.usage_ledger.breakdown("days", start=start, end=end)}
+
+def event_stream_response(request: Request, stream: TurnStream, after: int = 0,
+                          requested_format: Optional[str] = None) -> StreamingResponse:
+    """A turn's events after `after` as SSE or NDJSON, compressed if the client accepts it"""
+    media_type = negotiate_format(request.headers.get("accept"), requested_format)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # stop nginx from buffering the stream
+        "Vary": "Accept, Accept-Encoding",
+        "X-Stream-Id": stream.id,
+        "X-Session-Id": stream.session_id
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(
+        encode_events(stream.events(after), media_type, encoding),
+        media_type=media_type,
+        headers=headers
+    )
+
+@app.post("/chat")
+async def chat(request: Request, fmt: Optional[str] = Query(None, alias="format")):
+    """
+    Stream one agent turn over plain HTTP: the WebSocket's event types as
+    Server-Sent Events (default) or NDJSON (?format=ndjson or Accept: application/x-ndjson)
+    Body: {"message": ..., "model": ..., "session_id": ...}; a new session is created when omitted
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be JSON")
+    message = data.get("message", "") if isinstance(data, dict) else ""
+    if not message:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    session_id = data.get("session_id") or uuid.uuid4().hex[:9]
+    
+    running = turn_streams.active(session_id)
+    if running:
+        raise HTTPException(
+            status_code=409,
+            detail=f"A response is still being generated for this conversation (stream {running.id})"
+        )
+    
+    with tracer.span("http.chat", **{"session.id": session_id, "message.chars": len(message)}) as span:
+        # Runs on its own like a WebSocket turn: finishes and persists if the client goes away
+        stream = turn_streams.start(session_id, agent.process_message(
+            message=message,
+            session_id=session_id,
+            model_id=data.get("model"),
+            stream=True
+        ))
+        span.set_attribute("stream.id", stream.id)
+    return event_stream_response(request, stream, requested_format=fmt)
+
+@app.get("/chat/streams/{stream_id}")
+async def resume_chat_stream(request: Request, stream_id: str, last_event_id: Optional[int] = None,
+                             fmt: Optional[str] = Query(None, alias="format")):
+    """Resume a turn's stream after `last_event_id` (or the SSE Last-Event-ID header)"""
+    stream = turn_streams.get(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="Stream is no longer available")
+    if last_event_id is None:
+        try:
+            last_event_id = int(request.headers.get("last-event-id") or 0)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID must be an integer")
+    return event_stream_response(request, stream, last_event_id, fmt)
+
+async def forward_stream(websocket: WebSocket, stream: TurnStream, after: int = 0) -> int:
+    """Send a turn's events after `after` to this socket until the turn ends; returns frames sent"""
+    frames = 0
+    async for response_chunk in stream.events(after):
+        # Debug: Log what we're sending to frontend
+        if response_chunk.get("type") == "stream" and response_chunk.get("content"):
+            print(f"DEBUG: Streaming to frontend: {response_chunk['content'][:50]}...")
+        elif response_chunk.get("type") != "stream":
+            print(f"DEBUG: Sending signal: {response_chunk.get('type')}")
+        
+        # Sent on this socket, not via the manager: a reconnect may own the client id by now
+        await websocket.send_json(response_chunk)
+        frames += 1
+    return frames
+
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    """WebSocket endpoint for streaming chat responses"""
+    """
+    WebSocket endpoint for streaming chat responses
+    Events carry stream_id/event_id; after a reconnect, send
+    {"resume": stream_id, "last_event_id": n} to continue an interrupted turn
+    """
     await manager.connect(websocket, client_id)
     
     try:
         while True:
             # Receive message from client
             data = await websocket.receive_json()
+            
+            resume_id = data.get('resume')
+            if resume_id:
+                stream = turn_streams.get(resume_id)
+                if stream is None or stream.session_id != client_id:
+                    await websocket.send_json({
+                        "type": "resume_failed",
+                        "stream_id": resume_id,
+                        "error": "Stream is no longer available",
+                        "timestamp": datetime.utcnow().isoformat()
+                    })
+                    continue
+                with tracer.span("ws.resume", **{"client.id": client_id, "stream.id": resume_id}) as span:
+                    span.set_attribute("ws.frames_sent", await forward_stream(
+                        websocket, stream, int(data.get('last_event_id') or 0)
+                    ))
+                continue
+            
             message = data.get('message', '')
             model_id = data.get('model')
             
             if not message:
-                await manager.send_json({
+                await websocket.send_json({
                     "type": "error",
                     "error": "Message cannot be empty"
-                }, client_id)
+                })
                 continue
             
-            # Process message with agent and stream response
-            try:
-                async for response_chunk in agent.process_message(
+            running = turn_streams.active(client_id)
+            if running:
+                # One turn per conversation at a time; the client can resume the running one
+                await websocket.send_json({
+                    "type": "error",
+                    "error": "A response is still being generated for this conversation",
+                    "stream_id": running.id,
+                    "timestamp": datetime.utcnow().isoformat()
+                })
+                continue
+            
+            # Process message with agent and stream response (one trace per received message)
+            with tracer.span("ws.receive", **{"client.id": client_id, "message.chars": len(message)}) as span:
+                # The turn runs on its own: it finishes and persists even if this socket drops
+                stream = turn_streams.start(client_id, agent.process_message(
                     message=message,
                     session_id=client_id,
                     model_id=model_id,
                     stream=True
-                ):
-                    # Debug: Log what we're sending to frontend
-                    if response_chunk.get("type") == "stream" and response_chunk.get("content"):
-                        print(f"DEBUG: Streaming to frontend: {response_chunk['content'][:50]}...")
-                    elif response_chunk.get("type") != "stream":
-                        print(f"DEBUG: Sending signal: {response_chunk.get('type')}")
-                    
-                    await manager.send_json(response_chunk, client_id)
-                
-            except Exception as e:
-                await manager.send_json({
-                    "type": "error",
-                    "error": f"Agent processing error: {str(e)}",
-                    "timestamp": datetime.utcnow().isoformat()
-                }, client_id)
+                ))
+                span.set_attribute("stream.id", stream.id)
+                span.set_attribute("ws.frames_sent", await forward_stream(websocket, stream))
             
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
+        manager.disconnect(client_id, websocket)
         print(f"Client {client_id} disconnected")
     except Exception as e:
         print(f"WebSocket error: {e}")
-        manager.disconnect(client_id)
-        await manager.send_json({
-            "type": "error",
-            "error": f"Connection error: {str(e)}",
-            "timestamp": datetime.utcnow().isoformat()
-        }, client_id)
+        manager.disconnect(client_id, websocket)
 
 if __name__ == "__main__":
     import uvicorn
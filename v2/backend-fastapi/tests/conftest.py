@@ -0,0 +1,11 @@
+import sys
+from pathlib import Path
+
+# Tests import backend modules the same way main.py does (from the backend root);
+# the fake LLM provider is shared with the benchmarks
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+for path in (BACKEND_DIR, BACKEND_DIR / "benchmarks"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from fakes import agent, fake_provider  # noqa: E402,F401  (shared fixtures)
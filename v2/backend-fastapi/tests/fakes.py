@@ -0,0 +1,32 @@
+"""
+Fixtures shared by tests/conftest.py and benchmarks/conftest.py, so the
+benchmarks run against the same fake provider and agent the tests check
+"""
+import pytest
+
+
+@pytest.fixture
+def fake_provider():
+    """Route LLM calls to a scripted FakeLLMProvider for the duration of a test"""
+    from app import providers
+    from fake_provider import FakeLLMProvider
+
+    provider = FakeLLMProvider()
+    providers.use_completion_backend(provider.acompletion)
+    yield provider
+    providers.use_completion_backend(None)
+
+
+@pytest.fixture
+def agent(tmp_path, fake_provider):
+    """Agent with conversations stored in a temporary directory"""
+    from app.agent import DreamyTinAgent
+    from app.conversation_manager import ConversationManager
+    from app.scheduler import llm_scheduler
+    from app.usage_ledger import UsageLedger
+
+    agent = DreamyTinAgent()
+    agent.conversation_manager = ConversationManager(tmp_path / "conversations")
+    agent.usage_ledger = UsageLedger(tmp_path / "usage")
+    llm_scheduler.configure(None)  # the fake provider has no rate limits to respect
+    return agent
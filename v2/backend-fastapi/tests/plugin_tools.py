@@ -0,0 +1,63 @@
+"""
+Tool plugins loaded by name in test_tool_plugins.py (never imported by the tests themselves)
+"""
+import os
+from typing import List
+
+from tools import BaseTool, ToolParameter, ToolResult
+
+
+class _PluginTool(BaseTool):
+    tool_name = ""
+
+    @property
+    def name(self) -> str:
+        return self.tool_name
+
+    @property
+    def description(self) -> str:
+        return f"Test plugin {self.tool_name}"
+
+
+class WordCountTool(_PluginTool):
+    tool_name = "word_count"
+
+    @property
+    def read_only(self) -> bool:
+        return True
+
+    @property
+    def parameters(self) -> List[ToolParameter]:
+        return [ToolParameter(name="text", type="string", description="Text to count")]
+
+    async def execute(self, text: str) -> ToolResult:
+        return ToolResult(success=True, data={"words": len(text.split()), "pid": os.getpid()})
+
+
+class SpinTool(_PluginTool):
+    tool_name = "spin"
+
+    async def execute(self) -> ToolResult:
+        while True:
+            pass
+
+
+class BigOutputTool(_PluginTool):
+    tool_name = "big_output"
+
+    async def execute(self) -> ToolResult:
+        return ToolResult(success=True, data="x" * 100000)
+
+
+class MemoryHogTool(_PluginTool):
+    tool_name = "memory_hog"
+
+    async def execute(self) -> ToolResult:
+        return ToolResult(success=True, data=len(bytearray(2 * 1024 ** 3)))
+
+
+class CrashTool(_PluginTool):
+    tool_name = "crash"
+
+    async def execute(self) -> ToolResult:
+        os._exit(1)
@@ -0,0 +1,147 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.archive import ConversationArchive
+from app.conversation_manager import ConversationManager
+
+
+def backdate(manager, session_id, days):
+    """Pretend a conversation was last updated `days` ago"""
+    stamp = (datetime.utcnow() - timedelta(days=days)).isoformat() + 'Z'
+    for entry in manager._index["conversations"]:
+        if entry["id"] == session_id:
+            entry["updated_at"] = stamp
+
+
+async def seed(manager, session_id, turns=3):
+    await manager.create_conversation(session_id)
+    for i in range(turns):
+        await manager.add_message(session_id, "user", f"Question {i} about {session_id}")
+        await manager.add_message(session_id, "assistant", f"Answer {i} " + "lorem ipsum " * 50)
+
+
+def test_idle_conversations_move_to_archive_and_stay_readable(tmp_path):
+    async def scenario():
+        manager = ConversationManager(tmp_path)
+        for session_id in ("old-1", "old-2", "recent"):
+            await seed(manager, session_id)
+        before = {s: await manager.get_conversation(s) for s in ("old-1", "old-2")}
+        backdate(manager, "old-1", 40)
+        backdate(manager, "old-2", 31)
+
+        result = await manager.archive_idle(30)
+        after = {s: await manager.get_conversation(s) for s in ("old-1", "old-2")}
+        return manager, before, after, result
+
+    manager, before, after, result = asyncio.run(scenario())
+    assert result["archived"] == 2
+    assert result["bytes_written"] < result["bytes_freed"]
+    assert after == before
+    assert not (tmp_path / "old-1.json").exists()
+    assert [c["id"] for c in asyncio.run(manager.list_conversations())] == ["recent"]
+    listed = asyncio.run(manager.list_conversations(include_archived=True))
+    assert {c["id"]: c.get("archived", False) for c in listed} == {"old-1": True, "old-2": True, "recent": False}
+
+    # A fresh manager (server restart) finds archived conversations through the offset index
+    reopened = ConversationManager(tmp_path)
+    assert asyncio.run(reopened.get_conversation("old-2")) == before["old-2"]
+
+
+def test_new_message_brings_conversation_back_to_hot_tier(tmp_path):
+    async def scenario():
+        manager = ConversationManager(tmp_path)
+        await seed(manager, "revived")
+        backdate(manager, "revived", 60)
+        await manager.archive_idle(30)
+        await manager.add_message("revived", "user", "Picking this up again")
+        return manager, await manager.get_conversation_messages("revived")
+
+    manager, messages = asyncio.run(scenario())
+    assert len(messages) == 7 and messages[-1]["content"] == "Picking this up again"
+    assert "revived" not in manager.archive
+    assert (tmp_path / "revived.json").exists()
+    entry = asyncio.run(manager.list_conversations())[0]
+    assert entry["id"] == "revived" and entry["message_count"] == 7
+    assert entry["title"].startswith("Question 0")
+
+
+def test_crash_while_reopening_keeps_the_conversation(tmp_path, monkeypatch):
+    async def scenario():
+        manager = ConversationManager(tmp_path)
+        await seed(manager, "revived")
+        backdate(manager, "revived", 60)
+        await manager.archive_idle(30)
+
+        def crash(session_ids):
+            raise SystemExit("power cut")
+
+        monkeypatch.setattr(manager.archive, "remove", crash)
+        try:
+            await manager.add_message("revived", "user", "Picking this up again")
+        except SystemExit:
+            pass
+
+    asyncio.run(scenario())
+    # The hot copy and its index entry landed before the archive record was touched
+    reopened = ConversationManager(tmp_path)
+    messages = asyncio.run(reopened.get_conversation_messages("revived"))
+    assert messages[-1]["content"] == "Picking this up again"
+    listed = asyncio.run(reopened.list_conversations(include_archived=True))
+    assert [(c["id"], c["message_count"]) for c in listed] == [("revived", 7)]
+
+
+def test_delete_archived_conversation_and_compact(tmp_path):
+    async def scenario():
+        manager = ConversationManager(tmp_path)
+        for session_id in ("a", "b", "c"):
+            await seed(manager, session_id)
+            backdate(manager, session_id, 90)
+        await manager.archive_idle(30)
+        deleted = await manager.delete_conversation("a") and await manager.delete_conversation("b")
+        return manager, deleted
+
+    manager, deleted = asyncio.run(scenario())
+    assert deleted
+    assert asyncio.run(manager.get_conversation("a")) is None
+    segment_bytes = manager.archive.get_status()["bytes"]
+
+    assert manager.archive.compact() == {"rewritten": 1, "deleted": 0}
+    assert manager.archive.get_status()["bytes"] < segment_bytes
+    assert len(asyncio.run(manager.get_conversation("c"))["messages"]) == 6
+
+    asyncio.run(manager.delete_conversation("c"))
+    assert manager.archive.compact() == {"rewritten": 0, "deleted": 1}
+    assert manager.archive.get_status()["segments"] == 0
+
+
+def test_compaction_does_not_resurrect_conversations_changed_meanwhile(tmp_path):
+    async def scenario():
+        manager = ConversationManager(tmp_path)
+        for session_id in ("a", "b", "c", "d", "e"):
+            await seed(manager, session_id)
+            backdate(manager, session_id, 90)
+        await manager.archive_idle(30)
+        for session_id in ("a", "b", "c"):
+            await manager.delete_conversation(session_id)
+        return manager
+
+    manager = asyncio.run(scenario())
+    archive = manager.archive
+    write_segment = archive._write_segment
+
+    def racing_write(chunks):
+        # While the copy is being written, the loop deletes "d"
+        archive.remove(["d"])
+        return write_segment(chunks)
+
+    archive._write_segment = racing_write
+    assert archive.compact() == {"rewritten": 1, "deleted": 0}
+    assert "d" not in archive and archive.read("d") is None
+    assert len(archive.read("e")["messages"]) == 6
+    assert archive.get_status()["segments"] == 1
+
+
+def test_records_keep_the_codec_they_were_written_with(tmp_path):
+    archive = ConversationArchive(tmp_path, codec="gzip")
+    archive.add([({"id": "x", "messages": []}, {"id": "x"})])
+    assert ConversationArchive(tmp_path).read("x") == {"id": "x", "messages": []}
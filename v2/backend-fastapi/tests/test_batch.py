@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+from app.batch import BatchRunner, ResultWriter, completed_job_ids, load_jobs
+from fake_provider import FakeProviderError, FakeReply
+
+
+def write_prompts(path, entries):
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+
+
+def run_batch(runner, prompts, output, **kwargs):
+    jobs = load_jobs(prompts)
+    skip = completed_job_ids(output, **kwargs)
+    writer = ResultWriter(output)
+    try:
+        return asyncio.run(runner.run(jobs, writer, skip))
+    finally:
+        writer.close()
+
+
+def read_results(path):
+    return {record["id"]: record for record in map(json.loads, path.read_text().splitlines())}
+
+
+def test_batch_runs_prompts_with_tools_and_resumes(agent, fake_provider, tmp_path):
+    def script(messages):
+        if messages[-1]["role"] == "tool":
+            return FakeReply(content="Listed.")
+        if "list" in messages[-1]["content"]:
+            return FakeReply(content="Looking.", tool_calls=[("ls", {"path": str(tmp_path)})])
+        return FakeReply(content=f"Echo: {messages[-1]['content']}")
+
+    fake_provider.script = script
+    prompts = tmp_path / "prompts.jsonl"
+    output = tmp_path / "out" / "results.jsonl"
+    write_prompts(prompts, [
+        {"id": "a", "prompt": "hello", "metadata": {"suite": "smoke"}},
+        {"id": "b", "prompt": "please list files"},
+        {"prompt": "third"},
+    ])
+
+    summary = run_batch(BatchRunner(agent, log=lambda line: None), prompts, output)
+    assert summary["ok"] == 3 and summary["skipped"] == 0
+
+    results = read_results(output)
+    assert results["a"]["response"] == "Echo: hello"
+    assert results["a"]["metadata"] == {"suite": "smoke"}
+    assert results["b"]["response"] == "Listed."
+    assert results["b"]["tool_calls"] == ["ls"]
+    assert results["3"]["status"] == "ok"
+
+    # Simulate a crash mid-write, plus a new prompt: only the new one runs
+    with open(output, "a") as f:
+        f.write('{"id": "d", "sta')
+    write_prompts(prompts, [
+        {"id": "a", "prompt": "hello"}, {"id": "b", "prompt": "please list files"},
+        {"prompt": "third"}, {"id": "d", "prompt": "fourth"},
+    ])
+    calls_before = fake_provider.calls
+    summary = run_batch(BatchRunner(agent, log=lambda line: None), prompts, output)
+    assert summary["skipped"] == 3 and summary["ok"] == 1
+    assert fake_provider.calls == calls_before + 1
+    assert sorted(read_results(output)) == ["3", "a", "b", "d"]  # appended in completion order
+
+
+def test_rate_limited_prompt_is_retried_in_a_clean_session(agent, fake_provider, tmp_path):
+    attempts = []
+
+    def script(messages):
+        attempts.append(len(messages))
+        if len(attempts) == 1:
+            raise FakeProviderError(429, "litellm.RateLimitError: 429 Too Many Requests")
+        return FakeReply(content="Done.")
+
+    fake_provider.script = script
+    prompts = tmp_path / "prompts.jsonl"
+    output = tmp_path / "results.jsonl"
+    write_prompts(prompts, [{"id": "only", "prompt": "hi"}])
+
+    runner = BatchRunner(agent, max_attempts=3, retry_base_delay=0.01, log=lambda line: None)
+    summary = run_batch(runner, prompts, output)
+
+    record = read_results(output)["only"]
+    # Retried once by the batch, not additionally by the scheduler
+    assert record["status"] == "ok" and record["attempts"] == 2 and len(attempts) == 2
+    assert summary["retries"] == 1
+    assert attempts[0] == attempts[1]  # the retry did not see the failed attempt's history
+    assert all(lane.cooldown_until > 0 for lane in runner._lanes.values())
+
+
+def test_failed_prompts_rerun_only_when_asked(agent, fake_provider, tmp_path):
+    def script(messages):
+        raise RuntimeError("invalid request")
+
+    fake_provider.script = script
+    prompts = tmp_path / "prompts.jsonl"
+    output = tmp_path / "results.jsonl"
+    write_prompts(prompts, [{"id": "x", "prompt": "hi"}])
+
+    summary = run_batch(BatchRunner(agent, log=lambda line: None), prompts, output)
+    assert summary["error"] == 1 and summary["retries"] == 0  # not retryable
+    assert completed_job_ids(output) == {"x"}
+    assert completed_job_ids(output, retry_failed=True) == set()
+
+
+def test_runs_into_different_outputs_keep_their_conversations(agent, fake_provider, tmp_path):
+    fake_provider.script = lambda messages: FakeReply(content="Done.")
+    prompts = tmp_path / "prompts.jsonl"
+    write_prompts(prompts, [{"prompt": "first"}])
+
+    first = tmp_path / "first.jsonl"
+    second = tmp_path / "second.jsonl"
+    run_batch(BatchRunner(agent, log=lambda line: None), prompts, first)
+    run_batch(BatchRunner(agent, log=lambda line: None), prompts, second)
+
+    first_session = read_results(first)["1"]["session_id"]
+    second_session = read_results(second)["1"]["session_id"]
+    assert first_session != second_session and first_session.startswith("batch-")
+    assert asyncio.run(agent.conversation_manager.get_conversation(first_session)) is not None
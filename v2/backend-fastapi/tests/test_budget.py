@@ -0,0 +1,114 @@
+import asyncio
+from dataclasses import replace
+
+import pytest
+
+from app.budget import BudgetController, LoopDetector, TurnBudget
+from fake_provider import FakeReply, tool_loop
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_turn(agent, message="Explore", session_id="budget"):
+    async def run():
+        return [event async for event in agent.process_message(message, session_id=session_id)]
+    return asyncio.run(run())
+
+
+def test_turn_budget_merges_global_and_model_overrides():
+    config = {
+        "turnBudget": {"maxToolCalls": 5, "maxCostUsd": 0.1},
+        "models": {"big": {"turnBudget": {"maxCostUsd": 2.0, "maxWallClockSeconds": None}}}
+    }
+    budget = TurnBudget.for_model(config, "big")
+    assert budget.max_tool_calls == 5
+    assert budget.max_cost_usd == 2.0
+    assert budget.max_wall_clock_s is None
+    assert budget.max_iterations == TurnBudget().max_iterations
+    assert TurnBudget.for_model(config, "other").max_cost_usd == 0.1
+
+
+def test_loop_detector_repeated_and_near_duplicate_calls():
+    detector = LoopDetector()
+    assert detector.observe([("read_file", {"path": "./app/main.py"})]) is None
+    assert detector.observe([("read_file", {"path": "app/main.py "})]) is not None
+
+
+def test_loop_detector_cycle_between_files():
+    detector = LoopDetector()
+    results = [
+        detector.observe([("read_file", {"path": path, "lines": lines})])
+        for lines, path in enumerate(["a.py", "b.py"] * 3, start=1)
+    ]
+    assert results[:5] == [None] * 5
+    assert "cycled through the same 2 tool call(s)" in results[5]
+
+
+def test_loop_detector_numeric_only_variation():
+    detector = LoopDetector()
+    outcomes = [detector.observe([("ls", {"path": ".", "max_results": n})]) for n in (100, 200, 300)]
+    assert outcomes[:2] == [None, None]
+    assert outcomes[2] is not None
+
+
+def test_controller_limits():
+    clock = FakeClock()
+    controller = BudgetController(
+        TurnBudget(max_wall_clock_s=10, max_total_tokens=None, max_tool_calls=3,
+                   max_cost_usd=0.01, max_iterations=None),
+        pricing={"input": 0.003, "output": 0.015},
+        clock=clock
+    )
+    controller.record_llm_call(1000, 200)
+    assert controller.cost_usd == pytest.approx(0.006)
+    assert controller.check() is None
+
+    assert controller.admit_tool_calls([("ls", {"path": "a"}), ("ls", {"path": "b"})]) is None
+    over = controller.admit_tool_calls([("ls", {"path": "c"}), ("ls", {"path": "d"})])
+    assert over.limit == "tool_calls" and controller.tool_calls == 2
+
+    controller.record_llm_call(1000, 200)
+    assert controller.check().limit == "cost"
+
+    controller.cost_usd = 0
+    clock.now += 11
+    assert controller.check().limit == "wall_clock"
+
+
+def test_agent_stops_at_iteration_budget(agent, fake_provider):
+    snapshot = agent.config.snapshot
+    agent.config._snapshot = replace(snapshot, model_config={
+        **snapshot.model_config, "turnBudget": {"maxIterations": 3, "maxCostUsd": None}
+    })
+    fake_provider.script = tool_loop(iterations=50)
+
+    events = run_turn(agent)
+    exhausted = [event for event in events if event["type"] == "budget_exhausted"]
+    assert len(exhausted) == 1
+    assert exhausted[0]["limit"] == "iterations"
+    assert exhausted[0]["usage"]["llm_calls"] == 4  # initial response + 3 iterations
+    assert events[-1]["type"] == "stream_end"
+
+
+def test_agent_stops_repeated_calls_and_keeps_history_valid(agent, fake_provider):
+    def script(messages):
+        return FakeReply(content="", tool_calls=[("ls", {"path": "."})])
+
+    fake_provider.script = script
+    events = run_turn(agent, session_id="loop")
+
+    exhausted = [event for event in events if event["type"] == "budget_exhausted"]
+    assert [event["limit"] for event in exhausted] == ["loop"]
+    assert sum(event["type"] == "tool_result" for event in events) == 1
+
+    messages = asyncio.run(agent.conversation_manager.get_conversation_messages("loop"))
+    calls = [tc["id"] for m in messages if m["role"] == "assistant" for tc in m.get("tool_calls") or []]
+    results = [m["tool_call_id"] for m in messages if m["role"] == "tool"]
+    assert calls == results
+    assert messages[-1]["content"].startswith("Tool call not executed: Stopped a tool loop")
@@ -0,0 +1,67 @@
+import asyncio
+
+from app.capabilities import build_capabilities, unknown_model
+from fake_provider import text_reply
+
+CONFIG = {
+    "models": {
+        "gemini-2.0-flash": {"provider": "google", "name": "gemini-2.0-flash-exp", "contextWindow": 1000000},
+        "legacy": {"provider": "anthropic", "name": "claude-legacy", "maxTokens": 100000},
+        "no-tools": {"provider": "openai", "name": "o-mini", "maxOutputTokens": 1000,
+                     "capabilities": {"tools": False, "streamUsage": False}}
+    }
+}
+
+
+def test_table_from_config():
+    table = build_capabilities(CONFIG)
+
+    gemini = table["gemini-2.0-flash"]
+    assert gemini.tools and not gemini.parallel_tool_calls
+    assert gemini.litellm_model == "gemini/gemini-2.0-flash-exp"
+    assert gemini.context_window == 1000000 and gemini.max_output_tokens == 8192
+
+    legacy = table["legacy"]
+    assert legacy.context_window == 100000  # maxTokens meant the context window
+    assert legacy.input_tokens == 100000 - legacy.max_output_tokens
+
+    params = table["no-tools"].completion_params(stream=True, tools=[{"type": "function"}])
+    assert params["max_tokens"] == 1000
+    assert "tools" not in params and "stream_options" not in params
+
+    assert not unknown_model("mystery-model").tools
+
+
+def test_request_parameters_follow_the_model(agent, fake_provider):
+    fake_provider.script = text_reply("ok")
+
+    def request(model_id):
+        async def turn():
+            async for _ in agent.process_message("Hi", session_id=f"caps-{model_id}", model_id=model_id):
+                pass
+        asyncio.run(turn())
+        return fake_provider.last_request
+
+    openai = request("gpt-4.1")
+    assert openai["parallel_tool_calls"] is True and openai["tools"]
+    assert openai["max_tokens"] == agent.capabilities["gpt-4.1"].max_output_tokens
+    assert isinstance(openai["messages"][0]["content"], str)
+
+    anthropic = request("claude-sonnet-4")
+    assert "parallel_tool_calls" not in anthropic
+    assert anthropic["messages"][0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+
+    gemini = request("gemini-2.0-flash")
+    assert gemini["tools"] and gemini["model"] == "gemini/gemini-2.0-flash-exp"
+
+
+def test_available_models_are_computed_once_per_config(agent):
+    agent.api_keys = {"openai": "key", "anthropic": None, "gemini": None}
+    models = agent.get_available_models()
+    assert set(models["models"]) == {m for m, info in agent.model_config["models"].items()
+                                     if info["provider"] == "openai"}
+    assert models["models"]["gpt-4.1"]["capabilities"]["parallel_tool_calls"] is True
+    assert agent.get_available_models() is models
+
+    agent._apply_config(agent.config.snapshot)
+    assert agent.get_available_models() is not models
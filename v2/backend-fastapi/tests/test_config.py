@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import sys
+from dataclasses import replace
+
+from app.config import ConfigManager
+from fake_provider import tool_loop
+
+
+def write(path, text, mtime_offset=0):
+    """Write a file and move its mtime so the stamp changes even within one clock tick"""
+    path.write_text(text)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+
+
+def make_config(tmp_path, **kwargs):
+    write(tmp_path / "prompt.md", "Be helpful")
+    write(tmp_path / "models.json", json.dumps({"defaultModel": "a", "models": {"a": {"provider": "openai"}}}))
+    return ConfigManager(
+        system_prompt_path=tmp_path / "prompt.md",
+        model_config_path=tmp_path / "models.json",
+        pricing_path=tmp_path / "pricing.json",
+        **kwargs
+    )
+
+
+def test_stamp_change_reloads_and_notifies(tmp_path):
+    builds = []
+    config = make_config(tmp_path, tools_builder=lambda: builds.append(1) or [])
+    seen = []
+    config.add_listener(seen.append)
+    first = config.snapshot
+
+    # Unchanged files: nothing is re-read
+    assert asyncio.run(config.reload()) is False
+    assert len(builds) == 1
+
+    write(tmp_path / "prompt.md", "Be brief", mtime_offset=10**9)
+    assert asyncio.run(config.reload()) is True
+    assert config.snapshot.system_prompt == "Be brief"
+    assert config.snapshot.version != first.version
+    assert config.reload_count == 1 and seen == [config.snapshot]
+
+    # Touched but identical content: re-read, same version, no swap
+    write(tmp_path / "prompt.md", "Be brief", mtime_offset=2 * 10**9)
+    assert asyncio.run(config.reload()) is False
+    assert config.reload_count == 1 and len(seen) == 1
+
+
+def test_bad_json_keeps_last_good_snapshot(tmp_path):
+    config = make_config(tmp_path)
+    good = config.snapshot
+
+    write(tmp_path / "models.json", '{"defaultModel": "a", "mod', mtime_offset=10**9)
+    assert asyncio.run(config.reload()) is False
+    assert config.snapshot is good
+    assert config.last_error and config.get_status()["last_error"] == config.last_error
+
+    write(tmp_path / "models.json", json.dumps({"defaultModel": "b", "models": {}}), mtime_offset=2 * 10**9)
+    assert asyncio.run(config.reload()) is True
+    assert config.snapshot.model_config["defaultModel"] == "b"
+    assert config.last_error is None
+
+
+def test_wrongly_shaped_config_keeps_last_good_snapshot(tmp_path):
+    config = make_config(tmp_path)
+    good = config.snapshot
+
+    for i, text in enumerate(['{"models": []}', '{"models": {"x": "s"}}'], start=1):
+        write(tmp_path / "models.json", text, mtime_offset=i * 10**9)
+        assert asyncio.run(config.reload()) is False
+        assert config.snapshot is good and config.last_error
+
+    # The failed reloads did not stop later ones
+    write(tmp_path / "models.json", json.dumps({"defaultModel": "b", "models": {}}), mtime_offset=3 * 10**9)
+    assert asyncio.run(config.reload()) is True
+    assert config.last_error is None
+
+
+def test_polling_watcher_picks_up_changes(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "watchfiles", None)  # force the polling fallback
+    config = make_config(tmp_path, poll_interval=0.01)
+
+    async def watch():
+        config.start_watching()
+        assert config.get_status()["watching"]
+        write(tmp_path / "prompt.md", "Watched", mtime_offset=10**9)
+        for _ in range(200):
+            if config.snapshot.system_prompt == "Watched":
+                break
+            await asyncio.sleep(0.01)
+        await config.stop_watching()
+
+    asyncio.run(watch())
+    assert config.snapshot.system_prompt == "Watched"
+    assert not config.get_status()["watching"]
+
+
+def test_reload_mid_turn_applies_from_the_next_turn(agent, fake_provider):
+    loop = tool_loop(iterations=1)
+    started = agent.config.snapshot
+    reloaded = replace(started, system_prompt="Reloaded prompt", tools=[])
+
+    def script(messages):
+        if fake_provider.calls == 1:
+            # A hot reload lands between the turn's first and second LLM call
+            agent.config._snapshot = reloaded
+            agent._apply_config(reloaded)
+        return loop(messages)
+
+    fake_provider.script = script
+
+    async def turn(message):
+        return [event async for event in agent.process_message(message, session_id="reload")]
+
+    events = asyncio.run(turn("List files"))
+    assert events[-1]["type"] == "stream_end" and fake_provider.calls == 2
+    assert fake_provider.last_request["tools"]
+    assert "Reloaded prompt" not in json.dumps(fake_provider.last_request["messages"][0])
+
+    fake_provider.script = loop
+    asyncio.run(turn("And again"))
+    assert "Reloaded prompt" in json.dumps(fake_provider.last_request["messages"][0])
+    assert "tools" not in fake_provider.last_request
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from app import durable
+from app.conversation_manager import ConversationManager
+from app.durable import DurableWriter, write_atomic
+
+
+def test_failed_write_keeps_the_previous_version(tmp_path, monkeypatch):
+    target = tmp_path / "conversation.json"
+    write_atomic(target, b'{"v": 1}')
+
+    def crash(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(durable.os, "replace", crash)
+    with pytest.raises(OSError):
+        write_atomic(target, b'{"v": 2, "truncat')
+    assert json.loads(target.read_bytes()) == {"v": 1}
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_fsync_policies(tmp_path, monkeypatch):
+    fsynced = []
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        # Only count this test's files and directory, not writers left over from other tests
+        inode = os.fstat(fd).st_ino
+        if inode == tmp_path.stat().st_ino or any(inode == p.stat().st_ino for p in tmp_path.iterdir()):
+            fsynced.append(fd)
+        real_fsync(fd)
+
+    monkeypatch.setattr(durable.os, "fsync", fsync)
+
+    DurableWriter("never").write(tmp_path / "a", b"a")
+    assert fsynced == []
+
+    DurableWriter("always").write(tmp_path / "b", b"b")
+    assert len(fsynced) == 2  # file and directory
+
+    fsynced.clear()
+    writer = DurableWriter("batched", interval_s=0.05)
+    for i in range(5):
+        writer.write(tmp_path / f"c{i % 2}", b"c")
+    # Each file reaches the disk before its rename; only the directory sync is batched
+    assert len(fsynced) == 5 and writer.get_status()["pending"] == 1
+    deadline = time.monotonic() + 2
+    while writer.get_status()["syncs"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.get_status() == {**writer.get_status(), "writes": 5, "syncs": 1, "pending": 0}
+    assert len(fsynced) == 6  # five files, one directory
+
+    with pytest.raises(ValueError):
+        DurableWriter("sometimes")
+
+
+def test_recovery_rebuilds_index_and_reports_corrupted_sessions(tmp_path):
+    async def seed():
+        manager = ConversationManager(tmp_path, fsync_policy="never")
+        for session_id in ("alpha", "beta", "gamma"):
+            await manager.create_conversation(session_id)
+            await manager.add_message(session_id, "user", f"Hello from {session_id}")
+        return manager
+
+    asyncio.run(seed())
+    # Crash aftermath: a torn file, a leftover temp file, and an index that lost track
+    (tmp_path / "beta.json").write_text('{"id": "beta", "messages": [{"ro')
+    (tmp_path / "gamma.json.1234abcd.tmp").write_text("{")
+    os.utime(tmp_path / "gamma.json.1234abcd.tmp", (0, time.time() - 3600))
+    # A write still in progress while recovery runs in the background
+    (tmp_path / "alpha.json.5678abcd.tmp").write_text("{")
+    (tmp_path / "index.json").write_text(json.dumps({"conversations": [
+        {"id": "ghost", "title": "Gone", "created_at": "", "updated_at": "", "message_count": 1, "model": "x"}
+    ]}))
+
+    manager = ConversationManager(tmp_path, fsync_policy="never")
+    report = asyncio.run(manager.recover())
+    assert report == {**report, "scanned": 3, "added": 2, "removed": 1, "corrupted": ["beta"],
+                      "temp_files_removed": 1}
+    listed = asyncio.run(manager.list_conversations())
+    assert {c["id"]: c["title"] for c in listed} == {"alpha": "Hello from alpha", "gamma": "Hello from gamma"}
+    assert (tmp_path / "beta.json.corrupt").exists()
+    assert (tmp_path / "alpha.json.5678abcd.tmp").exists()
+    assert json.loads((tmp_path / "index.json").read_text())["conversations"] == manager._index["conversations"]
+    assert manager.get_status()["corrupted"] == ["beta"]
+
+
+def test_corrupted_conversation_is_moved_aside_not_overwritten(tmp_path):
+    async def scenario():
+        manager = ConversationManager(tmp_path, fsync_policy="never")
+        await manager.create_conversation("torn")
+        (tmp_path / "torn.json").write_text('{"id": "torn", "mess')
+        missing = await manager.get_conversation("torn")
+        await manager.create_conversation("torn")
+        return manager, missing
+
+    manager, missing = asyncio.run(scenario())
+    assert missing is None
+    assert (tmp_path / "torn.json.corrupt").read_text() == '{"id": "torn", "mess'
+    assert [c["id"] for c in asyncio.run(manager.list_conversations())] == ["torn"]
+    assert "torn" in manager.corrupted
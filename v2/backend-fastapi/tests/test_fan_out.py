@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+from app.fan_out import SUBAGENT_PROMPT, FanOutTool
+from fake_provider import FakeReply
+
+FILES = {f"module_{i}.py": f"def function_{i}():\n    return {i}\n" for i in range(4)}
+
+
+def fan_out_script(paths):
+    """Parent calls fan_out once, sub-agents summarize their file, parent merges the answers"""
+    def script(messages):
+        system = messages[0]["content"]
+        if isinstance(system, str) and system == SUBAGENT_PROMPT:
+            file_name = messages[1]["content"].split("File: ", 1)[1].split("\n", 1)[0]
+            return FakeReply(content=f"{file_name.rsplit('/', 1)[-1]} defines one function")
+        if messages[-1]["role"] == "tool":
+            return FakeReply(content="All four modules define one function each.")
+        return FakeReply(content="Comparing.", tool_calls=[
+            ("fan_out", {"instruction": "Summarize the module", "paths": paths})
+        ])
+    return script
+
+
+def test_fan_out_runs_sub_agents_concurrently_with_small_contexts(agent, fake_provider, tmp_path, monkeypatch):
+    paths = []
+    for name, content in FILES.items():
+        (tmp_path / name).write_text(content)
+        paths.append(str(tmp_path / name))
+    fake_provider.script = fan_out_script(paths)
+    fake_provider.first_token_delay = 0.1  # per LLM call
+
+    sub_agent_requests = []
+    original = fake_provider.acompletion
+
+    async def recording(**kwargs):
+        if not kwargs.get("stream"):
+            sub_agent_requests.append(kwargs)
+        return await original(**kwargs)
+
+    from app import providers
+    providers.use_completion_backend(recording)
+
+    async def turn():
+        return [event async for event in agent.process_message("Compare the modules", session_id="fan")]
+
+    events = asyncio.run(turn())
+    result = json.loads(next(e for e in events if e["type"] == "tool_result")["result"])
+
+    assert [r["result"] for r in result["results"]] == [f"{name} defines one function" for name in FILES]
+    # Four 0.1 s sub-agent calls in one concurrent round, not one after another
+    assert result["elapsed_s"] < 0.3
+    assert result["usage"]["llm_calls"] == 4
+
+    # Each sub-agent saw only its prompt and its own file, not the parent conversation
+    assert all(len(request["messages"]) == 2 for request in sub_agent_requests)
+    assert all("fan_out" not in json.dumps(request.get("tools", [])) for request in sub_agent_requests)
+    assert FILES["module_2.py"].strip() in sub_agent_requests[2]["messages"][1]["content"]
+
+    assert events[-1]["type"] == "stream_end"
+    assert events[-1]["usage"]["llm_calls"] == 6  # parent start + 4 sub-agents + parent answer
+    assert agent.usage_ledger.get("sessions", "fan")["calls"] == 6
+
+
+def test_fan_out_outside_a_turn_and_missing_files(agent, fake_provider):
+    result = asyncio.run(FanOutTool().execute(instruction="x", paths=["a.py"]))
+    assert not result.success and "inside an agent turn" in result.error
+
+    fake_provider.script = fan_out_script(["/nonexistent/file.py"])
+
+    async def turn():
+        return [event async for event in agent.process_message("Go", session_id="fan-missing")]
+
+    calls_before = fake_provider.calls
+    events = asyncio.run(turn())
+    result = json.loads(next(e for e in events if e["type"] == "tool_result")["result"])
+    assert result["results"] == [{"path": "/nonexistent/file.py", "error": "File does not exist: /nonexistent/file.py"}]
+    assert fake_provider.calls - calls_before == 2  # no sub-agent call for an unreadable file
@@ -0,0 +1,74 @@
+"""
+grep tool: regex/literal search, context, binary skipping, mmap path and caps
+"""
+import asyncio
+
+from tools import GrepTool, tool_registry
+from tools import grep_tool
+
+
+def run(**kwargs):
+    return asyncio.run(GrepTool().execute(**kwargs))
+
+
+def test_grep_is_registered():
+    assert "grep" in tool_registry.list_tools()
+
+
+def test_regex_search_reports_path_and_line(tmp_path):
+    (tmp_path / "a.py").write_text("import os\n\ndef main():\n    return os.getcwd()\n")
+    (tmp_path / "b.txt").write_text("nothing here\n")
+    result = run(pattern=r"def \w+\(", path=str(tmp_path))
+    assert result.success
+    assert result.data["results"] == "a.py:3:def main():"
+    assert result.data["files_with_matches"] == 1
+
+
+def test_literal_and_ignore_case(tmp_path):
+    (tmp_path / "a.txt").write_text("cost is $5 (approx)\nCOST IS $5 (APPROX)\n")
+    assert run(pattern="$5 (approx)", path=str(tmp_path), literal=True).data["matches"] == 1
+    assert run(pattern="$5 (approx)", path=str(tmp_path), literal=True,
+               ignore_case=True).data["matches"] == 2
+
+
+def test_context_lines_merge_without_duplicates(tmp_path):
+    (tmp_path / "f.txt").write_text("one\nhit two\nhit three\nfour\nfive\nsix\nhit seven\n")
+    results = run(pattern="hit", path=str(tmp_path), context=1).data["results"].splitlines()
+    assert results == [
+        "f.txt-1-one",
+        "f.txt:2:hit two",
+        "f.txt:3:hit three",
+        "f.txt-4-four",
+        "--",
+        "f.txt-6-six",
+        "f.txt:7:hit seven",
+        "--",
+    ]
+
+
+def test_binary_files_are_skipped(tmp_path):
+    (tmp_path / "blob.bin").write_bytes(b"needle\x00\x01\x02")
+    (tmp_path / "text.txt").write_text("needle\n")
+    assert run(pattern="needle", path=str(tmp_path)).data["results"] == "text.txt:1:needle"
+
+
+def test_large_files_are_searched_through_mmap(tmp_path, monkeypatch):
+    monkeypatch.setattr(grep_tool, "MMAP_THRESHOLD", 64)
+    lines = [f"line {i}" for i in range(1000)]
+    lines[777] = "the needle line"
+    (tmp_path / "big.txt").write_text("\n".join(lines))
+    assert run(pattern="needle", path=str(tmp_path)).data["results"] == "big.txt:778:the needle line"
+
+
+def test_match_caps(tmp_path):
+    for i in range(5):
+        (tmp_path / f"f{i}.txt").write_text("match\n" * 10)
+    data = run(pattern="match", path=str(tmp_path), max_matches_per_file=3, max_matches=7).data
+    assert data["matches"] == 7
+    assert data["truncated"] is True
+
+
+def test_invalid_regex_suggests_literal(tmp_path):
+    result = run(pattern="(", path=str(tmp_path))
+    assert not result.success
+    assert "literal=true" in result.error
@@ -0,0 +1,105 @@
+import asyncio
+import gzip
+import json
+import zlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.http_stream import NDJSON, SSE, encode_events, negotiate_encoding, negotiate_format
+from fake_provider import text_reply
+
+ANSWER = "Streamed over plain HTTP, one event per chunk."
+
+
+@pytest.fixture
+def client(agent, fake_provider, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "agent", agent)
+    fake_provider.script = text_reply(ANSWER)
+    with TestClient(main.app) as client:
+        yield client
+
+
+def parse_sse(body):
+    events = []
+    for message in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        event = json.loads(fields["data"])
+        assert int(fields["id"]) == event["event_id"]
+        events.append(event)
+    return events
+
+
+def test_negotiation():
+    assert negotiate_format(None) == SSE
+    assert negotiate_format("application/x-ndjson") == NDJSON
+    assert negotiate_format("text/event-stream, application/x-ndjson;q=0.5") == SSE
+    assert negotiate_format("text/event-stream", requested="ndjson") == NDJSON
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("deflate, gzip;q=0.5") == "deflate"
+    assert negotiate_encoding("br, identity") is None
+    assert negotiate_encoding("gzip;q=0, *") == "deflate"
+
+
+def test_chat_streams_sse(client):
+    response = client.post("/chat", json={"message": "Hi", "session_id": "http-sse"},
+                           headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(SSE)
+    assert "content-encoding" not in response.headers
+
+    events = parse_sse(response.text)
+    assert events[-1]["type"] == "stream_end"
+    assert "".join(e["content"] for e in events if e["type"] == "stream") == ANSWER
+    assert {e["stream_id"] for e in events} == {response.headers["x-stream-id"]}
+
+
+def test_chat_streams_compressed_ndjson_and_resumes(client, fake_provider):
+    response = client.post("/chat?format=ndjson", json={"message": "Hi"}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-type"].startswith(NDJSON)
+    assert response.headers["content-encoding"] == "gzip"
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    assert events[-1]["type"] == "stream_end"
+    assert response.headers["x-session-id"]
+
+    # Resume from the SSE Last-Event-ID header: only later events, no new LLM call
+    stream_id = response.headers["x-stream-id"]
+    resumed = client.get(f"/chat/streams/{stream_id}", headers={"Last-Event-ID": "3"})
+    assert [e["event_id"] for e in parse_sse(resumed.text)] == [e["event_id"] for e in events[3:]]
+    assert fake_provider.calls == 1
+    assert client.get("/chat/streams/missing").status_code == 404
+
+
+def test_chat_rejects_empty_message(client):
+    assert client.post("/chat", json={"message": ""}).status_code == 400
+
+
+def test_compressed_events_are_flushed_individually():
+    async def events():
+        for i in range(3):
+            yield {"type": "stream", "content": "x" * 50, "event_id": i + 1}
+
+    async def collect():
+        return [chunk async for chunk in encode_events(events(), SSE, "gzip")]
+
+    chunks = asyncio.run(collect())
+    decompressor = zlib.decompressobj(31)
+    # Every event chunk decodes on its own arrival, before the stream ends
+    for chunk in chunks[:3]:
+        assert decompressor.decompress(chunk).startswith(b"id: ")
+    assert gzip.decompress(b"".join(chunks)).count(b"data: ") == 3
+
+
+def test_heartbeat_while_idle():
+    async def slow():
+        await asyncio.sleep(0.05)
+        yield {"type": "stream_end", "event_id": 1}
+
+    async def collect():
+        return [chunk async for chunk in encode_events(slow(), NDJSON, heartbeat_s=0.01)]
+
+    chunks = asyncio.run(collect())
+    assert chunks[0] == b"\n"
+    assert json.loads(chunks[-1])["type"] == "stream_end"
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+from app import loop_monitor as lm
+from app.loop_monitor import LoopMonitor
+
+
+def blocking_save_index():
+    time.sleep(0.25)
+
+
+async def blocking_turn():
+    with lm.session("session-1"), lm.phase("persistence"):
+        blocking_save_index()
+
+
+def test_phase_nesting_restores_previous_attribution():
+    async def scenario():
+        task = asyncio.current_task()
+        with lm.session("s"):
+            with lm.phase("llm_stream"):
+                with lm.phase("tool_exec"):
+                    assert lm.attribution_of(task) == ("s", "tool_exec")
+                assert lm.attribution_of(task) == ("s", "llm_stream")
+            assert lm.attribution_of(task) == ("s", None)
+        assert lm.attribution_of(task) == (None, None)
+
+    asyncio.run(scenario())
+
+
+def test_in_phase_decorator_attributes_coroutine():
+    @lm.in_phase("persistence")
+    async def save():
+        return lm.attribution_of(asyncio.current_task())
+
+    async def scenario():
+        with lm.session("s"):
+            return await save()
+
+    assert asyncio.run(scenario()) == ("s", "persistence")
+
+
+def test_blocking_call_is_captured_with_stack_and_attribution():
+    monitor = LoopMonitor(lag_interval=0.01, slow_threshold=0.05)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(blocking_turn())
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert monitor.slow_callback_count == 1
+    record = monitor.slow_callbacks[0]
+    assert record.session_id == "session-1"
+    assert record.phase == "persistence"
+    assert any("blocking_save_index" in line for line in record.stack)
+    assert record.duration_ms is not None and record.duration_ms >= 200
+    assert monitor.lag_summary()["max_ms"] >= 200
+
+
+def test_idle_loop_reports_no_slow_callbacks():
+    monitor = LoopMonitor(lag_interval=0.01, slow_threshold=0.05)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.3)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+    assert monitor.slow_callback_count == 0
+    assert monitor.lag_summary()["samples"] > 5
+
+
+def test_sampling_profiler_attributes_busy_time_to_phase():
+    monitor = LoopMonitor(lag_interval=0.01, slow_threshold=10)
+
+    async def scenario():
+        monitor.start()
+        assert monitor.start_profiler(interval=0.002)
+        assert not monitor.start_profiler()
+        await asyncio.create_task(blocking_turn())
+        await asyncio.sleep(0.05)
+        report = await monitor.stop_profiler()
+        await monitor.stop()
+        return report
+
+    report = asyncio.run(scenario())
+    assert report["samples"] > 0
+    assert report["phases"].get("persistence", 0) > 0
+    top = report["top_stacks"][0]
+    assert top["stack"][:2] == ["session-1", "persistence"]
+    assert any("blocking_save_index" in frame for frame in top["stack"])
+    assert "blocking_save_index" in report["folded"]
+    assert monitor.profiler_report() is report
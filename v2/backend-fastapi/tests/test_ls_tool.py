@@ -0,0 +1,91 @@
+"""
+Recursive ls: scandir walk, globbing, .gitignore and result caps
+"""
+import asyncio
+
+from tools import LsTool
+
+
+def make_tree(root):
+    (root / ".git").mkdir()
+    (root / ".gitignore").write_text("build/\n*.log\n!keep.log\n/top_only.txt\n")
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "pkg" / "mod.py").write_text("x = 1\n")
+    (root / "src" / "main.py").write_text("print()\n")
+    (root / "src" / "notes.md").write_text("# notes\n")
+    (root / "src" / "top_only.txt").write_text("nested, not ignored\n")
+    (root / "top_only.txt").write_text("ignored\n")
+    (root / "build").mkdir()
+    (root / "build" / "out.py").write_text("")
+    (root / "debug.log").write_text("")
+    (root / "keep.log").write_text("")
+    (root / "node_modules" / "dep").mkdir(parents=True)
+
+
+def run(**kwargs):
+    return asyncio.run(LsTool().execute(**kwargs))
+
+
+def test_flat_listing_is_unchanged(tmp_path):
+    make_tree(tmp_path)
+    result = run(path=str(tmp_path))
+    assert result.success
+    assert result.data["items"] == [
+        "build/", "debug.log", "keep.log", "node_modules/", "src/", "top_only.txt"
+    ]
+
+
+def test_flat_listing_shows_vcs_dirs_and_is_not_capped(tmp_path):
+    make_tree(tmp_path)
+    for i in range(20):
+        (tmp_path / f"file_{i:02d}.txt").write_text("")
+    flat = run(path=str(tmp_path), show_hidden=True, max_results=10).data
+    assert ".git/" in flat["items"]
+    assert flat["count"] == 28 and "truncated" not in flat
+    assert ".git/" not in run(path=str(tmp_path), show_hidden=True, recursive=True).data["items"]
+
+
+def test_recursive_respects_gitignore(tmp_path):
+    make_tree(tmp_path)
+    items = run(path=str(tmp_path), recursive=True).data["items"]
+    assert items == [
+        "keep.log",
+        "node_modules/",
+        "node_modules/dep/",
+        "src/",
+        "src/main.py",
+        "src/notes.md",
+        "src/pkg/",
+        "src/pkg/mod.py",
+        "src/top_only.txt",
+    ]
+
+
+def test_gitignore_applies_when_listing_a_subdirectory(tmp_path):
+    make_tree(tmp_path)
+    (tmp_path / "src" / "trace.log").write_text("")
+    items = run(path=str(tmp_path / "src"), recursive=True).data["items"]
+    assert "trace.log" not in items
+    assert "top_only.txt" in items
+
+
+def test_include_exclude_and_depth(tmp_path):
+    make_tree(tmp_path)
+    items = run(path=str(tmp_path), recursive=True, include="*.py",
+                exclude="node_modules").data["items"]
+    assert items == ["src/", "src/main.py", "src/pkg/", "src/pkg/mod.py"]
+
+    shallow = run(path=str(tmp_path), recursive=True, max_depth=1).data["items"]
+    assert "src/main.py" not in shallow
+
+
+def test_result_and_byte_caps(tmp_path):
+    for i in range(50):
+        (tmp_path / f"file_{i:02d}.txt").write_text("")
+    capped = run(path=str(tmp_path), recursive=True, max_results=10).data
+    assert capped["count"] == 10
+    assert capped["truncated"] is True
+
+    small = run(path=str(tmp_path), recursive=True, max_bytes=256).data
+    assert 0 < small["count"] < 50
+    assert "max_bytes" in small["truncated_reason"]
@@ -0,0 +1,94 @@
+from hypothesis import given, strategies as st
+
+from app.message_normalizer import MISSING_RESULT_CONTENT, format_message, normalize_messages
+from app.working_history import WorkingHistory
+
+# A small id alphabet so results collide with other calls, repeat, or answer nothing
+ids = st.sampled_from(["a", "b", "c", "d", "e"])
+text = st.one_of(st.none(), st.text(max_size=5))
+
+
+def tool_call(call_id):
+    return {"id": call_id, "type": "function", "function": {"name": "ls", "arguments": "{}"}}
+
+
+messages = st.lists(st.one_of(
+    st.builds(lambda content: {"role": "user", "content": content, "timestamp": "t"}, text),
+    st.builds(lambda content: {"role": "assistant", "content": content}, text),
+    st.builds(lambda content, calls: {"role": "assistant", "content": content,
+                                      "tool_calls": [tool_call(i) for i in calls]},
+              text, st.lists(ids, min_size=1, max_size=4)),
+    st.builds(lambda call_id, content: {"role": "tool", "tool_call_id": call_id, "content": content},
+              ids, st.one_of(st.text(max_size=5), st.integers()))
+), max_size=40)
+
+providers = st.sampled_from(["", "openai", "anthropic", "google"])
+
+
+def assert_paired(output):
+    """Each tool-calling assistant message is followed by exactly one result per call, and nothing else is a tool result"""
+    i = 0
+    while i < len(output):
+        msg = output[i]
+        assert msg["role"] != "tool", f"orphan tool result at {i}"
+        i += 1
+        if msg["role"] == "assistant" and msg.get("tool_calls"):
+            call_ids = [tc["id"] for tc in msg["tool_calls"]]
+            assert len(set(call_ids)) == len(call_ids)
+            results = []
+            while i < len(output) and output[i]["role"] == "tool":
+                results.append(output[i]["tool_call_id"])
+                i += 1
+            assert sorted(results) == sorted(call_ids)
+
+
+@given(messages, providers)
+def test_output_is_always_paired(history, provider):
+    output = list(normalize_messages(history, provider))
+    assert_paired(output)
+    assert all(isinstance(m["content"], str) for m in output if m["role"] == "tool")
+    assert all("timestamp" not in m for m in output)
+
+
+@given(messages, providers)
+def test_normalizing_is_idempotent(history, provider):
+    once = list(normalize_messages(history, provider))
+    assert list(normalize_messages(once, provider)) == once
+
+
+@given(messages)
+def test_conversation_messages_are_kept_in_order(history):
+    output = list(normalize_messages(history))
+    assert [m["role"] for m in output if m["role"] != "tool"] == [m["role"] for m in history if m["role"] != "tool"]
+    # Output grows by at most one placeholder per tool call
+    calls = sum(len(m.get("tool_calls") or []) for m in history)
+    assert len(output) <= len(history) + calls
+
+
+@given(messages, providers)
+def test_working_history_matches_batch_normalization(history, provider):
+    working = WorkingHistory("system", max_tokens=10 ** 6, provider=provider)
+    working.extend(history)
+    assert working.messages()[1:] == list(normalize_messages(history, provider))
+
+
+def test_repairs():
+    history = [
+        {"role": "tool", "tool_call_id": "x", "content": "orphan"},
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("a"), tool_call("b"), tool_call("a")]},
+        {"role": "tool", "tool_call_id": "a", "content": "first"},
+        {"role": "tool", "tool_call_id": "a", "content": "again"},
+        {"role": "assistant", "content": ""},
+        {"role": "user", "content": "next"},
+    ]
+    output = list(normalize_messages(history, "anthropic"))
+    assert output == [
+        format_message(history[1]),
+        {"role": "assistant", "content": "", "tool_calls": [tool_call("a"), tool_call("b")]},
+        format_message(history[3]),
+        {"role": "tool", "tool_call_id": "b", "content": MISSING_RESULT_CONTENT},
+        format_message(history[6]),
+    ]
+    # OpenAI accepts an empty assistant message
+    assert {"role": "assistant", "content": ""} in list(normalize_messages(history, "openai"))
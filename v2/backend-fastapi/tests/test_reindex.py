@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+from app import reindex
+from app.conversation_manager import ConversationManager
+
+
+def seed(tmp_path, count):
+    async def create():
+        manager = ConversationManager(tmp_path, fsync_policy="never")
+        for i in range(count):
+            await manager.create_conversation(f"s{i:03d}")
+            await manager.add_message(f"s{i:03d}", "user", f"Question number {i} " + "x" * 60)
+            await manager.add_message(f"s{i:03d}", "assistant", "An answer of forty characters, roughly.")
+        return manager
+
+    return asyncio.run(create())
+
+
+def test_index_written_by_the_server_is_consistent(tmp_path):
+    manager = seed(tmp_path, 5)
+    before = (tmp_path / "index.json").read_text()
+
+    report = reindex.rebuild(tmp_path, check=True)
+    assert report["consistent"], report
+    assert report["indexed"] == 5
+    assert (tmp_path / "index.json").read_text() == before
+    assert manager._index["conversations"][0]["token_count"] == (len("Question number 0 ") + 60 + 39) // 4
+
+
+def test_rebuild_reports_and_repairs_divergence(tmp_path, monkeypatch):
+    seed(tmp_path, 12)
+    index = json.loads((tmp_path / "index.json").read_text())
+    entries = index["conversations"]
+    entries[0]["title"] = "Edited by hand"
+    entries[1]["message_count"] = 99
+    entries.append({"id": "deleted", "title": "Gone", "created_at": "", "updated_at": "", "message_count": 0})
+    del entries[2]
+    (tmp_path / "index.json").write_text(json.dumps(index))
+    (tmp_path / "s003.json").write_text('{"id": "s003", "messa')
+
+    monkeypatch.setattr(reindex, "POOL_THRESHOLD", 0)  # exercise the process pool on a small tree
+    monkeypatch.setattr(reindex, "CHUNK_SIZE", 4)
+    report = reindex.rebuild(tmp_path, workers=2)
+
+    assert not report["consistent"]
+    assert report["missing_files"] == ["deleted", "s003"]
+    assert report["unindexed_files"] == ["s002"]
+    assert list(report["unreadable"]) == ["s003"]
+    assert report["changed"] == {
+        "s000": {"title": ["Edited by hand", "Question number 0 " + "x" * 32 + "..."]},
+        "s001": {"message_count": [99, 2]}
+    }
+
+    rebuilt = json.loads((tmp_path / "index.json").read_text())["conversations"]
+    assert [entry["id"] for entry in rebuilt] == [f"s{i:03d}" for i in range(12) if i != 3]
+    assert reindex.rebuild(tmp_path, check=True)["unreadable"] == {"s003": report["unreadable"]["s003"]}
+    assert ConversationManager(tmp_path)._index["conversations"] == rebuilt
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from app.scheduler import LLMScheduler, Priority, TokenBucket, llm_scheduler, priority
+from fake_provider import FakeProviderError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_and_pauses():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, capacity=2, clock=clock)  # 1 per second
+    assert bucket.wait_time(1) == 0
+    bucket.take(2)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert bucket.wait_time(1) == pytest.approx(0.5)
+    assert bucket.wait_time(10) == pytest.approx(1.5)  # capped at a full bucket
+    bucket.pause(3)
+    assert bucket.wait_time(1) == pytest.approx(4.0)
+
+
+def test_interactive_calls_are_admitted_before_batch():
+    scheduler = LLMScheduler()
+    scheduler.configure({"anthropic": {"requestsPerMinute": 1200, "requestBurst": 1}})
+    admitted = []
+
+    async def call(name, level):
+        with priority(level):
+            await scheduler.acquire("anthropic")
+        admitted.append(name)
+
+    async def scenario():
+        await scheduler.acquire("anthropic")  # empties the bucket
+        batch = [asyncio.create_task(call(f"batch-{i}", Priority.BATCH)) for i in range(3)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("interactive", Priority.INTERACTIVE))
+        await asyncio.gather(*batch, interactive)
+
+    asyncio.run(scenario())
+    assert admitted == ["interactive", "batch-0", "batch-1", "batch-2"]
+    assert scheduler.get_status()["anthropic"]["dispatched"] == 5
+
+
+def test_retries_429_and_5xx_with_backoff():
+    scheduler = LLMScheduler(base_delay=0.01)
+    failures = [FakeProviderError(429), FakeProviderError(503)]
+    retries = []
+
+    async def call():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    result = asyncio.run(scheduler.run("openai", call, on_retry=lambda attempt, e, delay: retries.append(attempt)))
+    assert result == "ok"
+    assert retries == [1, 2]
+    assert scheduler.get_status()["openai"]["rate_limited"] == 1
+
+    async def bad_request():
+        raise FakeProviderError(400)
+
+    with pytest.raises(FakeProviderError):
+        asyncio.run(scheduler.run("openai", bad_request))
+
+
+def run_concurrent_turns(agent, count):
+    async def turn(i):
+        return [event async for event in agent.process_message(f"Question {i}", session_id=f"s{i}")]
+
+    async def run():
+        return await asyncio.gather(*(turn(i) for i in range(count)))
+
+    return asyncio.run(run())
+
+
+def failed_turns(results):
+    return sum(any(event["type"] == "error" for event in events) for events in results)
+
+
+def test_rate_limited_provider_without_and_with_scheduler(agent, fake_provider, monkeypatch):
+    fake_provider.rate_limit = (5, 0.1)  # 5 requests per 100ms
+    monkeypatch.setattr(llm_scheduler, "max_retries", 0)
+    assert failed_turns(run_concurrent_turns(agent, 20)) == 15
+
+    # Buckets sized inside the provider's limit: burst 3 + 20/s * 0.1s = 5 per window
+    fake_provider._recent.clear()
+    monkeypatch.setattr(llm_scheduler, "max_retries", 3)
+    monkeypatch.setattr(llm_scheduler, "base_delay", 0.05)
+    llm_scheduler.configure({"anthropic": {"requestsPerMinute": 1200, "requestBurst": 3}})
+    try:
+        results = run_concurrent_turns(agent, 20)
+    finally:
+        llm_scheduler.configure(None)
+    assert failed_turns(results) == 0
+    assert all(events[-1]["type"] == "stream_end" for events in results)
@@ -0,0 +1,37 @@
+"""
+Startup imports: importing the server must not pull in provider SDKs or tool plugins
+(the wall-clock budget is checked by benchmarks/test_bench_startup.py)
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from startup_importtime import BACKEND_DIR, run_benchmark
+
+
+def test_startup_does_not_import_provider_sdks():
+    report = run_benchmark(runs=1)
+
+    assert report["eager_provider_imports"] == [], (
+        f"Provider SDKs imported at startup: {report['eager_provider_imports']}"
+    )
+
+
+def test_startup_does_not_import_tool_plugins():
+    env = {
+        **os.environ,
+        "TOOL_PLUGINS": "word_count=plugin_tools:WordCountTool",
+        "PYTHONPATH": str(BACKEND_DIR / "tests"),
+        "PYTHONDONTWRITEBYTECODE": "1"
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print('plugin_tools' in sys.modules, main.tool_registry.list_tools())"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=env
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    imported, tools = result.stdout.strip().splitlines()[-1].split(" ", 1)
+    assert "word_count" in tools  # discovered, but not imported
+    assert imported == "False"
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from tools import LsTool
+from tools import plugins
+from tools.registry import ToolRegistry
+from tools.workers import ToolWorkerPool
+
+
+@pytest.fixture
+def fresh_plugin_module():
+    """Plugins must be imported by the registry (or its workers), not by the test"""
+    sys.modules.pop("plugin_tools", None)
+    yield
+    sys.modules.pop("plugin_tools", None)
+
+
+def test_plugins_are_imported_on_first_use(monkeypatch, fresh_plugin_module):
+    monkeypatch.setenv("TOOL_PLUGINS", "word_count=plugin_tools:WordCountTool, broken=plugin_tools:Missing")
+    monkeypatch.delenv("TOOL_PROCESS_ISOLATION", raising=False)
+    registry = ToolRegistry(discover_plugins=True)
+    registry.register_class(LsTool)
+
+    assert registry.list_tools() == ["ls", "word_count", "broken"]
+    assert "plugin_tools" not in sys.modules
+    assert registry.get_status()["plugins"][0]["loaded"] is False
+
+    # Unresolved plugins stay out of the schemas instead of being imported on the spot
+    assert [schema["function"]["name"] for schema in registry.get_function_schemas()] == ["ls"]
+    assert not registry.get("word_count").read_only
+    assert "plugin_tools" not in sys.modules
+
+    assert asyncio.run(registry.resolve_plugins()) is True
+    names = [schema["function"]["name"] for schema in registry.get_function_schemas()]
+    assert names == ["ls", "word_count"]  # the broken plugin is dropped, not fatal
+    assert [definition.name for definition in registry.get_definitions()] == names
+    assert "plugin_tools" in sys.modules and registry.get("word_count").read_only
+    assert asyncio.run(registry.resolve_plugins()) is False
+
+    result = asyncio.run(registry.execute("word_count", text="one two three"))
+    assert result.success and result.data["words"] == 3 and result.data["pid"] == os.getpid()
+
+
+def test_isolated_tools_run_in_worker_processes(monkeypatch, fresh_plugin_module):
+    names = ["word_count", "spin", "big_output", "memory_hog", "crash"]
+    monkeypatch.setenv("TOOL_PLUGINS", ",".join(
+        f"{name}=plugin_tools:{cls}" for name, cls in
+        zip(names, ["WordCountTool", "SpinTool", "BigOutputTool", "MemoryHogTool", "CrashTool"])
+    ))
+    monkeypatch.setenv("TOOL_PROCESS_ISOLATION", ",".join(names + ["ls"]))
+    pool = ToolWorkerPool(workers=2, timeout_s=1, memory_limit_mb=512, max_result_bytes=10000)
+    monkeypatch.setattr(plugins, "tool_workers", pool)
+    registry = ToolRegistry(discover_plugins=True)
+    registry.register_class(LsTool)
+
+    async def run(name, **kwargs):
+        return await registry.execute(name, **kwargs)
+
+    try:
+        assert len(registry.get_function_schemas()) == 0  # even ls waits for its worker
+        assert asyncio.run(registry.resolve_plugins()) is True
+        assert len(registry.get_function_schemas()) == 6
+        assert registry.get("word_count").read_only
+        result = asyncio.run(run("word_count", text="a b"))
+        assert result.data["words"] == 2 and result.data["pid"] != os.getpid()
+        assert "plugin_tools" not in sys.modules  # schema and execution both came from a worker
+
+        assert asyncio.run(run("ls", path=".")).success  # built-in tool moved to the pool
+
+        spin = asyncio.run(run("spin"))
+        assert not spin.success and "timed out after 1s" in spin.error
+        assert "byte limit" in asyncio.run(run("big_output")).error
+        assert "memory limit" in asyncio.run(run("memory_hog")).error
+
+        crash = asyncio.run(run("crash"))
+        assert not crash.success and "died" in crash.error
+        assert asyncio.run(run("word_count", text="still works")).data["words"] == 2
+        assert pool.get_status()["restarts"] == 1 and pool.get_status()["timeouts"] == 1
+    finally:
+        pool.shutdown()
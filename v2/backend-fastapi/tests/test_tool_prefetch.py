@@ -0,0 +1,120 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.tool_stream import ResponseAccumulator, ToolPrefetcher, tool_call_key
+from fake_provider import FakeReply
+
+
+def tool_delta(index, name=None, arguments="", call_id=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(
+        content=None,
+        tool_calls=[SimpleNamespace(index=index, id=call_id, type="function", function=function)]
+    ))])
+
+
+def text_delta(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text, tool_calls=None))])
+
+
+def test_accumulator_reports_tool_call_when_arguments_complete():
+    ready = []
+    acc = ResponseAccumulator(lambda tc: ready.append(tc["function"]["name"]))
+
+    assert acc.add_chunk(text_delta("Let me look.")) == "Let me look."
+    acc.add_chunk(tool_delta(0, name="ls", call_id="call_0"))
+    acc.add_chunk(tool_delta(0, arguments='{"path": "{}'))  # brace inside a string
+    assert ready == []
+    acc.add_chunk(tool_delta(0, arguments='"}'))
+    assert ready == ["ls"]
+
+    acc.add_chunk(tool_delta(1, name="read_file", call_id="call_1"))
+    acc.add_chunk(tool_delta(1, arguments='{"path": "a.py"'))
+    assert ready == ["ls"]
+    acc.add_chunk(tool_delta(1, arguments='}'))
+    acc.add_chunk(SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=1)))
+
+    assert ready == ["ls", "read_file"]
+    assert acc.content == "Let me look."
+    assert [tc["id"] for tc in acc.tool_calls] == ["call_0", "call_1"]
+    assert json.loads(acc.tool_calls[0]["function"]["arguments"]) == {"path": "{}"}
+
+
+def test_prefetcher_only_starts_read_only_unknown_calls():
+    executed = []
+
+    async def execute(name, arguments):
+        executed.append((name, arguments))
+        if arguments["path"] == "unconfirmed":
+            await asyncio.sleep(10)
+        return f"{name} result"
+
+    async def scenario():
+        known = {tool_call_key("ls", {"path": "cached"}): "cached result"}
+        prefetcher = ToolPrefetcher(execute, is_read_only=lambda name: name != "write_file", known=known)
+
+        def call(name, arguments):
+            return {"function": {"name": name, "arguments": json.dumps(arguments)}}
+
+        prefetcher.maybe_start(call("ls", {"path": "."}))
+        prefetcher.maybe_start(call("ls", {"path": "."}))  # same call twice in one response
+        prefetcher.maybe_start(call("ls", {"path": "cached"}))
+        prefetcher.maybe_start(call("write_file", {"path": "x"}))
+        prefetcher.maybe_start(call("read_file", {"path": "unconfirmed"}))
+        assert prefetcher.started == 2
+
+        task = prefetcher.take(tool_call_key("ls", {"path": "."}))
+        assert await task == "ls result"
+        assert prefetcher.take(tool_call_key("ls", {"path": "."})) is None
+
+        leftover = prefetcher._tasks[tool_call_key("read_file", {"path": "unconfirmed"})]
+        prefetcher.cancel_pending()
+        await asyncio.sleep(0)
+        return leftover
+
+    leftover = asyncio.run(scenario())
+    assert leftover.cancelled()
+    assert executed == [("ls", {"path": "."}), ("read_file", {"path": "unconfirmed"})]
+
+
+def test_read_only_tools_start_before_response_finishes(agent, fake_provider, monkeypatch, tmp_path):
+    (tmp_path / "notes.txt").write_text("hello")
+    calls = [("ls", {"path": str(tmp_path)}), ("read_file", {"path": str(tmp_path / "notes.txt")})]
+
+    def script(messages):
+        if messages[-1]["role"] == "tool":
+            return FakeReply(content="Both files checked.")
+        return FakeReply(content="Checking.", tool_calls=calls)
+
+    fake_provider.script = script
+    fake_provider.chunk_delay = 0.01
+
+    timeline = []
+    original_execute = agent._execute_tool
+    original_stream = fake_provider._stream
+
+    async def recording_execute(tool_name, arguments):
+        timeline.append(("tool_start", tool_name))
+        return await original_execute(tool_name, arguments)
+
+    async def recording_stream(*args):
+        async for chunk in original_stream(*args):
+            yield chunk
+        timeline.append(("stream_end", None))
+
+    monkeypatch.setattr(agent, "_execute_tool", recording_execute)
+    monkeypatch.setattr(fake_provider, "_stream", recording_stream)
+
+    async def run():
+        return [event async for event in agent.process_message("Look around", session_id="prefetch")]
+
+    events = asyncio.run(run())
+    results = [event for event in events if event["type"] == "tool_result"]
+
+    assert [event["tool_name"] for event in results] == ["ls", "read_file"]
+    assert all(event["prefetched"] for event in results)
+    assert "hello" in results[1]["result"]
+    # ls started while read_file's arguments were still streaming
+    assert timeline.index(("tool_start", "ls")) < timeline.index(("stream_end", None))
+    assert events[-1]["type"] == "stream_end"
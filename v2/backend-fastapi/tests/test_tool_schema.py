@@ -0,0 +1,136 @@
+"""
+Compiled tool metadata: cached schemas and copy-free validation
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from bench_tool_validation import net_peak_bytes_per_call
+from tools import BaseTool, LsTool, ReadFileTool, ToolParameter, ToolResult, ToolValidationError
+from tools.registry import ToolRegistry
+
+
+class EchoTool(BaseTool):
+    calls = 0
+
+    @property
+    def name(self):
+        return "echo"
+
+    @property
+    def description(self):
+        return "Echo the text back"
+
+    @property
+    def parameters(self):
+        EchoTool.calls += 1
+        return [ToolParameter(name="text", type="string", description="Text to echo")]
+
+    async def execute(self, text):
+        return ToolResult(success=True, data=text)
+
+
+def test_parameters_declared_once():
+    tool = EchoTool()
+    EchoTool.calls = 0
+    for _ in range(5):
+        tool.validate_parameters({"text": "hi"})
+        tool.get_definition()
+    assert EchoTool.calls == 1
+
+
+def test_registry_caches_and_invalidates_schemas():
+    registry = ToolRegistry()
+    registry.register_class(ReadFileTool)
+    schemas = registry.get_function_schemas()
+    assert registry.get_function_schemas() is schemas
+    assert registry.get_definitions() is registry.get_definitions()
+
+    registry.register_class(LsTool)
+    updated = registry.get_function_schemas()
+    assert updated is not schemas
+    assert [s["function"]["name"] for s in updated] == ["read_file", "ls"]
+
+    registry.clear()
+    assert registry.get_function_schemas() == []
+
+
+def test_function_schema_format():
+    schema = ReadFileTool().compiled.function_schema
+    assert schema["type"] == "function"
+    params = schema["function"]["parameters"]
+    assert params["required"] == ["path"]
+    assert params["properties"]["encoding"]["default"] == "utf-8"
+
+
+def test_validation_fills_defaults_and_drops_unknown_keys():
+    tool = ReadFileTool()
+    assert tool.validate_parameters({"path": "a.txt", "bogus": 1}) == {
+        "path": "a.txt", "encoding": "utf-8"
+    }
+    with pytest.raises(ValueError, match="'path' is missing"):
+        ReadFileTool().validate_parameters({})
+
+
+def test_complete_arguments_validate_without_copying():
+    tool = ReadFileTool()
+    kwargs = {"path": "README.md", "encoding": "utf-8"}
+    assert tool.validate_parameters(kwargs) is kwargs
+    # Only the loop iterator, no validated copy of the arguments
+    assert net_peak_bytes_per_call(tool.compiled.validate, kwargs, 1000) < 100
+
+
+def test_llm_style_arguments_are_coerced():
+    assert ReadFileTool().validate_parameters({"path": "a.txt", "lines": "50"})["lines"] == 50
+    assert ReadFileTool().validate_parameters({"path": "a.txt", "lines": 50.0})["lines"] == 50
+    validated = LsTool().validate_parameters({"details": "true", "show_hidden": "no"})
+    assert validated["details"] is True
+    assert validated["show_hidden"] is False
+
+
+def test_null_optional_argument_uses_default():
+    assert LsTool().validate_parameters({"path": None})["path"] == "."
+
+
+def test_validation_errors_are_structured():
+    with pytest.raises(ToolValidationError) as exc_info:
+        ReadFileTool().validate_parameters({"lines": "fifty"})
+    errors = {e["parameter"]: e for e in exc_info.value.errors}
+    assert set(errors) == {"path", "lines"}
+    assert errors["lines"]["expected"] == "integer"
+    assert errors["lines"]["received"] == "fifty"
+
+
+def test_range_and_enum_constraints():
+    class ModeTool(EchoTool):
+        @property
+        def parameters(self):
+            return [
+                ToolParameter(name="mode", type="string", description="Mode", enum=["fast", "slow"]),
+                ToolParameter(name="depth", type="integer", description="Depth",
+                              required=False, minimum=0, maximum=5),
+            ]
+
+    tool = ModeTool()
+    assert tool.validate_parameters({"mode": "fast", "depth": "3"}) == {"mode": "fast", "depth": 3}
+    with pytest.raises(ToolValidationError) as exc_info:
+        tool.validate_parameters({"mode": "turbo", "depth": 9})
+    messages = {e["parameter"]: e["message"] for e in exc_info.value.errors}
+    assert "one of" in messages["mode"]
+    assert "<= 5" in messages["depth"]
+    properties = tool.compiled.function_schema["function"]["parameters"]["properties"]
+    assert properties["mode"]["enum"] == ["fast", "slow"]
+    assert properties["depth"]["maximum"] == 5
+
+
+def test_registry_returns_validation_errors_without_executing():
+    registry = ToolRegistry()
+    registry.register_class(ReadFileTool)
+    result = asyncio.run(registry.execute("read_file", path="a.txt", lines="many"))
+    assert not result.success
+    assert result.error.startswith("Parameter validation failed: lines:")
+    assert result.data["validation_errors"][0]["parameter"] == "lines"
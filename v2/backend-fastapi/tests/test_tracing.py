@@ -0,0 +1,101 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from app.tracing import ConsoleExporter, FileExporter, NOOP_SPAN, tracer
+from fake_provider import tool_loop
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def shutdown(self):
+        pass
+
+
+@pytest.fixture
+def spans():
+    exporter = CollectingExporter()
+    tracer.configure(exporter)
+    yield exporter.spans
+    tracer.configure(None)
+
+
+async def run_turn(agent, message="What is here?", session_id="traced"):
+    return [event async for event in agent.process_message(message, session_id=session_id)]
+
+
+def test_disabled_tracer_returns_noop_span():
+    assert not tracer.enabled
+    with tracer.span("anything", key="value") as span:
+        assert span is NOOP_SPAN
+
+
+def test_turn_spans_form_one_trace(agent, fake_provider, spans):
+    fake_provider.script = tool_loop(iterations=1)
+    events = asyncio.run(run_turn(agent))
+    assert events[-1]["type"] == "stream_end"
+
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span.name, []).append(span)
+
+    root = by_name["agent.turn"][0]
+    assert root.parent_id is None
+    assert root.attributes["session.id"] == "traced"
+    assert {span.trace_id for span in spans} == {root.trace_id}
+
+    completions = by_name["llm.completion"]
+    assert len(completions) == 2
+    for span in completions:
+        assert span.parent_id == root.span_id
+        assert span.attributes["llm.ttft_ms"] >= 0
+        assert span.attributes["llm.usage.completion_tokens"] > 0
+        assert span.status == "OK"
+    assert fake_provider.last_request["stream_options"] == {"include_usage": True}
+
+    (tool_span,) = by_name["tool.execute"]
+    assert tool_span.attributes == {"tool.name": "ls", "tool.success": True}
+    assert tool_span.parent_id == root.span_id
+
+    # user, assistant with tool call, tool result, final answer
+    assert len(by_name["persistence.add_message"]) == 4
+    assert all(span.end_ns >= span.start_ns for span in spans)
+
+
+def test_console_exporter_renders_tree():
+    stream = io.StringIO()
+    tracer.configure(ConsoleExporter(stream))
+    try:
+        with tracer.span("ws.receive", **{"client.id": "c1"}):
+            with tracer.span("tool.execute", **{"tool.name": "ls"}):
+                pass
+    finally:
+        tracer.configure(None)
+    lines = stream.getvalue().splitlines()
+    assert lines[0].startswith("trace ")
+    assert lines[1].startswith("  ws.receive ") and "client.id=c1" in lines[1]
+    assert lines[2].startswith("    tool.execute ")
+
+
+def test_file_exporter_writes_jsonl(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer.configure(FileExporter(path))
+    with tracer.span("parent"):
+        with pytest.raises(ValueError):
+            with tracer.span("child"):
+                raise ValueError("boom")
+    tracer.configure(None)
+
+    child, parent = [json.loads(line) for line in path.read_text().splitlines()]
+    assert child["parent_span_id"] == parent["span_id"]
+    assert child["trace_id"] == parent["trace_id"]
+    assert child["status"] == "ERROR"
+    assert child["events"][0]["attributes"]["exception.message"] == "boom"
+    assert parent["status"] == "OK"
@@ -0,0 +1,112 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.turn_streams import StreamRegistry, TurnStream
+from fake_provider import text_reply
+
+ANSWER = "A fairly long answer, streamed in many small chunks so the client can drop halfway."
+
+
+async def numbered(count, delay=0.0):
+    for i in range(count):
+        if delay:
+            await asyncio.sleep(delay)
+        yield {"type": "stream", "content": str(i)}
+
+
+def test_replay_after_last_event_and_gap_when_buffer_overflowed():
+    async def scenario():
+        registry = StreamRegistry(max_events=4)
+        stream = registry.start("s", numbered(10, delay=0.001))
+        live = [event async for event in stream.events()]
+        await stream.task
+        replay = [event async for event in stream.events(after=7)]
+        gap = [event async for event in stream.events(after=2)]
+        return stream, live, replay, gap
+
+    stream, live, replay, gap = asyncio.run(scenario())
+    assert [event["content"] for event in live] == [str(i) for i in range(10)]
+    assert [event["event_id"] for event in live] == list(range(1, 11))
+    assert all(event["stream_id"] == stream.id for event in live)
+    assert [event["content"] for event in replay] == ["7", "8", "9"]
+    assert gap[0]["type"] == "stream_gap" and gap[0]["missed_events"] == 4
+    assert [event["event_id"] for event in gap[1:]] == [7, 8, 9, 10]
+
+
+def test_two_listeners_and_cancelled_listener():
+    async def scenario():
+        stream = TurnStream("s")
+        first = asyncio.create_task(asyncio.wait_for(_collect(stream), 0.05))
+        second = asyncio.create_task(_collect(stream))
+        await asyncio.sleep(0.01)
+        stream.publish({"type": "stream", "content": "a"})
+        try:
+            await first  # times out and cancels while waiting
+        except asyncio.TimeoutError:
+            pass
+        stream.publish({"type": "stream", "content": "b"})
+        stream.finish()
+        return await second
+
+    events = asyncio.run(scenario())
+    assert [event["content"] for event in events] == ["a", "b"]
+
+
+async def _collect(stream):
+    return [event async for event in stream.events()]
+
+
+def test_websocket_reconnect_resumes_without_a_second_llm_call(agent, fake_provider, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "agent", agent)
+    fake_provider.script = text_reply(ANSWER)
+    fake_provider.chunk_size = 4
+    fake_provider.chunk_delay = 0.005
+
+    received = []
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws/resume-session") as ws:
+            ws.send_json({"message": "Tell me something"})
+            while len(received) < 5:
+                event = ws.receive_json()
+                if event["type"] == "stream":
+                    received.append(event)
+
+        stream_id = received[-1]["stream_id"]
+        with client.websocket_connect("/ws/resume-session") as ws:
+            ws.send_json({"resume": stream_id, "last_event_id": received[-1]["event_id"]})
+            while True:
+                event = ws.receive_json()
+                received.append(event)
+                if event["type"] == "stream_end":
+                    break
+
+            ws.send_json({"resume": "unknown"})
+            assert ws.receive_json()["type"] == "resume_failed"
+
+    content = "".join(event.get("content", "") for event in received if event["type"] == "stream")
+    assert content == ANSWER
+    assert [event["event_id"] for event in received] == list(range(1, len(received) + 1))
+    assert fake_provider.calls == 1
+
+    messages = asyncio.run(agent.conversation_manager.get_conversation_messages("resume-session"))
+    assert messages[-1] == {**messages[-1], "role": "assistant", "content": ANSWER}
+
+
+def test_abandoned_turn_still_persists(agent, fake_provider):
+    fake_provider.script = text_reply(ANSWER)
+    fake_provider.chunk_delay = 0.002
+
+    async def scenario():
+        registry = StreamRegistry()
+        stream = registry.start("abandoned", agent.process_message("Hi", session_id="abandoned"))
+        async for event in stream.events():
+            break  # the client went away after the first event
+        await stream.task
+        return await agent.conversation_manager.get_conversation_messages("abandoned")
+
+    messages = asyncio.run(scenario())
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[-1]["content"] == ANSWER
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.usage_ledger import UsageLedger
+from fake_provider import text_reply, tool_loop
+
+PRICING = {"input": 0.003, "output": 0.015}
+
+
+def test_every_llm_call_of_a_tool_loop_is_recorded_and_priced(agent, fake_provider):
+    fake_provider.script = tool_loop(iterations=2)
+
+    async def turn():
+        return [event async for event in agent.process_message("List files", session_id="costly")]
+
+    events = asyncio.run(turn())
+    ledger = agent.usage_ledger
+    records = [json.loads(line) for line in ledger.ledger_file.read_text().splitlines()]
+    assert len(records) == fake_provider.calls == 3
+    assert {r["session_id"] for r in records} == {"costly"}
+    assert not any(r["estimated"] for r in records)
+
+    session = ledger.get("sessions", "costly")
+    assert session["calls"] == 3
+    assert session["prompt_tokens"] == sum(r["prompt_tokens"] for r in records)
+    assert session["cost_usd"] == pytest.approx(sum(r["cost_usd"] for r in records), abs=1e-6)
+    assert events[-1]["type"] == "stream_end"
+    assert events[-1]["usage"]["cost_usd"] == pytest.approx(session["cost_usd"], abs=1e-6)
+    assert ledger.breakdown("models")[0]["model"] == records[0]["model"]
+
+
+def test_rollups_survive_restart_and_replay_only_the_tail(tmp_path):
+    ledger = UsageLedger(tmp_path, snapshot_every=3)
+    for i in range(5):
+        ledger.record(f"s{i % 2}", "claude-sonnet-4", 1000, 200, pricing=PRICING)
+    ledger._file.write(b'{"timestamp": "2026-')  # torn write at crash time
+    ledger._file.flush()
+
+    reopened = UsageLedger(tmp_path)
+    assert reopened._since_snapshot == 2  # records after the snapshot at 3
+    assert reopened.totals() == ledger.totals()
+    assert reopened.totals()["cost_usd"] == pytest.approx(5 * (1000 * 0.003 + 200 * 0.015) / 1000)
+    assert reopened.get("sessions", "s0")["calls"] == 3
+    assert reopened.ledger_file.read_bytes().endswith(b"}\n")
+
+    reopened.record("s1", "gpt-4.1", 10, 10)  # unpriced: tokens only
+    reopened.close()
+    final = UsageLedger(tmp_path)
+    assert final._since_snapshot == 0
+    assert final.get("models", "gpt-4.1")["cost_usd"] == 0.0
+    assert [m["model"] for m in final.breakdown("models")] == ["claude-sonnet-4", "gpt-4.1"]
+
+
+def test_two_ledgers_on_one_directory_see_each_others_records(tmp_path):
+    server = UsageLedger(tmp_path, snapshot_every=2)
+    batch = UsageLedger(tmp_path, snapshot_every=2)  # e.g. the batch CLI next to the running server
+    server.record("chat", "claude-sonnet-4", 100, 10)
+    batch.record("batch-1", "claude-sonnet-4", 200, 20)
+    server.record("chat", "claude-sonnet-4", 300, 30)  # snapshots, covering the batch record too
+
+    assert server.totals()["calls"] == batch.totals()["calls"] == 3
+    assert server.get("sessions", "batch-1")["prompt_tokens"] == 200
+    batch.close()
+    server.close()
+
+    reopened = UsageLedger(tmp_path)
+    assert reopened.totals()["calls"] == 3
+    assert reopened.totals()["prompt_tokens"] == 600
+    assert reopened.get("sessions", "chat")["calls"] == 2
+
+
+def test_usage_endpoints(agent, fake_provider, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "agent", agent)
+    fake_provider.script = text_reply("Priced answer")
+    asyncio.run(_drain(agent.process_message("Hi", session_id="billing")))
+
+    with TestClient(main.app) as client:
+        assert client.get("/usage").json()["calls"] == 1
+        assert client.get("/usage/sessions/billing").json()["session_id"] == "billing"
+        assert client.get("/usage/sessions/unknown").status_code == 404
+        assert client.get("/usage/sessions").json()["sessions"][0]["session_id"] == "billing"
+        days = client.get("/usage/days").json()["days"]
+        assert len(days) == 1 and days[0]["calls"] == 1
+        assert client.get("/usage/days", params={"start": "2999-01-01"}).json() == {"days": []}
+
+
+async def _drain(events):
+    async for _ in events:
+        pass
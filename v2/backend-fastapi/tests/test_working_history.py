@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from app.message_normalizer import MISSING_RESULT_CONTENT, format_message
+from app.working_history import WorkingHistory
+from fake_provider import tool_loop
+
+
+def assistant_call(*ids):
+    return {
+        "role": "assistant", "content": None, "timestamp": "t",
+        "tool_calls": [{"id": i, "type": "function", "function": {"name": "ls", "arguments": "{}"}} for i in ids]
+    }
+
+
+def tool_result(call_id, content="ok"):
+    return {"role": "tool", "content": content, "tool_call_id": call_id, "timestamp": "t"}
+
+
+def test_incremental_append_matches_full_format():
+    stored = [
+        {"role": "user", "content": "hi", "timestamp": "t"},
+        assistant_call("a", "b"),
+        tool_result("a"),
+        tool_result("b", content=42),
+        {"role": "assistant", "content": "done", "timestamp": "t"},
+    ]
+    history = WorkingHistory("system", max_tokens=32000)
+    history.extend(stored)
+
+    expected = [{"role": "system", "content": "system"}] + [format_message(m) for m in stored]
+    assert history.messages() == expected
+    assert history.messages()[4]["content"] == "42"
+
+
+def test_missing_tool_results_get_placeholders():
+    history = WorkingHistory("system", max_tokens=32000)
+    history.append(assistant_call("a", "b"))
+    history.append(tool_result("a"))
+    history.append({"role": "user", "content": "next"})
+
+    roles = [(m["role"], m.get("tool_call_id")) for m in history.messages()]
+    assert roles == [("system", None), ("assistant", None), ("tool", "a"), ("tool", "b"), ("user", None)]
+    assert history.messages()[3]["content"] == MISSING_RESULT_CONTENT
+
+
+def test_truncation_never_leaves_orphan_tool_results():
+    history = WorkingHistory("system", max_tokens=100)  # 320 characters
+    history.append({"role": "user", "content": "x" * 100})
+    history.append(assistant_call("a"))
+    history.append(tool_result("a", content="y" * 120))
+    history.append({"role": "assistant", "content": "z" * 100})
+
+    messages = history.messages()
+    # The tool block goes as a unit; the user's question and the answer stay
+    assert [m["role"] for m in messages] == ["system", "user", "assistant"]
+    assert messages[-1]["content"] == "z" * 100
+    assert history.dropped == 2
+
+
+def test_oversized_tool_result_is_clipped_not_orphaned():
+    history = WorkingHistory("system", max_tokens=200, provider="anthropic")  # 640 characters
+    history.append({"role": "user", "content": "What is in the file?"})
+    history.append(assistant_call("a"))
+    history.append(tool_result("a", content="x" * 2000))
+
+    messages = history.messages()
+    assert [(m["role"], m.get("tool_call_id")) for m in messages] == [
+        ("system", None), ("user", None), ("assistant", None), ("tool", "a")
+    ]
+    assert messages[1]["content"] == "What is in the file?"
+    assert messages[3]["content"].endswith("clipped to fit the context window ...]")
+    assert sum(len(json.dumps(m)) for m in messages) <= history.target_chars
+
+
+def test_tool_loop_reads_the_conversation_once(agent, fake_provider, monkeypatch):
+    fake_provider.script = tool_loop(iterations=4)
+    loads = []
+    original_load = agent.conversation_manager.get_conversation_messages
+
+    async def counting_load(session_id):
+        loads.append(session_id)
+        return await original_load(session_id)
+
+    monkeypatch.setattr(agent.conversation_manager, "get_conversation_messages", counting_load)
+
+    async def run():
+        return [event async for event in agent.process_message("Explore", session_id="history")]
+
+    events = asyncio.run(run())
+    assert sum(event["type"] == "tool_result" for event in events) == 4
+    assert events[-1]["type"] == "stream_end"
+    assert loads == ["history"]
+
+    # What the model saw last is exactly the stored conversation, formatted
+    stored = asyncio.run(original_load("history"))
+    last_request = fake_provider.last_request["messages"]
+    assert last_request[1:] == [format_message(m) for m in stored[:-1]]
@@ -1,18 +1,22 @@
-from .base import BaseTool, ToolParameter, ToolResult, ToolDefinition
+from .base import BaseTool, ToolParameter, ToolResult, ToolDefinition, ToolValidationError
 from .registry import tool_registry
 from .ls_tool import LsTool
 from .read_file_tool import ReadFileTool
+from .grep_tool import GrepTool
 
 __all__ = [
     "BaseTool",
     "ToolParameter",
     "ToolResult",
     "ToolDefinition",
+    "ToolValidationError",
     "tool_registry",
     "LsTool",
-    "ReadFileTool"
+    "ReadFileTool",
+    "GrepTool"
 ]
 
 # Register default tools
 tool_registry.register_class(LsTool)
-tool_registry.register_class(ReadFileTool)
\ No newline at end of file
+tool_registry.register_class(ReadFileTool)
+tool_registry.register_class(GrepTool)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional, List
 from pydantic import BaseModel, Field
+from .schema import CompiledTool, ToolValidationError
 
 
 class ToolParameter(BaseModel):
@@ -9,6 +10,10 @@ class ToolParameter(BaseModel):
     description: str
     required: bool = True
     default: Optional[Any] = None
+    enum: Optional[List[Any]] = None
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    items: Optional[Dict[str, Any]] = None  # JSON schema of array elements
 
 
 class ToolDefinition(BaseModel):
@@ -43,30 +48,33 @@ class BaseTool(ABC):
         """List of parameters the tool accepts."""
         return []
     
+    @property
+    def read_only(self) -> bool:
+        """Whether the tool has no side effects and is idempotent (safe to run speculatively)."""
+        return False
+    
     @abstractmethod
     async def execute(self, **kwargs) -> ToolResult:
         """Execute the tool with the given parameters."""
         pass
     
+    @property
+    def compiled(self) -> CompiledTool:
+        """Compiled metadata (definition, JSON schema, validator), built once."""
+        compiled = self.__dict__.get("_compiled")
+        if compiled is None:
+            compiled = CompiledTool(self)
+            self._compiled = compiled
+        return compiled
+    
+    def invalidate_compiled(self) -> None:
+        """Drop compiled metadata so it is rebuilt from `parameters` on next use."""
+        self.__dict__.pop("_compiled", None)
+    
     def get_definition(self) -> ToolDefinition:
         """Get the tool definition for registration."""
-        return ToolDefinition(
-            name=self.name,
-            description=self.description,
-            parameters=self.parameters
-        )
+        return self.compiled.definition
     
     def validate_parameters(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
-        """Validate and parse tool parameters."""
-        validated = {}
-        
-        for param in self.parameters:
-            if param.required and param.name not in kwargs:
-                raise ValueError(f"Required parameter '{param.name}' is missing")
-            
-            if param.name in kwargs:
-                validated[param.name] = kwargs[param.name]
-            elif param.default is not None:
-                validated[param.name] = param.default
-        
-        return validated
\ No newline at end of file
+        """Validate and coerce tool parameters (raises ToolValidationError)."""
+        return self.compiled.validate(kwargs)
@@ -0,0 +1,239 @@
+import fnmatch
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import AbstractSet, Iterator, List, Optional, Sequence, Tuple
+
+# Directories that recursive walks never descend into
+ALWAYS_SKIP_DIRS = frozenset({".git", ".hg", ".svn"})
+
+
+@dataclass
+class WalkEntry:
+    """A directory entry found while walking a tree."""
+    path: str          # path relative to the walk root, "/"-separated
+    name: str
+    is_dir: bool
+    depth: int
+    entry: os.DirEntry
+
+    def stat(self) -> os.stat_result:
+        """Stat the entry (cached by os.DirEntry, so at most one syscall)."""
+        return self.entry.stat()
+
+
+def split_patterns(patterns: Optional[str]) -> List[str]:
+    """Split a comma-separated glob list ("*.py, docs/*") into patterns."""
+    if not patterns:
+        return []
+    return [p.strip() for p in patterns.split(",") if p.strip()]
+
+
+def matches_any(rel_path: str, name: str, patterns: Sequence[str]) -> bool:
+    """Match globs against the name, or the relative path if the glob has a '/'."""
+    for pattern in patterns:
+        target = rel_path if "/" in pattern else name
+        if fnmatch.fnmatchcase(target, pattern):
+            return True
+    return False
+
+
+def _gitignore_to_regex(pattern: str) -> str:
+    """Translate a gitignore glob into a regex over "/"-separated relative paths."""
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern[i:i + 3] == "**/":
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pattern[i:i + 2] == "**":
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class GitignoreRules:
+    """Compiled rules from a single .gitignore file, relative to its directory."""
+
+    def __init__(self, lines: Sequence[str]):
+        # (regex, negated, dir_only) in file order; the last match wins
+        self.rules: List[Tuple[re.Pattern, bool, bool]] = []
+        for raw in lines:
+            line = raw.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            if line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            line = line.lstrip("/")
+            body = _gitignore_to_regex(line)
+            regex = f"^{body}$" if anchored else f"^(?:.*/)?{body}$"
+            self.rules.append((re.compile(regex), negated, dir_only))
+
+    @classmethod
+    def from_file(cls, path: str) -> Optional["GitignoreRules"]:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                rules = cls(f.readlines())
+        except OSError:
+            return None
+        return rules if rules.rules else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included, None if no rule applies."""
+        result = None
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negated
+        return result
+
+
+class GitignoreStack:
+    """
+    Applies the .gitignore files of every directory from the repository root
+    down. Frames are keyed by directory relative to the repository root;
+    `prefix` is the walk root's own path inside the repository.
+    """
+
+    def __init__(self, frames: Tuple[Tuple[str, GitignoreRules], ...] = (), prefix: str = ""):
+        self.frames = frames
+        self.prefix = prefix
+
+    @classmethod
+    def for_root(cls, root: str) -> "GitignoreStack":
+        """Collect .gitignore files from the enclosing repository down to root."""
+        repo_root = root
+        while not os.path.isdir(os.path.join(repo_root, ".git")):
+            parent = os.path.dirname(repo_root)
+            if parent == repo_root:
+                # Not inside a repository: only .gitignore files below root apply
+                return cls().push(root, "")
+            repo_root = parent
+
+        prefix = os.path.relpath(root, repo_root).replace(os.sep, "/")
+        prefix = "" if prefix == "." else prefix
+        stack = cls(prefix=prefix)
+        current, rel = repo_root, ""
+        stack = stack._push_repo_dir(current, rel)
+        for part in (prefix.split("/") if prefix else []):
+            current = os.path.join(current, part)
+            rel = f"{rel}/{part}" if rel else part
+            stack = stack._push_repo_dir(current, rel)
+        return stack
+
+    def _push_repo_dir(self, dir_path: str, repo_rel_dir: str) -> "GitignoreStack":
+        rules = GitignoreRules.from_file(os.path.join(dir_path, ".gitignore"))
+        if rules is None:
+            return self
+        return GitignoreStack(self.frames + ((repo_rel_dir, rules),), self.prefix)
+
+    def push(self, dir_path: str, rel_dir: str) -> "GitignoreStack":
+        """Return a stack extended with dir_path/.gitignore, if there is one."""
+        return self._push_repo_dir(dir_path, self._repo_rel(rel_dir))
+
+    def _repo_rel(self, rel_path: str) -> str:
+        if not self.prefix:
+            return rel_path
+        return f"{self.prefix}/{rel_path}" if rel_path else self.prefix
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        rel_path = self._repo_rel(rel_path)
+        ignored = False
+        for base, rules in self.frames:
+            if base:
+                if not rel_path.startswith(base + "/"):
+                    continue
+                local = rel_path[len(base) + 1:]
+            else:
+                local = rel_path
+            verdict = rules.match(local, is_dir)
+            if verdict is not None:
+                ignored = verdict
+        return ignored
+
+
+def walk(
+    root: str,
+    max_depth: int = 1,
+    show_hidden: bool = False,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    respect_gitignore: bool = False,
+    skip_dirs: AbstractSet[str] = ALWAYS_SKIP_DIRS
+) -> Iterator[WalkEntry]:
+    """
+    Breadth-first walk using os.scandir, entries sorted by name per directory,
+    so that when a caller stops early it has seen the shallowest entries.
+
+    File types come from the directory listing itself (no stat per entry).
+    `include` only filters files; directories are still descended into.
+    `exclude`, `skip_dirs` and .gitignore rules prune whole directories.
+    """
+    root = os.path.abspath(root)
+    gitignore = GitignoreStack.for_root(root) if respect_gitignore else None
+    # Queue of (absolute dir, relative dir, depth, gitignore rules in effect)
+    queue = deque([(root, "", 1, gitignore)])
+
+    while queue:
+        dir_path, rel_dir, depth, rules = queue.popleft()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except (PermissionError, FileNotFoundError, NotADirectoryError):
+            if depth == 1:
+                raise
+            continue
+
+        for entry in entries:
+            name = entry.name
+            if not show_hidden and name.startswith("."):
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir and name in skip_dirs:
+                continue
+
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if exclude and matches_any(rel_path, name, exclude):
+                continue
+            if rules is not None and rules.is_ignored(rel_path, is_dir):
+                continue
+
+            if is_dir or not include or matches_any(rel_path, name, include):
+                yield WalkEntry(rel_path, name, is_dir, depth, entry)
+
+            if is_dir and depth < max_depth and not entry.is_symlink():
+                child_rules = rules.push(entry.path, rel_path) if rules is not None else None
+                queue.append((entry.path, rel_path, depth + 1, child_rules))
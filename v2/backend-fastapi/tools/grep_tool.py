@@ -0,0 +1,365 @@
+import asyncio
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from .base import BaseTool, ToolParameter, ToolResult
+from .fs_walk import walk, split_patterns
+
+# Files at least this large are searched through mmap instead of read()
+MMAP_THRESHOLD = 1024 * 1024
+# Files larger than this are skipped entirely
+MAX_FILE_SIZE = 64 * 1024 * 1024
+# A NUL byte in the first block marks a file as binary
+BINARY_SNIFF_BYTES = 8192
+# Long lines (minified JS, data files) are clipped in the output
+MAX_LINE_CHARS = 300
+MAX_FILES = 20000
+MAX_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+# (line number, line text, lines before, lines after)
+Match = Tuple[int, str, List[str], List[str]]
+
+
+def _decode_line(raw: bytes) -> str:
+    line = raw.decode("utf-8", errors="replace").rstrip("\r")
+    if len(line) > MAX_LINE_CHARS:
+        line = line[:MAX_LINE_CHARS] + "…"
+    return line
+
+
+def _context_before(buf, line_start: int, count: int) -> List[str]:
+    lines = []
+    end = line_start - 1  # the "\n" that ends the previous line
+    while count > 0 and end >= 0:
+        start = buf.rfind(b"\n", 0, end) + 1
+        lines.append(_decode_line(buf[start:end]))
+        end = start - 1
+        count -= 1
+    lines.reverse()
+    return lines
+
+
+def _context_after(buf, line_end: int, count: int) -> List[str]:
+    lines = []
+    start = line_end + 1
+    size = len(buf)
+    while count > 0 and start < size:
+        end = buf.find(b"\n", start)
+        if end == -1:
+            end = size
+        lines.append(_decode_line(buf[start:end]))
+        start = end + 1
+        count -= 1
+    return lines
+
+
+def _count_newlines(buf, start: int, end: int) -> int:
+    if isinstance(buf, bytes):
+        return buf.count(b"\n", start, end)
+    # mmap has no count(); slicing copies, but only the span between matches
+    return buf[start:end].count(b"\n")
+
+
+def search_buffer(buf, regex: "re.Pattern[bytes]", context: int, limit: int) -> List[Match]:
+    """Find up to `limit` matching lines in a bytes-like buffer (bytes or mmap)."""
+    matches: List[Match] = []
+    line_no = 1
+    counted_to = 0
+    last_line_start = -1
+
+    for found in regex.finditer(buf):
+        line_start = buf.rfind(b"\n", 0, found.start()) + 1
+        if line_start == last_line_start:
+            continue  # several hits on one line are reported once
+        last_line_start = line_start
+
+        line_no += _count_newlines(buf, counted_to, line_start)
+        counted_to = line_start
+
+        line_end = buf.find(b"\n", found.start())
+        if line_end == -1:
+            line_end = len(buf)
+
+        matches.append((
+            line_no,
+            _decode_line(buf[line_start:line_end]),
+            _context_before(buf, line_start, context) if context else [],
+            _context_after(buf, line_end, context) if context else []
+        ))
+        if len(matches) >= limit:
+            break
+    return matches
+
+
+def search_file(path: str, regex: "re.Pattern[bytes]", context: int, limit: int,
+                stop: threading.Event) -> Optional[List[Match]]:
+    """Search one file; returns None for skipped (binary, huge or unreadable) files."""
+    if stop.is_set():
+        return None
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or size > MAX_FILE_SIZE:
+                return None
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    if b"\0" in buf[:BINARY_SNIFF_BYTES]:
+                        return None
+                    return search_buffer(buf, regex, context, limit)
+            buf = f.read()
+    except (OSError, ValueError):
+        return None
+    if b"\0" in buf[:BINARY_SNIFF_BYTES]:
+        return None
+    return search_buffer(buf, regex, context, limit)
+
+
+class GrepTool(BaseTool):
+    """Tool for searching file contents across a directory tree."""
+
+    @property
+    def name(self) -> str:
+        return "grep"
+
+    @property
+    def description(self) -> str:
+        return (
+            "Search file contents under a directory for a regex or literal string. "
+            "Returns compact 'path:line:text' matches so only the relevant lines need reading. "
+            "Skips binary files and .gitignore'd paths"
+        )
+
+    @property
+    def read_only(self) -> bool:
+        return True
+
+    @property
+    def parameters(self) -> List[ToolParameter]:
+        return [
+            ToolParameter(
+                name="pattern",
+                type="string",
+                description="Regular expression (or literal text with literal=true) to search for",
+                required=True
+            ),
+            ToolParameter(
+                name="path",
+                type="string",
+                description="File or directory to search (defaults to current directory)",
+                required=False,
+                default="."
+            ),
+            ToolParameter(
+                name="literal",
+                type="boolean",
+                description="Treat pattern as plain text instead of a regex",
+                required=False,
+                default=False
+            ),
+            ToolParameter(
+                name="ignore_case",
+                type="boolean",
+                description="Case-insensitive search",
+                required=False,
+                default=False
+            ),
+            ToolParameter(
+                name="include",
+                type="string",
+                description="Comma-separated globs of files to search, e.g. '*.py,*.ts'",
+                required=False
+            ),
+            ToolParameter(
+                name="exclude",
+                type="string",
+                description="Comma-separated globs of files or directories to skip",
+                required=False
+            ),
+            ToolParameter(
+                name="context",
+                type="integer",
+                description="Lines of context to show before and after each match",
+                required=False,
+                default=0,
+                minimum=0,
+                maximum=10
+            ),
+            ToolParameter(
+                name="max_matches",
+                type="integer",
+                description="Maximum number of matching lines to return in total",
+                required=False,
+                default=100,
+                minimum=1,
+                maximum=1000
+            ),
+            ToolParameter(
+                name="max_matches_per_file",
+                type="integer",
+                description="Maximum number of matching lines to return per file",
+                required=False,
+                default=20,
+                minimum=1,
+                maximum=1000
+            ),
+            ToolParameter(
+                name="respect_gitignore",
+                type="boolean",
+                description="Skip files ignored by .gitignore",
+                required=False,
+                default=True
+            )
+        ]
+
+    async def execute(self, pattern: str, path: str = ".", literal: bool = False,
+                     ignore_case: bool = False, include: Optional[str] = None,
+                     exclude: Optional[str] = None, context: int = 0,
+                     max_matches: int = 100, max_matches_per_file: int = 20,
+                     respect_gitignore: bool = True) -> ToolResult:
+        """Search file contents."""
+        try:
+            target_path = Path(path).resolve()
+            if not target_path.exists():
+                return ToolResult(
+                    success=False,
+                    error=f"Path does not exist: {path}"
+                )
+
+            source = re.escape(pattern) if literal else pattern
+            flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+            try:
+                regex = re.compile(source.encode("utf-8"), flags)
+            except re.error as e:
+                return ToolResult(
+                    success=False,
+                    error=f"Invalid regex '{pattern}': {e}. Use literal=true to search plain text."
+                )
+
+            # File walking and scanning are blocking; keep them off the event loop
+            data = await asyncio.to_thread(
+                self._search, target_path, regex, include, exclude, context,
+                max_matches, max_matches_per_file, respect_gitignore
+            )
+            return ToolResult(
+                success=True,
+                data={"pattern": pattern, "path": str(target_path), **data}
+            )
+
+        except PermissionError:
+            return ToolResult(
+                success=False,
+                error=f"Permission denied: {path}"
+            )
+        except Exception as e:
+            return ToolResult(
+                success=False,
+                error=f"Error searching files: {str(e)}"
+            )
+
+    def _collect_files(self, root: Path, include: Optional[str], exclude: Optional[str],
+                       respect_gitignore: bool) -> Tuple[List[Tuple[str, str]], bool]:
+        """List (relative path, absolute path) of files to scan."""
+        if root.is_file():
+            return [(root.name, str(root))], False
+
+        files = []
+        for found in walk(
+            str(root),
+            max_depth=64,
+            include=split_patterns(include),
+            exclude=split_patterns(exclude),
+            respect_gitignore=respect_gitignore
+        ):
+            if found.is_dir:
+                continue
+            if len(files) >= MAX_FILES:
+                files.sort()
+                return files, True
+            files.append((found.path, found.entry.path))
+        # Walk order is breadth-first; report matches in path order
+        files.sort()
+        return files, False
+
+    def _search(self, root: Path, regex: "re.Pattern[bytes]", include: Optional[str],
+                exclude: Optional[str], context: int, max_matches: int,
+                max_matches_per_file: int, respect_gitignore: bool) -> Dict[str, Any]:
+        """Scan files in parallel and render matches in path order."""
+        files, too_many_files = self._collect_files(root, include, exclude, respect_gitignore)
+
+        # Threads overlap file I/O (and mmap page faults); the regex engine is
+        # fast enough per file that a process pool's startup and pickling costs
+        # would outweigh the parallel CPU time for typical project trees.
+        stop = threading.Event()
+        found_total = 0
+        lock = threading.Lock()
+
+        def scan(abs_path: str) -> Optional[List[Match]]:
+            nonlocal found_total
+            result = search_file(abs_path, regex, context, max_matches_per_file, stop)
+            if result:
+                with lock:
+                    found_total += len(result)
+                    if found_total >= max_matches:
+                        stop.set()
+            return result
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            results = list(pool.map(scan, [abs_path for _, abs_path in files]))
+
+        lines: List[str] = []
+        match_count = 0
+        files_with_matches = 0
+        truncated = too_many_files or stop.is_set()
+
+        for (rel_path, _), file_matches in zip(files, results):
+            if not file_matches:
+                continue
+            if match_count >= max_matches:
+                truncated = True
+                break
+            files_with_matches += 1
+            if len(file_matches) >= max_matches_per_file:
+                truncated = True
+
+            file_matches = file_matches[:max_matches - match_count]
+            match_count += len(file_matches)
+            lines.extend(self._render_file(rel_path, file_matches, context))
+
+        data = {
+            "matches": match_count,
+            "files_with_matches": files_with_matches,
+            "files_scanned": sum(1 for result in results if result is not None),
+            "results": "\n".join(lines)
+        }
+        if truncated:
+            data["truncated"] = True
+        return data
+
+    @staticmethod
+    def _render_file(rel_path: str, file_matches: List[Match], context: int) -> List[str]:
+        """grep-style lines: 'path:N:text' for matches, 'path-N-text' for context."""
+        # line number -> (is match, text); matches win over overlapping context
+        rendered: Dict[int, Tuple[bool, str]] = {}
+        for line_no, text, before, after in file_matches:
+            for offset, ctx in enumerate(before):
+                rendered.setdefault(line_no - len(before) + offset, (False, ctx))
+            rendered[line_no] = (True, text)
+            for offset, ctx in enumerate(after, start=1):
+                rendered.setdefault(line_no + offset, (False, ctx))
+
+        lines = []
+        previous = None
+        for line_no in sorted(rendered):
+            if context and previous is not None and line_no > previous + 1:
+                lines.append("--")
+            is_match, text = rendered[line_no]
+            separator = ":" if is_match else "-"
+            lines.append(f"{rel_path}{separator}{line_no}{separator}{text}")
+            previous = line_no
+        if context:
+            lines.append("--")
+        return lines
@@ -1,20 +1,29 @@
+import asyncio
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from .base import BaseTool, ToolParameter, ToolResult
+from .fs_walk import ALWAYS_SKIP_DIRS, walk, split_patterns
 
 
 class LsTool(BaseTool):
-    """Tool for listing directory contents."""
-    
+    """Tool for listing directory contents, optionally as a recursive tree."""
+
     @property
     def name(self) -> str:
         return "ls"
-    
+
     @property
     def description(self) -> str:
-        return "List files and directories in a specified path"
-    
+        return (
+            "List files and directories in a specified path. Set recursive=true to list "
+            "a whole tree in one call (respects .gitignore, supports include/exclude globs)"
+        )
+
+    @property
+    def read_only(self) -> bool:
+        return True
+
     @property
     def parameters(self) -> List[ToolParameter]:
         return [
@@ -38,61 +47,105 @@ class LsTool(BaseTool):
                 description="Show detailed information (size, modified time)",
                 required=False,
                 default=False
+            ),
+            ToolParameter(
+                name="recursive",
+                type="boolean",
+                description="List subdirectories too, as paths relative to `path`",
+                required=False,
+                default=False
+            ),
+            ToolParameter(
+                name="max_depth",
+                type="integer",
+                description="How many directory levels to descend when recursive",
+                required=False,
+                default=3,
+                minimum=1,
+                maximum=20
+            ),
+            ToolParameter(
+                name="include",
+                type="string",
+                description="Comma-separated globs files must match, e.g. '*.py,*.md' (use 'dir/*.py' to match paths)",
+                required=False
+            ),
+            ToolParameter(
+                name="exclude",
+                type="string",
+                description="Comma-separated globs for files or directories to skip, e.g. 'node_modules,*.lock'",
+                required=False
+            ),
+            ToolParameter(
+                name="respect_gitignore",
+                type="boolean",
+                description="Skip entries ignored by .gitignore when recursive",
+                required=False,
+                default=True
+            ),
+            ToolParameter(
+                name="max_results",
+                type="integer",
+                description="Maximum number of entries to return when recursive",
+                required=False,
+                default=500,
+                minimum=1,
+                maximum=5000
+            ),
+            ToolParameter(
+                name="max_bytes",
+                type="integer",
+                description="Approximate maximum size of a recursive listing in bytes",
+                required=False,
+                default=32000,
+                minimum=256,
+                maximum=500000
             )
         ]
-    
-    async def execute(self, path: str = ".", show_hidden: bool = False, 
-                     details: bool = False) -> ToolResult:
+
+    async def execute(self, path: str = ".", show_hidden: bool = False,
+                     details: bool = False, recursive: bool = False,
+                     max_depth: int = 3, include: Optional[str] = None,
+                     exclude: Optional[str] = None, respect_gitignore: bool = True,
+                     max_results: int = 500, max_bytes: int = 32000) -> ToolResult:
         """List directory contents."""
         try:
             # Resolve the path
             target_path = Path(path).resolve()
-            
+
             # Check if path exists
             if not target_path.exists():
                 return ToolResult(
                     success=False,
                     error=f"Path does not exist: {path}"
                 )
-            
+
             # Check if it's a directory
             if not target_path.is_dir():
                 return ToolResult(
                     success=False,
                     error=f"Path is not a directory: {path}"
                 )
-            
-            # List directory contents
-            items = []
-            for item in sorted(target_path.iterdir()):
-                # Skip hidden files if not requested
-                if not show_hidden and item.name.startswith('.'):
-                    continue
-                
-                if details:
-                    # Get detailed information
-                    stat = item.stat()
-                    item_info = {
-                        "name": item.name,
-                        "type": "directory" if item.is_dir() else "file",
-                        "size": stat.st_size if item.is_file() else None,
-                        "modified": stat.st_mtime
-                    }
-                    items.append(item_info)
-                else:
-                    # Simple listing
-                    prefix = "/" if item.is_dir() else ""
-                    items.append(item.name + prefix)
-            
+
+            # Directory walking is blocking I/O; keep it off the event loop
+            data = await asyncio.to_thread(
+                self._list,
+                str(target_path),
+                recursive,
+                show_hidden,
+                details,
+                max_depth if recursive else 1,
+                include,
+                exclude,
+                respect_gitignore and recursive,
+                max_results,
+                max_bytes
+            )
             return ToolResult(
                 success=True,
-                data={
-                    "path": str(target_path),
-                    "items": items,
-                    "count": len(items)
-                }
+                data={"path": str(target_path), **data}
             )
-            
+
         except PermissionError:
             return ToolResult(
                 success=False,
@@ -102,4 +155,67 @@ class LsTool(BaseTool):
             return ToolResult(
                 success=False,
                 error=f"Error listing directory: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+    def _list(self, root: str, recursive: bool, show_hidden: bool, details: bool, max_depth: int,
+              include: Optional[str], exclude: Optional[str], respect_gitignore: bool,
+              max_results: int, max_bytes: int) -> Dict[str, Any]:
+        """Walk the tree with os.scandir; a recursive walk stops at the result or byte cap."""
+        if not recursive:
+            # A single directory is listed in full, VCS directories included
+            max_results = max_bytes = float("inf")
+        items = []
+        used_bytes = 0
+        truncated: Optional[str] = None
+
+        for found in walk(
+            root,
+            max_depth=max_depth,
+            show_hidden=show_hidden,
+            include=split_patterns(include),
+            exclude=split_patterns(exclude),
+            respect_gitignore=respect_gitignore,
+            skip_dirs=ALWAYS_SKIP_DIRS if recursive else frozenset()
+        ):
+            if len(items) >= max_results:
+                truncated = "max_results"
+                break
+
+            if details:
+                # One (cached) stat per entry
+                try:
+                    stat = found.stat()
+                except OSError:
+                    continue
+                item = {
+                    "name": found.path,
+                    "type": "directory" if found.is_dir else "file",
+                    "size": None if found.is_dir else stat.st_size,
+                    "modified": stat.st_mtime
+                }
+                # Rough JSON size of the entry
+                item_bytes = len(found.path) + 80
+            else:
+                item = found.path + ("/" if found.is_dir else "")
+                item_bytes = len(item) + 4
+
+            if used_bytes + item_bytes > max_bytes:
+                truncated = "max_bytes"
+                break
+            used_bytes += item_bytes
+            items.append(item)
+
+        if recursive:
+            # Breadth-first walk order; present the tree sorted by path
+            items.sort(key=lambda item: item["name"] if details else item.rstrip("/"))
+
+        data = {
+            "items": items,
+            "count": len(items)
+        }
+        if truncated:
+            data["truncated"] = True
+            data["truncated_reason"] = (
+                f"Stopped at {truncated}; narrow `path`, lower `max_depth` or use `include`/`exclude`"
+            )
+        return data
@@ -0,0 +1,135 @@
+"""
+Tool plugins: discovered without importing them, loaded on first use.
+
+Plugins are BaseTool subclasses named by "package.module:ClassName", either as
+entry points in the "dreamytin.tools" group (the entry point name is the tool
+name) or in TOOL_PLUGINS as "name=package.module:ClassName,...". A plugin is
+imported in a worker thread, by ToolRegistry.resolve_plugins() after startup or
+by its first execution; until then it is left out of the tool schemas, so
+neither importing the server nor the event loop ever waits on a plugin.
+Tools named in TOOL_PROCESS_ISOLATION (plugins or built-ins) run in the
+worker pool from tools.workers instead; an isolated plugin is imported only
+by the workers, never by the server.
+"""
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .base import BaseTool, ToolParameter, ToolResult
+from .schema import CompiledTool
+from .workers import ProcessTool, import_target, tool_workers
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "dreamytin.tools"
+
+
+def _names(value: str) -> List[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class PluginLoadError(Exception):
+    """A tool plugin could not be imported or is not a usable tool."""
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """Where a tool comes from and how it runs."""
+    name: str
+    target: str  # "package.module:ClassName"
+    isolation: str = "inline"  # "inline" or "process"
+    source: str = "config"
+
+
+class LazyTool(BaseTool):
+    """Registry entry for a plugin; imports (or describes, when isolated) the tool on first use."""
+
+    def __init__(self, spec: ToolSpec):
+        self.spec = spec
+        self._tool: Optional[BaseTool] = None
+        self._load_lock = threading.Lock()
+
+    def load(self) -> BaseTool:
+        """Import or describe the tool (blocking; use resolve() on the event loop)."""
+        with self._load_lock:
+            return self._load()
+
+    def _load(self) -> BaseTool:
+        if self._tool is None:
+            try:
+                if self.spec.isolation == "process":
+                    tool: BaseTool = ProcessTool(self.spec.target, tool_workers.describe(self.spec.target), tool_workers)
+                else:
+                    tool_class = import_target(self.spec.target)
+                    if not (isinstance(tool_class, type) and issubclass(tool_class, BaseTool)):
+                        raise TypeError(f"{self.spec.target} is not a BaseTool subclass")
+                    tool = tool_class()
+            except Exception as e:
+                raise PluginLoadError(f"Could not load tool '{self.spec.name}' from {self.spec.target}: {e}") from e
+            if tool.name != self.spec.name:
+                raise PluginLoadError(f"{self.spec.target} defines tool '{tool.name}', expected '{self.spec.name}'")
+            self._tool = tool
+            logger.info(f"Loaded tool plugin: {self.spec.name} ({self.spec.isolation})")
+        return self._tool
+
+    async def resolve(self) -> BaseTool:
+        """load() and compile the schema in a worker thread."""
+        if self._tool is None:
+            await asyncio.to_thread(lambda: self.load().compiled)
+        return self._tool
+
+    @property
+    def loaded(self) -> bool:
+        return self._tool is not None
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    @property
+    def description(self) -> str:
+        return self.load().description
+
+    @property
+    def parameters(self) -> List[ToolParameter]:
+        return self.load().parameters
+
+    @property
+    def read_only(self) -> bool:
+        # An unresolved (or broken) plugin is never run speculatively, nor imported to find out
+        return self._tool is not None and self._tool.read_only
+
+    @property
+    def compiled(self) -> CompiledTool:
+        return self.load().compiled
+
+    async def execute(self, **kwargs) -> ToolResult:
+        return await (await self.resolve()).execute(**kwargs)
+
+
+def isolated_tools() -> List[str]:
+    """Tool names that TOOL_PROCESS_ISOLATION sends to the worker pool."""
+    return _names(os.getenv("TOOL_PROCESS_ISOLATION", ""))
+
+
+def discover_plugins(isolated: List[str]) -> List[ToolSpec]:
+    """Plugin specs from entry points and TOOL_PLUGINS; nothing is imported."""
+    from importlib.metadata import entry_points
+
+    specs: Dict[str, ToolSpec] = {}
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        specs[entry_point.name] = ToolSpec(entry_point.name, entry_point.value, source="entry_point")
+    for item in _names(os.getenv("TOOL_PLUGINS", "")):
+        name, _, target = item.partition("=")
+        if not target:
+            logger.warning(f"Ignoring TOOL_PLUGINS entry '{item}': expected name=package.module:ClassName")
+            continue
+        specs[name.strip()] = ToolSpec(name.strip(), target.strip(), source="env")
+    return [
+        ToolSpec(spec.name, spec.target, "process", spec.source) if spec.name in isolated else spec
+        for spec in specs.values()
+    ]
+
@@ -14,6 +14,10 @@ class ReadFileTool(BaseTool):
     def description(self) -> str:
         return "Read the contents of a file"
     
+    @property
+    def read_only(self) -> bool:
+        return True
+    
     @property
     def parameters(self) -> List[ToolParameter]:
         return [
@@ -35,7 +39,8 @@ class ReadFileTool(BaseTool):
                 type="integer",
                 description="Number of lines to read (reads all if not specified)",
                 required=False,
-                default=None
+                default=None,
+                minimum=1
             )
         ]
     
@@ -1,5 +1,9 @@
-from typing import Dict, List, Optional, Type
-from .base import BaseTool, ToolDefinition, ToolResult
+import asyncio
+from typing import Any, Dict, List, Optional, Type
+from .base import BaseTool, ToolDefinition, ToolResult, ToolValidationError
+from .plugins import LazyTool, PluginLoadError, ToolSpec, discover_plugins, isolated_tools
+from .schema import CompiledTool
+from .workers import target_of
 import logging
 
 logger = logging.getLogger(__name__)
@@ -8,15 +12,30 @@ logger = logging.getLogger(__name__)
 class ToolRegistry:
     """Registry for managing available tools."""
     
-    def __init__(self):
+    def __init__(self, discover_plugins: bool = False):
         self._tools: Dict[str, BaseTool] = {}
+        # Plugin discovery (an entry point scan) waits until a tool is first looked up
+        self._plugins_pending = discover_plugins
+        self.plugins: List[ToolSpec] = []
+        # Precompiled views, rebuilt lazily after any registration change
+        self._definitions: Optional[List[ToolDefinition]] = None
+        self._function_schemas: Optional[List[Dict[str, Any]]] = None
+        self.version = 0
+    
+    def _invalidate(self) -> None:
+        """Drop cached definitions/schemas after the set of tools changed."""
+        self._definitions = None
+        self._function_schemas = None
+        self.version += 1
     
     def register(self, tool: BaseTool) -> None:
         """Register a tool instance."""
         if tool.name in self._tools:
             logger.warning(f"Tool '{tool.name}' is already registered. Overwriting.")
         
+        tool.compiled  # compile schema and validator up front
         self._tools[tool.name] = tool
+        self._invalidate()
         logger.info(f"Registered tool: {tool.name}")
     
     def register_class(self, tool_class: Type[BaseTool]) -> None:
@@ -24,17 +43,79 @@ class ToolRegistry:
         tool = tool_class()
         self.register(tool)
     
+    def register_plugin(self, spec: ToolSpec) -> None:
+        """Register a tool by reference; it is imported (or described by a worker) on first use."""
+        if spec.name in self._tools:
+            logger.warning(f"Tool '{spec.name}' is already registered. Overwriting with {spec.target}.")
+        self._tools[spec.name] = LazyTool(spec)
+        self.plugins = [plugin for plugin in self.plugins if plugin.name != spec.name] + [spec]
+        self._invalidate()
+    
+    def _load_plugins(self) -> None:
+        """Register discovered plugins and move isolated built-in tools to the worker pool."""
+        self._plugins_pending = False
+        isolated = isolated_tools()
+        for spec in discover_plugins(isolated):
+            self.register_plugin(spec)
+        for name in isolated:
+            tool = self._tools.get(name)
+            if tool is not None and not isinstance(tool, LazyTool):
+                self.register_plugin(ToolSpec(name, target_of(type(tool)), "process", "builtin"))
+    
     def get(self, name: str) -> Optional[BaseTool]:
         """Get a tool by name."""
+        if self._plugins_pending:
+            self._load_plugins()
         return self._tools.get(name)
     
     def list_tools(self) -> List[str]:
         """List all registered tool names."""
+        if self._plugins_pending:
+            self._load_plugins()
         return list(self._tools.keys())
     
+    def _compiled_tools(self) -> List[CompiledTool]:
+        """Compiled metadata of every tool; plugins appear once resolve_plugins() has loaded them."""
+        if self._plugins_pending:
+            self._load_plugins()
+        return [
+            tool.compiled for tool in self._tools.values()
+            if not isinstance(tool, LazyTool) or tool.loaded
+        ]
+    
+    async def resolve_plugins(self) -> bool:
+        """
+        Load pending plugins in worker threads, dropping those that fail to load.
+        Returns True if the tool schemas changed.
+        """
+        if self._plugins_pending:
+            self._load_plugins()
+        changed = False
+        for name, tool in list(self._tools.items()):
+            if not isinstance(tool, LazyTool) or tool.loaded:
+                continue
+            try:
+                await tool.resolve()
+            except PluginLoadError as e:
+                logger.error(f"Disabling tool '{name}': {e}")
+                if self._tools.get(name) is tool:
+                    del self._tools[name]
+            changed = True
+        if changed:
+            self._invalidate()
+        return changed
+    
     def get_definitions(self) -> List[ToolDefinition]:
         """Get all tool definitions."""
-        return [tool.get_definition() for tool in self._tools.values()]
+        if self._definitions is None:
+            self._definitions = [compiled.definition for compiled in self._compiled_tools()]
+        return self._definitions
+    
+    def get_function_schemas(self) -> List[Dict[str, Any]]:
+        """Get all tool definitions in OpenAI function calling format."""
+        if self._function_schemas is None:
+            self._function_schemas = [compiled.function_schema for compiled in self._compiled_tools()]
+        return self._function_schemas
     
     async def execute(self, tool_name: str, **kwargs) -> ToolResult:
         """Execute a tool by name with the given parameters."""
@@ -46,6 +127,9 @@ class ToolRegistry:
             )
         
         try:
+            if isinstance(tool, LazyTool):
+                await tool.resolve()  # validation needs the schema; import off the event loop
+            
             # Validate parameters
             validated_params = tool.validate_parameters(kwargs)
             
@@ -53,6 +137,13 @@ class ToolRegistry:
             result = await tool.execute(**validated_params)
             return result
             
+        except ToolValidationError as e:
+            # Structured errors let the model fix every argument in one retry
+            return ToolResult(
+                success=False,
+                error=f"Parameter validation failed: {str(e)}",
+                data={"validation_errors": e.errors}
+            )
         except ValueError as e:
             return ToolResult(
                 success=False,
@@ -68,7 +159,19 @@ class ToolRegistry:
     def clear(self) -> None:
         """Clear all registered tools."""
         self._tools.clear()
+        self.plugins = []
+        self._invalidate()
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "tools": list(self._tools.keys()),
+            "plugins": [
+                {"name": spec.name, "target": spec.target, "isolation": spec.isolation, "source": spec.source,
+                 "loaded": isinstance(self._tools.get(spec.name), LazyTool) and self._tools[spec.name].loaded}
+                for spec in self.plugins
+            ]
+        }
 
 
 # Global registry instance
-tool_registry = ToolRegistry()
\ No newline at end of file
+tool_registry = ToolRegistry(discover_plugins=True)
\ No newline at end of file
@@ -0,0 +1,248 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .base import BaseTool, ToolDefinition, ToolParameter
+
+
+# JSON Schema type -> exact Python types accepted without coercion.
+# `type(value) in ...` is used instead of isinstance so bool never passes as int.
+JSON_TYPES: Dict[str, Tuple[type, ...]] = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+}
+
+TRUE_STRINGS = frozenset({"true", "1", "yes", "y", "on"})
+FALSE_STRINGS = frozenset({"false", "0", "no", "n", "off"})
+
+
+class ToolValidationError(ValueError):
+    """Raised when tool arguments cannot be coerced to the declared schema."""
+
+    def __init__(self, tool_name: str, errors: List[Dict[str, Any]]):
+        self.tool_name = tool_name
+        self.errors = errors
+        details = "; ".join(f"{e['parameter']}: {e['message']}" for e in errors)
+        super().__init__(details)
+
+
+class ParameterSpec:
+    """Flattened constraints for a single parameter."""
+
+    __slots__ = ("name", "type", "types", "required", "default", "enum", "minimum", "maximum")
+
+    def __init__(self, param: "ToolParameter"):
+        self.name: str = param.name
+        self.type: str = param.type
+        self.types: Optional[Tuple[type, ...]] = JSON_TYPES.get(param.type)
+        self.required: bool = param.required
+        self.default: Any = param.default
+        self.enum: Optional[Tuple[Any, ...]] = tuple(param.enum) if param.enum is not None else None
+        self.minimum = param.minimum
+        self.maximum = param.maximum
+
+    def accepts(self, value: Any) -> bool:
+        """Whether the value is already valid as-is (no coercion needed)."""
+        if self.types is not None and type(value) not in self.types:
+            return False
+        if self.enum is not None and value not in self.enum:
+            return False
+        if self.minimum is not None and value < self.minimum:
+            return False
+        if self.maximum is not None and value > self.maximum:
+            return False
+        return True
+
+    def coerce(self, value: Any) -> Any:
+        """Convert an LLM-produced value to the declared type, or raise ValueError."""
+        if self.types is not None and type(value) not in self.types:
+            value = self._coerce_type(value)
+
+        if self.enum is not None and value not in self.enum:
+            raise ValueError(f"must be one of {list(self.enum)}")
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f"must be >= {self.minimum}")
+        if self.maximum is not None and value > self.maximum:
+            raise ValueError(f"must be <= {self.maximum}")
+        return value
+
+    def _coerce_type(self, value: Any) -> Any:
+        expected = self.type
+
+        if expected == "integer":
+            if isinstance(value, float) and value.is_integer():
+                return int(value)
+            if isinstance(value, str):
+                text = value.strip()
+                try:
+                    return int(text)
+                except ValueError:
+                    try:
+                        number = float(text)
+                    except ValueError:
+                        number = None
+                    if number is not None and number.is_integer():
+                        return int(number)
+
+        elif expected == "number":
+            if isinstance(value, str):
+                try:
+                    return float(value.strip())
+                except ValueError:
+                    pass
+
+        elif expected == "boolean":
+            if isinstance(value, str):
+                text = value.strip().lower()
+                if text in TRUE_STRINGS:
+                    return True
+                if text in FALSE_STRINGS:
+                    return False
+            elif type(value) is int and value in (0, 1):
+                return bool(value)
+
+        elif expected == "string":
+            if type(value) in (int, float):
+                return str(value)
+
+        elif expected in ("array", "object"):
+            if isinstance(value, str):
+                try:
+                    parsed = json.loads(value)
+                except json.JSONDecodeError:
+                    parsed = None
+                if type(parsed) in self.types:
+                    return parsed
+
+        raise ValueError(f"expected {expected}, got {type(value).__name__} {value!r}")
+
+
+class CompiledTool:
+    """
+    Tool metadata compiled once from the declared parameters.
+
+    Holds the pydantic definition, the OpenAI function schema and flat
+    lookup tables so that per-call validation does not rebuild any of them.
+    """
+
+    __slots__ = (
+        "name",
+        "definition",
+        "function_schema",
+        "_names",
+        "_specs",
+    )
+
+    def __init__(self, tool: "BaseTool"):
+        from .base import ToolDefinition
+
+        parameters: List["ToolParameter"] = list(tool.parameters)
+
+        self.name: str = tool.name
+        self.definition: "ToolDefinition" = ToolDefinition(
+            name=tool.name,
+            description=tool.description,
+            parameters=parameters
+        )
+        self.function_schema: Dict[str, Any] = self._build_function_schema(self.definition)
+
+        self._names = frozenset(param.name for param in parameters)
+        self._specs: Tuple[ParameterSpec, ...] = tuple(ParameterSpec(param) for param in parameters)
+
+    @staticmethod
+    def _build_function_schema(definition: "ToolDefinition") -> Dict[str, Any]:
+        """Convert a tool definition to OpenAI function calling format."""
+        properties: Dict[str, Any] = {}
+        required: List[str] = []
+
+        for param in definition.parameters:
+            properties[param.name] = {
+                "type": param.type,
+                "description": param.description
+            }
+            if param.required:
+                required.append(param.name)
+            if param.default is not None:
+                properties[param.name]["default"] = param.default
+            if param.enum is not None:
+                properties[param.name]["enum"] = list(param.enum)
+            if param.minimum is not None:
+                properties[param.name]["minimum"] = param.minimum
+            if param.maximum is not None:
+                properties[param.name]["maximum"] = param.maximum
+            if param.items is not None:
+                properties[param.name]["items"] = param.items
+
+        return {
+            "type": "function",
+            "function": {
+                "name": definition.name,
+                "description": definition.description,
+                "parameters": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": required
+                }
+            }
+        }
+
+    def validate(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate parameters against the compiled tables.
+
+        When the arguments are already valid and complete (types and
+        constraints match, no unknown keys, no defaults to fill) the input
+        dict is returned as-is. Anything else goes to `_coerce`.
+        """
+        present = 0
+        for spec in self._specs:
+            if spec.name in kwargs:
+                if not spec.accepts(kwargs[spec.name]):
+                    return self._coerce(kwargs)
+                present += 1
+            elif spec.required or spec.default is not None:
+                return self._coerce(kwargs)
+
+        if present == len(kwargs):
+            return kwargs
+        return self._coerce(kwargs)
+
+    def _coerce(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Slow path: coerce values, fill defaults and drop unknown keys into a
+        new dict, collecting every problem into one ToolValidationError.
+        """
+        validated: Dict[str, Any] = {}
+        errors: List[Dict[str, Any]] = []
+
+        for spec in self._specs:
+            value = kwargs.get(spec.name)
+            # null from the model means "not provided"
+            if value is None:
+                if spec.required:
+                    errors.append({
+                        "parameter": spec.name,
+                        "message": f"required parameter '{spec.name}' is missing",
+                        "expected": spec.type
+                    })
+                elif spec.default is not None:
+                    validated[spec.name] = spec.default
+                continue
+
+            try:
+                validated[spec.name] = spec.coerce(value)
+            except (ValueError, TypeError) as e:
+                errors.append({
+                    "parameter": spec.name,
+                    "message": str(e),
+                    "expected": spec.type,
+                    "received": value
+                })
+
+        if errors:
+            raise ToolValidationError(self.name, errors)
+        return validated
@@ -0,0 +1,238 @@
+"""
+Process workers for tools that should not run inside the server process.
+
+A tool listed in TOOL_PROCESS_ISOLATION runs in a pool of worker processes:
+CPU-heavy tools use every core without blocking the event loop, and a tool
+that hangs, leaks memory or crashes takes down a worker instead of the server.
+Each call gets a timeout, each worker a memory limit, and results above a
+size cap are replaced by an error before they are sent back.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from .base import BaseTool, ToolParameter, ToolResult
+
+try:
+    import resource
+except ImportError:  # Windows: no per-process memory limit
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+TOOL_TIMEOUT_S = float(os.getenv("TOOL_TIMEOUT_S", "30"))
+TOOL_MEMORY_LIMIT_MB = int(os.getenv("TOOL_MEMORY_LIMIT_MB", "1024"))
+TOOL_MAX_RESULT_BYTES = int(os.getenv("TOOL_MAX_RESULT_BYTES", "1000000"))
+# Extra time the parent waits before it stops trusting the worker's own timer
+KILL_GRACE_S = 2.0
+
+
+def import_target(target: str) -> Any:
+    """Resolve a "package.module:ClassName" reference."""
+    module_name, _, attribute = target.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def target_of(tool_class: type) -> str:
+    """The "module:ClassName" reference a worker imports a tool class from."""
+    return f"{tool_class.__module__}:{tool_class.__qualname__}"
+
+
+# --- Worker side -----------------------------------------------------------
+
+class ToolTimeout(Exception):
+    pass
+
+
+_worker_tools: Dict[str, BaseTool] = {}
+
+
+def _init_worker(memory_limit_mb: int) -> None:
+    # The parent handles Ctrl-C and shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None and memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_tool(target: str) -> BaseTool:
+    tool = _worker_tools.get(target)
+    if tool is None:
+        tool_class = import_target(target)
+        if not (isinstance(tool_class, type) and issubclass(tool_class, BaseTool)):
+            raise TypeError(f"{target} is not a BaseTool subclass")
+        tool = _worker_tools[target] = tool_class()
+    return tool
+
+
+def _raise_timeout(signum, frame):
+    raise ToolTimeout()
+
+
+def describe_tool(target: str) -> Dict[str, Any]:
+    """Definition of a tool, computed in the worker so the server never imports it."""
+    tool = _worker_tool(target)
+    return {
+        "name": tool.name,
+        "description": tool.description,
+        "parameters": [parameter.model_dump() for parameter in tool.parameters],
+        "read_only": tool.read_only
+    }
+
+
+def run_tool(target: str, params: Dict[str, Any], timeout_s: float, max_result_bytes: int) -> Dict[str, Any]:
+    """Execute a tool inside the worker and return its result as a plain dict."""
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout_s)
+    try:
+        result = asyncio.run(_worker_tool(target).execute(**params))
+    except ToolTimeout:
+        return {"success": False, "error": f"Tool timed out after {timeout_s:g}s"}
+    except MemoryError:
+        return {"success": False, "error": "Tool exceeded the worker memory limit"}
+    except Exception as e:
+        return {"success": False, "error": f"Tool execution failed: {e}"}
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+    data = result.model_dump(mode="json")
+    size = len(json.dumps(data, default=str))
+    if size > max_result_bytes:
+        return {"success": False, "error": f"Tool result is {size} bytes, above the {max_result_bytes} byte limit"}
+    return data
+
+
+# --- Server side -----------------------------------------------------------
+
+class ToolWorkerPool:
+    """Process pool that runs isolated tools, restarted when a worker hangs or dies."""
+
+    def __init__(self, workers: int = TOOL_WORKERS, timeout_s: float = TOOL_TIMEOUT_S,
+                 memory_limit_mb: int = TOOL_MEMORY_LIMIT_MB, max_result_bytes: int = TOOL_MAX_RESULT_BYTES):
+        self.workers = max(1, workers)
+        self.timeout_s = timeout_s
+        self.memory_limit_mb = memory_limit_mb
+        self.max_result_bytes = max_result_bytes
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Calls wait here rather than in the pool queue, so a call's timeout only counts its own run
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.calls = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: workers do not inherit the server's threads, sockets or event loop
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.memory_limit_mb,)
+            )
+        return self._pool
+
+    def _restart(self, pool: ProcessPoolExecutor) -> None:
+        """Kill a hung or broken pool; the next call starts a fresh one."""
+        if self._pool is not pool:
+            return  # another call already replaced it
+        self._pool = None
+        self.restarts += 1
+        # The executor cannot cancel a running task, so its workers are killed directly
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def describe(self, target: str) -> Dict[str, Any]:
+        """Tool definition from a worker (blocks; runs once per tool)."""
+        pool = self._executor()
+        future: Future = pool.submit(describe_tool, target)
+        try:
+            return future.result(timeout=self.timeout_s + KILL_GRACE_S)
+        except (TimeoutError, BrokenProcessPool):
+            self._restart(pool)
+            raise
+
+    async def run(self, target: str, params: Dict[str, Any]) -> ToolResult:
+        """Execute a tool in a worker process."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        async with self._slots:
+            self.calls += 1
+            pool = self._executor()
+            future = asyncio.get_running_loop().run_in_executor(
+                pool, run_tool, target, params, self.timeout_s, self.max_result_bytes
+            )
+            try:
+                data = await asyncio.wait_for(future, self.timeout_s + KILL_GRACE_S)
+            except asyncio.TimeoutError:
+                # The worker did not stop at its own timer (e.g. stuck in C code)
+                self.timeouts += 1
+                self._restart(pool)
+                return ToolResult(success=False, error=f"Tool timed out after {self.timeout_s:g}s; worker killed")
+            except BrokenProcessPool:
+                self._restart(pool)
+                return ToolResult(success=False, error="Tool worker process died (crash or memory limit)")
+        if not data["success"] and data["error"].startswith("Tool timed out"):
+            self.timeouts += 1
+        return ToolResult(**data)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "running": self._pool is not None,
+            "workers": self.workers,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts
+        }
+
+
+class ProcessTool(BaseTool):
+    """Server-side stand-in for a tool that runs in the worker pool."""
+
+    def __init__(self, target: str, definition: Dict[str, Any], pool: "ToolWorkerPool"):
+        self.target = target
+        self.pool = pool
+        self._name = definition["name"]
+        self._description = definition["description"]
+        self._parameters = [ToolParameter(**parameter) for parameter in definition["parameters"]]
+        self._read_only = definition["read_only"]
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+    @property
+    def parameters(self) -> List[ToolParameter]:
+        return self._parameters
+
+    @property
+    def read_only(self) -> bool:
+        return self._read_only
+
+    async def execute(self, **kwargs) -> ToolResult:
+        return await self.pool.run(self.target, kwargs)
+
+
+# Shared by every isolated tool
+tool_workers = ToolWorkerPool()
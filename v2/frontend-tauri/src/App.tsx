@@ -24,6 +24,9 @@ function App() {
   const sidebarRef = useRef<ConversationSidebarRef>(null)
   const currentSessionIdRef = useRef<string | null>(sessionId)
   const hasInitializedRef = useRef(false)
+  // Turn being streamed (stream id + last event received), resumed after a reconnect
+  const activeStreamRef = useRef<{ streamId: string, lastEventId: number } | null>(null)
+  const reloadAfterStreamRef = useRef(false)
 
   useEffect(() => {
     if (!hasInitializedRef.current) {
@@ -67,11 +70,22 @@ function App() {
     ws.onopen = () => {
       setConnection({ status: 'connected' })
       setWebsocket(ws)
+      // Continue a response that was interrupted by the disconnect instead of re-sending the message
+      const activeStream = activeStreamRef.current
+      if (activeStream) {
+        ws.send(JSON.stringify({ resume: activeStream.streamId, last_event_id: activeStream.lastEventId }))
+      }
     }
     
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data)
+        if (data.stream_id && data.event_id) {
+          activeStreamRef.current = { streamId: data.stream_id, lastEventId: data.event_id }
+        }
+        if (data.type === 'stream_end' || data.type === 'error') {
+          activeStreamRef.current = null
+        }
         handleWebSocketMessage(data)
       } catch (error) {
         console.error('Error parsing WebSocket message:', error)
@@ -165,12 +179,36 @@ function App() {
         
       case 'stream_end':
         setIsLoading(false)
+        if (reloadAfterStreamRef.current) {
+          reloadAfterStreamRef.current = false
+          reloadMessages()
+        }
         // Refresh sidebar to update conversation title and message count
         if (sidebarRef.current && !sidebarCollapsed) {
           sidebarRef.current.refreshConversations()
         }
         break
         
+      case 'budget_exhausted':
+        // The backend stopped the tool loop (time, token, tool call or cost limit, or a loop)
+        setMessages(prev => [
+          ...prev,
+          { role: 'assistant' as const, content: `⚠️ ${data.message}` }
+        ])
+        break
+        
+      case 'stream_gap':
+        // Part of the response fell out of the server's replay buffer; reload it once the turn ends
+        reloadAfterStreamRef.current = true
+        break
+        
+      case 'resume_failed':
+        // The interrupted turn is no longer resumable; show what was persisted
+        activeStreamRef.current = null
+        setIsLoading(false)
+        reloadMessages()
+        break
+        
       case 'error':
         console.error('Backend error:', data.error)
         setMessages(prev => {
@@ -192,6 +230,21 @@ function App() {
     }
   }
 
+  // Replace the message list with the persisted conversation
+  const reloadMessages = async () => {
+    const currentSessionId = currentSessionIdRef.current
+    if (!currentSessionId) return
+    try {
+      const response = await fetch(`http://localhost:8000/conversations/${currentSessionId}`)
+      if (response.ok) {
+        const conversation = await response.json()
+        setMessages(conversation.messages || [])
+      }
+    } catch (error) {
+      console.error('Error reloading conversation:', error)
+    }
+  }
+
   // Fetch available models from backend
   const fetchModels = async () => {
     try {
@@ -243,6 +296,7 @@ function App() {
       // Update frontend state only after backend creation succeeds
       setSessionId(newSessionId)
       currentSessionIdRef.current = newSessionId  // Update ref too
+      activeStreamRef.current = null  // a stream of the previous conversation is not resumed here
       setMessages([])
       setInput('')
       setCanvasContent('')
@@ -279,6 +333,7 @@ function App() {
         // Update state with conversation data
         setSessionId(conversationId)
         currentSessionIdRef.current = conversationId  // Update ref too
+        activeStreamRef.current = null
         setMessages(conversation.messages || [])
         setInput('')
         setCanvasContent('')